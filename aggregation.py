@@ -0,0 +1,137 @@
+import pandas as pd
+import numpy as np
+
+# 리포트 지표 이름 (analyze_data의 summary_data와 동일한 키)
+METRIC_KEYS = ['total_test', 'pass', 'false_defect', 'true_defect', 'fail']
+
+
+def normalize_pass_status(series):
+    """합격 여부 컬럼 값을 'O' / 'X' / '' 형태로 정규화합니다."""
+    return series.fillna('').astype(str).str.strip().str.upper()
+
+
+def unit_flags(df, key_cols, pass_status_col='PassStatusNorm'):
+    """
+    key_cols + SNumber 단위로 PASS('O') 이력과 FAIL('X') 이력 여부를 집계합니다.
+    Args:
+        df (pd.DataFrame): PassStatusNorm 컬럼이 있는 DataFrame.
+        key_cols (list): 그룹 기준 컬럼 목록 (예: [지그 컬럼, 날짜 컬럼]).
+        pass_status_col (str): 정규화된 합격 여부 컬럼명.
+    Returns:
+        pd.DataFrame: key_cols, 'SNumber', 'has_pass', 'has_fail' 컬럼을 가진 DataFrame.
+    """
+    flags = pd.DataFrame({col: df[col] for col in key_cols + ['SNumber']})
+    flags['has_pass'] = (df[pass_status_col] == 'O').to_numpy()
+    flags['has_fail'] = (df[pass_status_col] == 'X').to_numpy()
+    return flags.groupby(key_cols + ['SNumber'], sort=True, observed=True)[['has_pass', 'has_fail']].any().reset_index()
+
+
+def summarize_unit_flags(flags, key_cols):
+    """
+    unit_flags() 결과를 key_cols 기준 리포트 지표로 합산합니다.
+    지표 정의는 analyze_data와 같습니다.
+      - PASS: 한 번이라도 'O'가 있는 SNumber
+      - 가성불량: 'X' 이력이 있으나 PASS한 SNumber
+      - 진성불량: 'X' 이력이 있고 PASS하지 못한 SNumber
+      - FAIL: 전체 SNumber - PASS
+    """
+    counts = flags.assign(
+        total_test=1,
+        false_defect=flags['has_pass'] & flags['has_fail'],
+        true_defect=~flags['has_pass'] & flags['has_fail'],
+    ).rename(columns={'has_pass': 'pass'})
+    summary = counts.groupby(key_cols, sort=True, observed=True)[['total_test', 'pass', 'false_defect', 'true_defect']].sum()
+    summary['fail'] = summary['total_test'] - summary['pass']
+    return summary[METRIC_KEYS].astype(np.int64)
+
+
+
+# 날짜 코드: 공정 시각의 날짜를 1970-01-01 기준 일수(int64)로 나타낸 값. 결측 시각은 int64 최솟값이므로 기간 비교에서 항상 제외됩니다.
+NAT_DAY_CODE = np.iinfo(np.int64).min
+
+
+def stage_day_codes(df, stage):
+    """공정 시각 컬럼(*_dt)을 날짜 코드 배열로 변환합니다. 데이터 버전별로 한 번만 계산해 캐시에 보관합니다."""
+    return df[stage['date_col']].to_numpy().astype('datetime64[D]').view(np.int64)
+
+
+def date_to_day_code(d):
+    """date를 날짜 코드로 변환합니다."""
+    return int(np.datetime64(d, 'D').astype(np.int64))
+
+
+def day_code_range(codes):
+    """날짜 코드 배열의 (최초 날짜, 최종 날짜). 유효한 날짜가 없으면 None."""
+    valid = codes[codes != NAT_DAY_CODE]
+    if valid.size == 0:
+        return None
+    return tuple(np.datetime64(int(code), 'D').astype(object) for code in (valid.min(), valid.max()))
+
+
+def day_code_mask(codes, start_date, end_date):
+    """날짜 코드 배열에서 start_date ~ end_date(양 끝 포함)에 해당하는 행의 마스크 (정수 비교만 수행)"""
+    return (codes >= date_to_day_code(start_date)) & (codes <= date_to_day_code(end_date))
+
+def stage_measurement_frame(df, stage, measure_col):
+    """
+    공정 하나의 측정값 컬럼을 (jig, stamp, SNumber, value) 형태로 추출합니다.
+    측정값은 숫자로 변환하며, 시간/측정값이 없는 행은 제외합니다.
+    Args:
+        df (pd.DataFrame): historyinspection DataFrame (*_dt 컬럼 변환 완료).
+        stage (dict): STAGE_REGISTRY의 공정 정보.
+        measure_col (str): 측정값 컬럼명.
+    """
+    if measure_col not in df.columns or stage['date_col'] not in df.columns:
+        return pd.DataFrame(columns=['jig', 'stamp', 'SNumber', 'value'])
+    if stage['jig_col'] in df.columns and not df[stage['jig_col']].isnull().all():
+        jig_values = df[stage['jig_col']]
+    else:
+        jig_values = pd.Series('전체', index=df.index)
+    frame = pd.DataFrame({
+        'jig': jig_values,
+        'stamp': df[stage['date_col']],
+        'SNumber': df['SNumber'] if 'SNumber' in df.columns else None,
+        'value': pd.to_numeric(df[measure_col], errors='coerce'),
+    })
+    return frame.dropna(subset=['jig', 'stamp', 'value'])
+
+
+# 상세 내역 분류 (analyze_data / 리포트 상세 내역과 같은 순서)
+UNIT_CATEGORIES = ['PASS', '가성불량', '진성불량', 'FAIL']
+
+
+def unit_categories(sns, has_pass, has_fail):
+    """
+    SNumber별 O/X 이력 배열로 분류별 SNumber 배열을 만듭니다.
+    Returns:
+        dict: {'PASS', '가성불량', '진성불량', 'FAIL': SNumber 배열}
+    """
+    return {
+        'PASS': sns[has_pass],
+        '가성불량': sns[has_pass & has_fail],
+        '진성불량': sns[~has_pass & has_fail],
+        'FAIL': sns[~has_pass],
+    }
+
+
+def split_unit_flags(flags, key_cols):
+    """
+    key_cols 순으로 정렬된 unit_flags() 결과를 그룹 경계에서 잘라 그룹별 분류 배열을 만듭니다.
+    Returns:
+        dict: {그룹 키 (key_cols가 하나면 값, 여러 개면 tuple): unit_categories() 결과}
+    """
+    if flags.empty:
+        return {}
+    keys = flags[key_cols]
+    changed = (keys != keys.shift()).any(axis=1).to_numpy(copy=True)
+    changed[0] = False
+    boundaries = np.flatnonzero(changed)
+    starts = np.concatenate(([0], boundaries))
+    sns = np.split(flags['SNumber'].to_numpy(), boundaries)
+    has_pass = np.split(flags['has_pass'].to_numpy(), boundaries)
+    has_fail = np.split(flags['has_fail'].to_numpy(), boundaries)
+    key_values = keys.iloc[starts].itertuples(index=False, name=None)
+    return {
+        (key[0] if len(key_cols) == 1 else key): unit_categories(group_sns, group_pass, group_fail)
+        for key, group_sns, group_pass, group_fail in zip(key_values, sns, has_pass, has_fail)
+    }
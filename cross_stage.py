@@ -0,0 +1,152 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+
+from aggregation import day_code_mask, normalize_pass_status
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# 예측 변수로 사용하는 PCB 공정 측정값과 결과로 보는 후속 공정
+PREDICTOR_STAGE = 'pcb'
+OUTCOME_STAGES = ['rftx', 'semi', 'func']
+N_PREDICTOR_BINS = 10
+
+
+def _serial_mean(serial_idx, values, n_serials):
+    """SerialIdx별 평균값 배열 (측정값이 없는 SNumber는 NaN)"""
+    valid = ~np.isnan(values)
+    total = np.bincount(serial_idx[valid], weights=values[valid], minlength=n_serials)
+    count = np.bincount(serial_idx[valid], minlength=n_serials)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def build_serial_features(df, pcb_day_codes, start_date, end_date):
+    """
+    정수 SerialIdx를 키로 공정별 측정값 평균과 공정 결과를 SNumber 단위 배열로 결합합니다.
+    PCB 공정 투입일이 기간 안에 있는 SNumber만 대상으로 합니다. (행 수에 선형)
+    Args:
+        df (pd.DataFrame): 'SerialIdx' 컬럼이 있는 historyinspection DataFrame.
+        pcb_day_codes (np.ndarray): PCB 공정의 날짜 코드 배열 (get_stage_day_codes).
+        start_date, end_date (date): PCB 투입일 범위.
+    Returns:
+        pd.DataFrame: 대상 SNumber별 측정값 평균('<컬럼>')과
+                      후속 공정 결과('<공정> 진입', '<공정> 불량 이력', '<공정> 최종 불합격') 컬럼.
+    """
+    serial_idx = df['SerialIdx'].to_numpy()
+    has_serial = serial_idx >= 0
+    n_serials = int(serial_idx.max()) + 1 if has_serial.any() else 0
+    if n_serials == 0:
+        return pd.DataFrame()
+
+    in_range = has_serial & day_code_mask(pcb_day_codes, start_date, end_date)
+    selected = np.zeros(n_serials, dtype=bool)
+    selected[serial_idx[in_range]] = True
+    if not selected.any():
+        return pd.DataFrame()
+
+    features = {}
+    for key in STAGE_ORDER:
+        stage = STAGE_REGISTRY[key]
+        stage_rows = (has_serial & df[stage['date_col']].notna()).to_numpy()
+        idx = serial_idx[stage_rows]
+        for col in stage['measure_cols']:
+            values = pd.to_numeric(df.loc[stage_rows, col], errors='coerce').to_numpy(dtype=float)
+            features[col] = _serial_mean(idx, values, n_serials)
+        if key in OUTCOME_STAGES:
+            status = normalize_pass_status(df.loc[stage_rows, stage['pass_col']]).to_numpy()
+            reached = np.bincount(idx, minlength=n_serials) > 0
+            passed = np.bincount(idx, weights=(status == 'O'), minlength=n_serials) > 0
+            failed_once = np.bincount(idx, weights=(status == 'X'), minlength=n_serials) > 0
+            label = STAGE_REGISTRY[key]['label']
+            features[f"{label} 진입"] = reached
+            features[f"{label} 불량 이력"] = np.where(reached, failed_once, np.nan)
+            features[f"{label} 최종 불합격"] = np.where(reached, ~passed, np.nan)
+
+    return pd.DataFrame({name: values[selected] for name, values in features.items()})
+
+
+def correlation_matrix(features):
+    """측정값 평균과 후속 공정 결과(0/1) 간 피어슨 상관계수 (결측은 쌍 단위 제외)"""
+    columns = [c for c in features.columns if not c.endswith(' 진입')]
+    return features[columns].astype(float).corr(min_periods=10)
+
+
+def conditional_failure_rates(features, predictor_col, outcome_col, n_bins=N_PREDICTOR_BINS):
+    """
+    예측 측정값을 분위 구간으로 나눠 구간별 후속 공정 불량률을 계산합니다.
+    Returns:
+        pd.DataFrame: '구간', '구간 시작', '구간 끝', 'SNumber 수', '불량 수', '불량률(%)' 컬럼.
+    """
+    x = features[predictor_col].to_numpy(dtype=float)
+    y = features[outcome_col].to_numpy(dtype=float)
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    if len(x) == 0:
+        return pd.DataFrame(columns=['구간', '구간 시작', '구간 끝', 'SNumber 수', '불량 수', '불량률(%)'])
+
+    edges = np.unique(np.nanpercentile(x, np.linspace(0, 100, n_bins + 1)))
+    bins = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, max(len(edges) - 2, 0))
+    n_groups = max(len(edges) - 1, 1)
+    units = np.bincount(bins, minlength=n_groups)
+    failures = np.bincount(bins, weights=y, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = np.where(units > 0, 100 * failures / units, np.nan)
+    return pd.DataFrame({
+        '구간': [f"Q{i + 1}" for i in range(n_groups)],
+        '구간 시작': edges[:-1] if len(edges) > 1 else edges,
+        '구간 끝': edges[1:] if len(edges) > 1 else edges,
+        'SNumber 수': units,
+        '불량 수': failures.astype(np.int64),
+        '불량률(%)': np.round(rate, 2),
+    })
+
+
+def display_cross_stage_analysis(date_range, get_features):
+    """
+    PCB 측정값과 후속 공정 불량 간 상관관계를 보여주는 함수
+    Args:
+        date_range (tuple or None): 캐시된 PCB 공정의 (최초 날짜, 최종 날짜).
+        get_features (callable): get_features(start_date, end_date) → 캐시된 build_serial_features() 결과.
+    """
+    st.markdown("### 공정 간 상관 분석 (PCB 측정값 → 후속 공정 불량)")
+
+    predictor = STAGE_REGISTRY[PREDICTOR_STAGE]
+    if date_range is None:
+        st.warning("PCB 공정 데이터가 없습니다.")
+        return
+    selected_dates = st.date_input("PCB 투입일 범위 선택", value=date_range, key="cross_dates")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+
+    features = get_features(*selected_dates)
+    if features.empty:
+        st.info("선택한 기간에 PCB 공정에 투입된 SNumber가 없습니다.")
+        return
+    st.write(f"**대상 SNumber**: {len(features):,}개")
+
+    st.markdown("#### 상관계수 행렬")
+    corr = correlation_matrix(features)
+    corr_long = corr.reset_index(names='행').melt(id_vars='행', var_name='열', value_name='상관계수')
+    heatmap = alt.Chart(corr_long).mark_rect().encode(
+        x=alt.X('열:N', sort=list(corr.columns), title=None),
+        y=alt.Y('행:N', sort=list(corr.index), title=None),
+        color=alt.Color('상관계수:Q', scale=alt.Scale(scheme='redblue', domain=[-1, 1], reverse=True)),
+        tooltip=['행', '열', alt.Tooltip('상관계수:Q', format='.3f')],
+    )
+    st.altair_chart(heatmap, width='stretch')
+
+    st.markdown("#### 측정값 구간별 후속 공정 불량률")
+    outcome_options = [c for c in features.columns if c.endswith(' 불량 이력') or c.endswith(' 최종 불합격')]
+    col_predictor, col_outcome = st.columns(2)
+    with col_predictor:
+        predictor_col = st.selectbox("PCB 측정값", predictor['measure_cols'], key="cross_predictor")
+    with col_outcome:
+        outcome_col = st.selectbox("후속 공정 결과", outcome_options, key="cross_outcome")
+    rates = conditional_failure_rates(features, predictor_col, outcome_col)
+    if rates.empty:
+        st.info("선택한 조합에 해당하는 데이터가 없습니다.")
+        return
+    st.table(rates)
+    st.bar_chart(rates.set_index('구간')[['불량률(%)']])
@@ -0,0 +1,252 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from aggregation import UNIT_CATEGORIES
+from raw_viewer import raw_columns
+from report_export import EXPORT_FORMATS, build_report_export
+
+# 내보내기 작업 큐 설정
+EXPORT_WORKERS = 2                       # 동시에 실행하는 내보내기 작업 수
+EXPORT_CHUNK_ROWS = 50000                # 원본 데이터를 나눠 쓰는 행 수 (청크마다 진행률 갱신)
+MAX_STORED_EXPORTS = 20                  # 임시 저장소에 보관하는 완료 파일 수
+MAX_STORE_BYTES = 512 * 1024 * 1024      # 임시 저장소 최대 용량
+EXPORT_POLL_SECONDS = 1.0                # 진행 중인 작업이 있을 때 진행률을 다시 그리는 주기
+ACTIVE_STATUSES = ('대기', '실행 중')
+
+# 작업 종류별 지원 형식: 표시 이름 → (확장자, MIME 타입)
+RAW_EXPORT_FORMATS = {key: EXPORT_FORMATS[key] for key in ('CSV', 'Parquet')}
+EXPORT_KINDS = {
+    '원본 데이터': RAW_EXPORT_FORMATS,
+    '분석 요약': EXPORT_FORMATS,
+    '상세 SNumber 목록': {'CSV': EXPORT_FORMATS['CSV']},
+}
+
+
+def new_export_queue(max_workers=EXPORT_WORKERS):
+    """프로세스 전체에서 공유하는 내보내기 작업 큐(작업 스레드 풀 + 임시 파일 저장소)를 생성합니다."""
+    return {
+        'executor': ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export'),
+        'jobs': OrderedDict(),   # 작업 ID → 작업 정보 (제출 순서)
+        'dir': tempfile.mkdtemp(prefix='inspection_export_'),
+        'lock': threading.Lock(),
+    }
+
+
+def submit_export(queue, label, file_name, mime, write_fn):
+    """
+    내보내기 작업을 큐에 넣고 작업 ID를 반환합니다.
+    Args:
+        label (str): 작업 목록에 표시할 이름.
+        file_name (str): 다운로드 파일 이름.
+        mime (str): 다운로드 MIME 타입.
+        write_fn (callable): write_fn(path, report_progress) — path에 파일을 쓰고 report_progress(0~1)로 진행률을 알립니다.
+    Returns:
+        str: 작업 ID.
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        'id': job_id, 'label': label, 'file_name': file_name, 'mime': mime,
+        'status': '대기', 'progress': 0.0, 'error': None, 'size': 0,
+        'path': os.path.join(queue['dir'], job_id),
+        'submitted': datetime.now().strftime('%H:%M:%S'),
+    }
+    with queue['lock']:
+        queue['jobs'][job_id] = job
+    queue['executor'].submit(_run_export, queue, job_id, write_fn)
+    return job_id
+
+
+def _run_export(queue, job_id, write_fn):
+    """작업 스레드에서 내보내기 파일을 만들고 상태를 갱신합니다."""
+    job = queue['jobs'].get(job_id)
+    if job is None:
+        return
+    with queue['lock']:
+        job['status'] = '실행 중'
+
+    def report_progress(fraction):
+        with queue['lock']:
+            job['progress'] = min(max(float(fraction), 0.0), 1.0)
+
+    try:
+        write_fn(job['path'], report_progress)
+        with queue['lock']:
+            job['status'], job['progress'], job['size'] = '완료', 1.0, os.path.getsize(job['path'])
+    except Exception as e:
+        with queue['lock']:
+            job['status'], job['error'] = '실패', str(e)
+        if os.path.exists(job['path']):
+            os.remove(job['path'])
+    _enforce_store_limit(queue)
+
+
+def _enforce_store_limit(queue):
+    """완료 / 실패한 작업이 보관 한도(개수, 용량)를 넘으면 오래된 것부터 파일과 함께 삭제합니다."""
+    with queue['lock']:
+        finished = [job for job in queue['jobs'].values() if job['status'] not in ACTIVE_STATUSES]
+        total_bytes = sum(job['size'] for job in finished)
+        while finished and (len(finished) > MAX_STORED_EXPORTS or total_bytes > MAX_STORE_BYTES):
+            job = finished.pop(0)
+            total_bytes -= job['size']
+            del queue['jobs'][job['id']]
+            if os.path.exists(job['path']):
+                os.remove(job['path'])
+
+
+def export_job_status(queue, job_ids):
+    """주어진 작업 ID들의 현재 상태 사본을 반환합니다. 저장소에서 삭제된 작업은 제외합니다."""
+    with queue['lock']:
+        return [dict(queue['jobs'][job_id]) for job_id in job_ids if job_id in queue['jobs']]
+
+
+def read_export(queue, job_id):
+    """완료된 작업의 파일 내용을 읽습니다 (다운로드 버튼을 눌렀을 때 호출)."""
+    with queue['lock']:
+        path = queue['jobs'][job_id]['path']
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def close_export_queue(queue):
+    """작업 스레드를 종료하고 임시 저장소를 삭제합니다."""
+    queue['executor'].shutdown(wait=False, cancel_futures=True)
+    shutil.rmtree(queue['dir'], ignore_errors=True)
+
+
+def write_raw_rows(path, report_progress, df, positions, export_format):
+    """
+    원본 데이터 행(positions)을 청크 단위로 파일에 씁니다. 청크마다 진행률을 갱신하므로
+    큰 기간을 내보내도 메모리에 전체 사본이나 직렬화 결과를 만들지 않습니다.
+    """
+    columns = raw_columns(df)
+    n_rows = len(positions)
+    if export_format == 'CSV':
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            df.iloc[positions[:0]][columns].to_csv(f, index=False)
+            for start in range(0, n_rows, EXPORT_CHUNK_ROWS):
+                df.iloc[positions[start:start + EXPORT_CHUNK_ROWS]][columns].to_csv(f, header=False, index=False)
+                report_progress(min(start + EXPORT_CHUNK_ROWS, n_rows) / n_rows)
+        return
+
+    if export_format == 'Parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # object 컬럼은 청크마다 추론되는 타입이 달라지지 않도록 문자열로 고정합니다.
+        string_columns = {col: 'string' for col in columns if df[col].dtype == object}
+        writer = None
+        try:
+            for start in range(0, max(n_rows, 1), EXPORT_CHUNK_ROWS):
+                chunk = df.iloc[positions[start:start + EXPORT_CHUNK_ROWS]][columns].astype(string_columns)
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                report_progress(min(start + EXPORT_CHUNK_ROWS, n_rows) / max(n_rows, 1))
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+
+    raise ValueError(f"지원하지 않는 내보내기 형식입니다: {export_format}")
+
+
+def write_detail_lists(path, report_progress, unit_sets, serials):
+    """지그별 PASS / 가성불량 / 진성불량 / FAIL SNumber 목록을 (구분, 분류, SNumber) CSV로 씁니다."""
+    jigs = sorted(unit_sets.keys(), key=str)
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        pd.DataFrame(columns=['구분', '분류', 'SNumber']).to_csv(f, index=False)
+        for i, jig in enumerate(jigs):
+            categories = unit_sets[jig]['range']
+            for category in UNIT_CATEGORIES:
+                sns = np.sort(np.asarray(serials.take(categories[category]), dtype=str))
+                pd.DataFrame({'구분': str(jig), '분류': category, 'SNumber': sns}).to_csv(f, header=False, index=False)
+            report_progress((i + 1) / len(jigs))
+
+
+def write_summary(path, report_progress, export_format, summary_data, all_dates, unit_sets, serials):
+    """일별 분석 요약을 리포트 다운로드와 같은 형식으로 씁니다."""
+    bucket_keys = [d.strftime('%Y-%m-%d') for d in all_dates]
+    bucket_labels = [d.strftime('%y%m%d') for d in all_dates]
+    data = build_report_export(export_format, summary_data, bucket_keys, bucket_labels,
+                               sorted(summary_data.keys(), key=str), unit_sets, serials)
+    with open(path, 'wb') as f:
+        f.write(data)
+    report_progress(1.0)
+
+
+def display_export_panel(stage_key, table_name, queue, df_all_data, load_positions, analysis, serials):
+    """
+    분석 조건의 원본 데이터 / 분석 요약 / 상세 SNumber 목록을 백그라운드 작업으로 내보내는 화면
+    작업은 공유 스레드 풀에서 실행되어 화면 조작을 막지 않으며, 세션에는 작업 ID만 보관합니다.
+    Args:
+        load_positions (callable): 분석 조건의 원본 행 위치 배열을 반환하는 함수 (작업 스레드에서 호출).
+        analysis (dict): get_stage_analysis() 결과.
+    """
+    st.markdown("---")
+    st.subheader("백그라운드 내보내기")
+    col_kind, col_format, col_submit = st.columns([0.4, 0.3, 0.3])
+    with col_kind:
+        kind = st.selectbox("내보낼 데이터", list(EXPORT_KINDS.keys()), key=f"export_job_kind_{stage_key}")
+    with col_format:
+        export_format = st.selectbox("형식", list(EXPORT_KINDS[kind].keys()), key=f"export_job_format_{stage_key}_{kind}")
+    extension, mime = EXPORT_KINDS[kind][export_format]
+
+    with col_submit:
+        if st.button("내보내기 작업 추가", key=f"export_job_submit_{stage_key}"):
+            summary_data, all_dates, _, unit_sets = analysis['data']
+            if kind == '원본 데이터':
+                write_fn = lambda path, progress: write_raw_rows(path, progress, df_all_data, load_positions(), export_format)
+            elif kind == '분석 요약':
+                write_fn = lambda path, progress: write_summary(path, progress, export_format, summary_data, all_dates,
+                                                                unit_sets, serials)
+            else:
+                write_fn = lambda path, progress: write_detail_lists(path, progress, unit_sets, serials)
+            file_name = f"{table_name}_{kind.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+            job_id = submit_export(queue, f"{table_name} {kind} ({export_format})", file_name, mime, write_fn)
+            st.session_state.export_jobs.append(job_id)
+
+    # 진행 중인 작업이 있을 때만 작업 목록 프래그먼트가 주기적으로 다시 실행됩니다.
+    active = any(job['status'] in ACTIVE_STATUSES for job in export_job_status(queue, st.session_state.export_jobs))
+    st.fragment(display_export_jobs, run_every=EXPORT_POLL_SECONDS if active else None)(queue, active)
+
+
+def display_export_jobs(queue, polling):
+    """이 세션이 제출한 내보내기 작업의 진행률과 완료 파일 다운로드 버튼을 보여주는 함수"""
+    jobs = export_job_status(queue, st.session_state.export_jobs)
+    # 보관 한도로 삭제된 작업은 세션 목록에서도 정리합니다.
+    st.session_state.export_jobs = [job['id'] for job in jobs]
+    if not jobs:
+        st.caption("내보내기 작업이 없습니다.")
+        return
+
+    for job in reversed(jobs):
+        col_label, col_state = st.columns([0.6, 0.4])
+        with col_label:
+            st.write(f"**{job['label']}** · {job['submitted']}")
+        with col_state:
+            if job['status'] == '완료':
+                st.download_button(
+                    label=f"다운로드 ({job['size'] / 1024 / 1024:,.1f} MB)",
+                    data=lambda job_id=job['id']: read_export(queue, job_id),
+                    file_name=job['file_name'],
+                    mime=job['mime'],
+                    key=f"export_job_download_{job['id']}",
+                )
+            elif job['status'] == '실패':
+                st.error(f"실패: {job['error']}")
+            else:
+                st.progress(job['progress'], text=f"{job['status']} {job['progress'] * 100:.0f}%")
+
+    # 마지막 작업이 끝나면 전체를 한 번 다시 실행해 주기적 갱신을 멈춥니다.
+    if polling and not any(job['status'] in ACTIVE_STATUSES for job in jobs):
+        st.rerun()
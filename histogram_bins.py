@@ -0,0 +1,135 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+
+from aggregation import stage_measurement_frame
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# 히스토그램 설정
+N_BINS = 50                   # 구간 수 (범위 밖 값은 양 끝의 미만/초과 구간에 따로 집계)
+EDGE_PERCENTILES = (0.5, 99.5)  # 구간 경계를 정할 때 사용하는 전체 데이터 백분위
+
+
+def histogram_edges(values, n_bins=N_BINS):
+    """측정값 전체 분포에서 모든 (지그, 일)이 공유하는 고정 구간 경계를 계산합니다."""
+    low, high = np.nanpercentile(values, EDGE_PERCENTILES)
+    if not np.isfinite(low) or not np.isfinite(high):
+        low, high = 0.0, 1.0
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, n_bins + 1)
+
+
+def build_histogram_cube(df, n_bins=N_BINS):
+    """
+    측정값 컬럼마다 (지그, 일) 단위 구간별 개수를 계산합니다.
+    모든 셀이 같은 구간 경계를 쓰므로 기간/지그 병합은 단순 합산입니다.
+    Args:
+        df (pd.DataFrame): historyinspection 원본 DataFrame (*_dt 컬럼 변환 완료).
+        n_bins (int): 구간 수.
+    Returns:
+        dict: {측정값 컬럼: {'edges', 'jigs', 'days', 'counts'(지그 × 일 × (n_bins + 2) int32)}}
+              counts의 첫/마지막 칸은 각각 범위 미만/초과 개수입니다.
+    """
+    cube = {}
+    for key in STAGE_ORDER:
+        stage = STAGE_REGISTRY[key]
+        for measure_col in stage['measure_cols']:
+            frame = stage_measurement_frame(df, stage, measure_col)
+            if frame.empty:
+                continue
+            values = frame['value'].to_numpy(dtype=float)
+            edges = histogram_edges(values, n_bins)
+            # 0: 미만, 1..n_bins: 구간, n_bins + 1: 초과 (마지막 경계값은 마지막 구간에 포함)
+            bin_idx = np.searchsorted(edges, values, side='right')
+            bin_idx[values == edges[-1]] = n_bins
+
+            jig_codes, jigs = pd.factorize(frame['jig'], sort=True)
+            day_codes, days = pd.factorize(frame['stamp'].dt.normalize(), sort=True)
+            shape = (len(jigs), len(days), n_bins + 2)
+            flat = np.ravel_multi_index((jig_codes, day_codes, bin_idx), shape)
+            counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape).astype(np.int32)
+            cube[measure_col] = {
+                'edges': edges,
+                'jigs': list(jigs),
+                'days': [d.date() for d in days],
+                'counts': counts,
+            }
+    return cube
+
+
+def histogram_for_range(measure_hist, start_date, end_date, jigs=None, by_jig=False):
+    """
+    기간/지그 범위의 구간별 개수를 합산합니다.
+    Returns:
+        pd.DataFrame: '구분', '구간 시작', '구간 끝', '개수' 컬럼의 tidy DataFrame (구간 수 × 지그 수 행).
+    """
+    day_mask = np.array([start_date <= d <= end_date for d in measure_hist['days']], dtype=bool)
+    jig_mask = np.array([not jigs or j in jigs for j in measure_hist['jigs']], dtype=bool)
+    counts = measure_hist['counts'][jig_mask][:, day_mask].sum(axis=1)
+    edges = measure_hist['edges']
+    labels = [str(j) for j, keep in zip(measure_hist['jigs'], jig_mask) if keep]
+    if not by_jig:
+        counts = counts.sum(axis=0, keepdims=True)
+        labels = ['전체']
+
+    frames = []
+    for label, jig_counts in zip(labels, counts):
+        frames.append(pd.DataFrame({
+            '구분': label,
+            '구간 시작': edges[:-1],
+            '구간 끝': edges[1:],
+            '개수': jig_counts[1:-1],
+        }))
+    result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['구분', '구간 시작', '구간 끝', '개수'])
+    out_of_range = (int(counts[:, 0].sum()), int(counts[:, -1].sum())) if len(counts) else (0, 0)
+    return result, out_of_range
+
+
+def display_measurement_histogram(histogram_cube):
+    """
+    미리 집계된 구간별 개수로 측정값 히스토그램을 보여주는 함수
+    (원본 측정값은 브라우저로 전송하지 않습니다.)
+    """
+    st.markdown("### 측정값 히스토그램")
+
+    measure_options = {
+        f"{STAGE_REGISTRY[key]['label']} - {col}": col
+        for key in STAGE_ORDER for col in STAGE_REGISTRY[key]['measure_cols'] if col in histogram_cube
+    }
+    if not measure_options:
+        st.warning("히스토그램을 그릴 측정값 데이터가 없습니다.")
+        return
+
+    measure_col = measure_options[st.selectbox("측정값 선택", list(measure_options.keys()), key="hist_measure")]
+    measure_hist = histogram_cube[measure_col]
+    days = measure_hist['days']
+
+    col_date, col_jig, col_split = st.columns([0.4, 0.4, 0.2])
+    with col_date:
+        selected_dates = st.date_input("날짜 범위 선택", value=(days[0], days[-1]),
+                                       min_value=days[0], max_value=days[-1], key=f"hist_dates_{measure_col}")
+    with col_jig:
+        selected_jigs = st.multiselect("PC (Jig) 선택 (비우면 전체)", measure_hist['jigs'], key=f"hist_jigs_{measure_col}")
+    with col_split:
+        by_jig = st.toggle("PC별 비교", key=f"hist_by_jig_{measure_col}")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+
+    hist_df, (below, above) = histogram_for_range(measure_hist, selected_dates[0], selected_dates[1], selected_jigs, by_jig)
+    if hist_df['개수'].sum() == 0:
+        st.info("선택한 조건에 해당하는 측정값이 없습니다.")
+        return
+
+    chart = alt.Chart(hist_df).mark_bar(opacity=0.7).encode(
+        x=alt.X('구간 시작:Q', bin='binned', title=measure_col),
+        x2='구간 끝:Q',
+        y=alt.Y('개수:Q', stack=None, title='개수'),
+        color=alt.Color('구분:N', title='PC (Jig)'),
+        tooltip=['구분', alt.Tooltip('구간 시작:Q', format='.4f'), alt.Tooltip('구간 끝:Q', format='.4f'), '개수'],
+    )
+    st.altair_chart(chart, width='stretch')
+    st.caption(f"표시 범위: {measure_hist['edges'][0]:.4f} ~ {measure_hist['edges'][-1]:.4f} "
+               f"(범위 미만 {below:,}건, 범위 초과 {above:,}건)")
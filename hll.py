@@ -0,0 +1,237 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import math
+from datetime import timedelta
+
+from aggregation import day_code_mask
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# HyperLogLog 기본 설정
+DEFAULT_ERROR_RATE = 0.02   # 목표 상대 오차 (1.04 / sqrt(2^p))
+DEFAULT_EXACT_MAX_DAYS = 7  # 이 기간 이하는 원본 데이터로 정확히 계산
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+HASH_BITS = 64
+SPARSE_ENTRY_BYTES = 3      # 희소 셀의 레지스터 항목 크기 (레지스터 번호 uint16 + rho uint8)
+
+
+def precision_for_error(error_rate):
+    """목표 상대 오차를 만족하는 HyperLogLog 정밀도 p (레지스터 수 2^p)를 계산합니다."""
+    p = math.ceil(math.log2((1.04 / error_rate) ** 2))
+    return min(max(p, MIN_PRECISION), MAX_PRECISION)
+
+
+def _bit_length(values):
+    """uint64 배열 각 원소의 비트 길이를 정확히 계산합니다 (float 변환 없이)."""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[mask] += shift
+        values[mask] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+def hash_serials(serials, p):
+    """SNumber를 64비트 해시로 변환해 (레지스터 번호, rho 값)을 반환합니다."""
+    hashed = pd.util.hash_array(np.asarray(serials, dtype=object))
+    register_idx = (hashed >> np.uint64(HASH_BITS - p)).astype(np.int64)
+    remainder = hashed & np.uint64((1 << (HASH_BITS - p)) - 1)
+    rho = (HASH_BITS - p) - _bit_length(remainder) + 1
+    return register_idx, rho.astype(np.uint8)
+
+
+def estimate_cardinality(registers):
+    """
+    레지스터 배열(마지막 축이 레지스터)로부터 고유 개수를 추정합니다.
+    작은 범위에서는 Linear Counting 보정을 적용합니다.
+    """
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+    raw = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def build_hll_sketches(df, error_rate=DEFAULT_ERROR_RATE):
+    """
+    공정 × 지그 × 일 단위 HyperLogLog 스케치를 생성합니다.
+    Args:
+        df (pd.DataFrame): historyinspection 원본 DataFrame (*_dt 컬럼 변환 완료).
+        error_rate (float): 목표 상대 오차.
+    Returns:
+        dict: 'p', 'day0', 'n_days', 'stages' 키를 가진 dict.
+              'stages'는 {공정 키: {'jigs', 'sparse_cells', 'sparse_ptr', 'sparse_reg', 'sparse_rho', 'dense'}} 형태입니다.
+              데이터가 있는 (지그, 일) 셀만 저장하며, 셀 번호는 지그 코드 × n_days + 일 인덱스입니다.
+              값이 있는 레지스터가 적은 셀은 (레지스터 번호, rho) 목록으로 희소 저장하고(CSR: sparse_ptr로 구간 구분),
+              희소 저장이 2^p 바이트보다 커지는 셀만 dense[셀 번호] = uint8[2^p] 배열로 저장합니다.
+    """
+    p = precision_for_error(error_rate)
+    m = 1 << p
+    sketches = {'p': p, 'day0': None, 'n_days': 0, 'stages': {}}
+    if df.empty or 'SNumber' not in df.columns:
+        return sketches
+
+    date_cols = [STAGE_REGISTRY[key]['date_col'] for key in STAGE_ORDER if STAGE_REGISTRY[key]['date_col'] in df.columns]
+    day_min = min(df[col].min() for col in date_cols)
+    day_max = max(df[col].max() for col in date_cols)
+    if pd.isna(day_min) or pd.isna(day_max):
+        return sketches
+    day0 = day_min.normalize()
+    n_days = int((day_max.normalize() - day0) / pd.Timedelta(days=1)) + 1
+    sketches.update({'day0': day0.date(), 'n_days': n_days})
+
+    for key in STAGE_ORDER:
+        stage = STAGE_REGISTRY[key]
+        if stage['date_col'] not in df.columns:
+            continue
+        valid = df[stage['date_col']].notna() & df['SNumber'].notna()
+        if stage['jig_col'] in df.columns and not df[stage['jig_col']].isnull().all():
+            jig_values = df.loc[valid, stage['jig_col']]
+            valid_jig = jig_values.notna().to_numpy()
+        else:
+            jig_values = pd.Series('전체', index=df.index[valid])
+            valid_jig = np.ones(len(jig_values), dtype=bool)
+        if not valid_jig.any():
+            continue
+
+        jig_codes, jigs = pd.factorize(jig_values[valid_jig], sort=True)
+        day_idx = ((df.loc[valid, stage['date_col']][valid_jig].dt.normalize() - day0) / pd.Timedelta(days=1)).to_numpy().astype(np.int64)
+        register_idx, rho = hash_serials(df.loc[valid, 'SNumber'][valid_jig].to_numpy(), p)
+
+        # 같은 레지스터에 대해서는 최대 rho만 남깁니다. (셀 번호, 레지스터) 순으로 정렬됩니다.
+        flat_idx = (jig_codes.astype(np.int64) * n_days + day_idx) * m + register_idx
+        best = pd.Series(rho).groupby(flat_idx).max()
+        entry_cells = best.index.to_numpy() // m
+        entry_regs = best.index.to_numpy() % m
+        entry_rho = best.to_numpy().astype(np.uint8)
+
+        # 셀별로 희소 / 밀집 저장 중 작은 쪽을 고릅니다.
+        cells, counts = np.unique(entry_cells, return_counts=True)
+        is_dense = counts * SPARSE_ENTRY_BYTES >= m
+        dense = {}
+        for cell in cells[is_dense]:
+            in_cell = entry_cells == cell
+            registers = np.zeros(m, dtype=np.uint8)
+            registers[entry_regs[in_cell]] = entry_rho[in_cell]
+            dense[int(cell)] = registers
+        sparse = ~np.isin(entry_cells, cells[is_dense])
+        sketches['stages'][key] = {
+            'jigs': list(jigs),
+            'sparse_cells': cells[~is_dense],
+            'sparse_ptr': np.concatenate([[0], np.cumsum(counts[~is_dense])]),
+            'sparse_reg': entry_regs[sparse].astype(np.uint16),
+            'sparse_rho': entry_rho[sparse],
+            'dense': dense,
+        }
+    return sketches
+
+
+def sketch_nbytes(sketches):
+    """스케치 전체의 레지스터 저장 크기(바이트)"""
+    return sum(
+        stage['sparse_cells'].nbytes + stage['sparse_ptr'].nbytes + stage['sparse_reg'].nbytes + stage['sparse_rho'].nbytes
+        + sum(registers.nbytes for registers in stage['dense'].values())
+        for stage in sketches['stages'].values()
+    )
+
+
+def merge_registers(sketches, stage, day_from, day_to):
+    """
+    [day_from, day_to) 기간의 셀을 지그별로 병합(레지스터별 최대값)해 지그 × 2^p 레지스터 배열을 만듭니다.
+    """
+    m = 1 << sketches['p']
+    n_days = sketches['n_days']
+    merged = np.zeros((len(stage['jigs']), m), dtype=np.uint8)
+
+    entry_cells = np.repeat(stage['sparse_cells'], np.diff(stage['sparse_ptr']))
+    entry_days = entry_cells % n_days
+    in_range = (entry_days >= day_from) & (entry_days < day_to)
+    np.maximum.at(merged, (entry_cells[in_range] // n_days, stage['sparse_reg'][in_range].astype(np.int64)),
+                  stage['sparse_rho'][in_range])
+
+    for cell, registers in stage['dense'].items():
+        if day_from <= cell % n_days < day_to:
+            np.maximum(merged[cell // n_days], registers, out=merged[cell // n_days])
+    return merged
+
+
+def count_distinct_range(sketches, stage_key, start_date, end_date):
+    """
+    기간 내 스케치를 병합(레지스터별 최대값)해 지그별 / 전체 고유 SNumber 수를 추정합니다.
+    Returns:
+        tuple: (지그 목록, 지그별 추정치 ndarray, 전체 추정치)
+    """
+    stage = sketches['stages'].get(stage_key)
+    if stage is None or sketches['day0'] is None:
+        return [], np.array([]), 0.0
+    day_from = max((start_date - sketches['day0']).days, 0)
+    day_to = max((end_date - sketches['day0']).days + 1, 0)
+    merged = merge_registers(sketches, stage, day_from, day_to)
+    per_jig = estimate_cardinality(merged)
+    total = float(estimate_cardinality(merged.max(axis=0)))
+    return stage['jigs'], per_jig, total
+
+
+def count_distinct_exact(df, stage_key, day_codes, start_date, end_date):
+    """
+    짧은 기간용: 원본 데이터에서 지그별 / 전체 고유 SNumber 수를 정확히 계산합니다.
+    스케치와 같은 질문에 답하도록, 지그 컬럼이 있으면 지그가 없는 행은 전체 수에서도 제외합니다.
+    기간은 캐시된 날짜 코드(day_codes)의 정수 비교로 거릅니다.
+    """
+    stage = STAGE_REGISTRY[stage_key]
+    in_range = df[day_code_mask(day_codes, start_date, end_date)]
+    if stage['jig_col'] in df.columns and not df[stage['jig_col']].isnull().all():
+        in_range = in_range[in_range[stage['jig_col']].notna()]
+        per_jig = in_range.groupby(stage['jig_col'])['SNumber'].nunique()
+    else:
+        per_jig = pd.Series({'전체': in_range['SNumber'].nunique()})
+    return per_jig, in_range['SNumber'].nunique()
+
+
+def display_distinct_unit_totals(df_all_data, get_sketches, get_day_codes):
+    """
+    장기간 공정별 고유 SNumber 수(총 테스트 수)를 보여주는 함수
+    get_sketches(error_rate)는 캐시된 스케치를, get_day_codes(stage_key)는 캐시된 공정별 날짜 코드를 돌려주는 함수입니다.
+    """
+    st.markdown("### 장기간 고유 SNumber 수")
+
+    stage_labels = {STAGE_REGISTRY[key]['label']: key for key in STAGE_ORDER}
+    col_stage, col_error, col_exact = st.columns(3)
+    with col_stage:
+        stage_key = stage_labels[st.selectbox("공정 선택", list(stage_labels.keys()), key="hll_stage")]
+    with col_error:
+        error_rate = st.selectbox("허용 오차", [0.01, 0.02, 0.05], index=1,
+                                  format_func=lambda e: f"±{e * 100:.0f}%", key="hll_error")
+    with col_exact:
+        exact_max_days = st.number_input("정확 계산 최대 기간(일)", min_value=0, max_value=62,
+                                         value=DEFAULT_EXACT_MAX_DAYS, key="hll_exact_days")
+
+    sketches = get_sketches(error_rate)
+    if sketches['day0'] is None:
+        st.warning("집계할 데이터가 없습니다.")
+        return
+    min_date = sketches['day0']
+    max_date = min_date + timedelta(days=sketches['n_days'] - 1)
+    selected_dates = st.date_input("날짜 범위 선택", value=(min_date, max_date),
+                                   min_value=min_date, max_value=max_date, key="hll_dates")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+    start_date, end_date = selected_dates
+
+    if (end_date - start_date).days + 1 <= exact_max_days:
+        per_jig, total = count_distinct_exact(df_all_data, stage_key, get_day_codes(stage_key)['codes'], start_date, end_date)
+        method = "정확 계산"
+    else:
+        jigs, estimates, total = count_distinct_range(sketches, stage_key, start_date, end_date)
+        per_jig = pd.Series(np.round(estimates).astype(np.int64), index=jigs)
+        total = int(round(total))
+        method = f"HyperLogLog 근사 (p={sketches['p']}, ±{1.04 / math.sqrt(1 << sketches['p']) * 100:.1f}%)"
+
+    st.caption(f"계산 방식: {method}")
+    st.metric("전체 고유 SNumber", f"{total:,}")
+    result_df = pd.DataFrame({'구분': [str(j) for j in per_jig.index], '고유 SNumber': per_jig.to_numpy()})
+    st.table(result_df)
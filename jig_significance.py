@@ -0,0 +1,119 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import math
+
+# 검정 대상 지표 (분자 지표 키) 및 다중 비교 보정 방법
+TEST_METRICS = {
+    'FAIL': 'fail',
+    '가성불량': 'false_defect',
+    '진성불량': 'true_defect',
+}
+CORRECTION_METHODS = ['Holm', 'Benjamini-Hochberg']
+DEFAULT_ALPHA = 0.05
+
+_normal_sf = np.vectorize(lambda z: 0.5 * math.erfc(z / math.sqrt(2)), otypes=[float])
+
+
+def jig_counts(summary_data, bucket_keys, metric_key):
+    """
+    summary_data의 버킷별 집계를 합산해 지그별 (SNumber 수, 불량 수) 배열을 만듭니다.
+    Returns:
+        tuple: (지그 목록, 전체 수 배열, 불량 수 배열)
+    """
+    jigs = sorted(summary_data.keys())
+    totals = np.zeros(len(jigs), dtype=np.int64)
+    events = np.zeros(len(jigs), dtype=np.int64)
+    for i, jig in enumerate(jigs):
+        for bucket_key in bucket_keys:
+            data_point = summary_data[jig].get(bucket_key)
+            if data_point:
+                totals[i] += data_point['total_test']
+                events[i] += data_point[metric_key]
+    return jigs, totals, events
+
+
+def adjust_p_values(p_values, method):
+    """Holm(가족별 오류율) 또는 Benjamini-Hochberg(거짓 발견율) 방식으로 p-value를 보정합니다."""
+    m = len(p_values)
+    if m == 0:
+        return p_values
+    order = np.argsort(p_values)
+    ranked = p_values[order]
+    if method == 'Holm':
+        adjusted = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    else:
+        adjusted = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
+
+
+def test_jigs_against_rest(jigs, totals, events, method='Holm'):
+    """
+    각 지그의 불량률을 나머지 지그 합산 불량률과 단측 two-proportion z-검정으로 비교합니다.
+    모든 지그를 배열 연산으로 한 번에 계산합니다.
+    Returns:
+        pd.DataFrame: 보정 p-value 오름차순으로 정렬된 지그별 검정 결과.
+    """
+    n_total, e_total = totals.sum(), events.sum()
+    rest_n = n_total - totals
+    rest_e = e_total - events
+    pooled = e_total / n_total if n_total else np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = events / totals
+        rest_rate = rest_e / rest_n
+        se = np.sqrt(pooled * (1 - pooled) * (1 / totals + 1 / rest_n))
+        z = (rate - rest_rate) / se
+    testable = (totals > 0) & (rest_n > 0) & (se > 0) & np.isfinite(z)
+    p_values = np.where(testable, _normal_sf(np.where(testable, z, 0.0)), 1.0)
+    adjusted = adjust_p_values(p_values, method)
+
+    result = pd.DataFrame({
+        '구분': [str(j) for j in jigs],
+        'SNumber 수': totals,
+        '불량 수': events,
+        '불량률(%)': np.round(100 * rate, 2),
+        '나머지 불량률(%)': np.round(100 * rest_rate, 2),
+        'z': np.round(np.where(testable, z, np.nan), 2),
+        'p-value': p_values,
+        '보정 p-value': adjusted,
+    })
+    return result.sort_values(['보정 p-value', 'z'], ascending=[True, False]).reset_index(drop=True)
+
+
+def display_jig_significance(analysis_key, summary_data, all_dates):
+    """
+    지그별 불량률이 나머지 지그보다 유의하게 높은지 검정 결과를 보여주는 함수
+    """
+    st.markdown("---")
+    st.subheader("PC (Jig) 유의성 검정")
+    if len(summary_data) < 2:
+        st.info("비교할 PC (Jig)가 2개 이상일 때 검정합니다.")
+        return
+
+    col_metric, col_method, col_alpha = st.columns(3)
+    with col_metric:
+        metric_label = st.selectbox("검정 지표", list(TEST_METRICS.keys()), key=f"sig_metric_{analysis_key}")
+    with col_method:
+        method = st.selectbox("다중 비교 보정", CORRECTION_METHODS, key=f"sig_method_{analysis_key}")
+    with col_alpha:
+        alpha = st.number_input("유의 수준", min_value=0.001, max_value=0.2, value=DEFAULT_ALPHA,
+                                step=0.01, format="%.3f", key=f"sig_alpha_{analysis_key}")
+    selected_dates = st.date_input("검정 기간", value=(all_dates[0], all_dates[-1]),
+                                   min_value=all_dates[0], max_value=all_dates[-1], key=f"sig_dates_{analysis_key}")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+
+    bucket_keys = [d.strftime('%Y-%m-%d') for d in all_dates if selected_dates[0] <= d <= selected_dates[1]]
+    jigs, totals, events = jig_counts(summary_data, bucket_keys, TEST_METRICS[metric_label])
+    if totals.sum() == 0:
+        st.info("선택한 기간에 데이터가 없습니다.")
+        return
+
+    result = test_jigs_against_rest(jigs, totals, events, method)
+    result['판정'] = np.where(result['보정 p-value'] < alpha, '유의하게 높음', '')
+    st.dataframe(result.style.format({'p-value': '{:.2e}', '보정 p-value': '{:.2e}'}),
+                 hide_index=True, width='stretch')
+    st.caption("SNumber 수는 일별 집계를 합산한 값이므로 여러 날에 걸쳐 검사한 SNumber는 날마다 집계됩니다.")
@@ -0,0 +1,195 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import threading
+from datetime import date, datetime
+
+from aggregation import date_to_day_code, normalize_pass_status
+from report_charts import CHART_METRICS, report_line_chart
+from stage_registry import STAGE_REGISTRY
+
+# 라이브 모드 설정
+LIVE_STAGES = ('rftx', 'func')   # 벽면 모니터용 라이브 모드를 제공하는 공정
+LIVE_REFRESH_OPTIONS = {'5초': 5, '10초': 10, '30초': 30, '60초': 60}
+
+# SNumber별 O/X 이력 플래그 (비트 OR로 누적하므로 같은 행을 다시 적용해도 결과가 같습니다)
+_FLAG_PASS = 1
+_FLAG_FAIL = 2
+
+
+def new_live_monitor(stage_key):
+    """
+    프로세스 전체에서 공유하는 공정별 라이브 모니터 상태를 생성합니다.
+    오늘 검사한 SNumber의 O/X 플래그와, 플래그가 바뀔 때만 갱신하는 지그별 / 시간별 카운터를 보관합니다.
+    """
+    return {
+        'stage_key': stage_key,
+        'day': None,
+        'last_rowid': None,
+        'flags': {},         # (지그, SNumber) / (지그, 시간, SNumber) → O/X 플래그
+        'jig_counts': {},    # 지그 → [SNumber 수, PASS, X 이력, O·X 모두]
+        'hour_counts': {},   # (지그, 시간) → [SNumber 수, PASS, X 이력, O·X 모두]
+        'updated': None,
+        'lock': threading.Lock(),
+    }
+
+
+def _apply_flag(flags, counts, key, unit, flag):
+    """SNumber 하나의 플래그를 누적하고, 플래그가 바뀐 경우에만 카운터를 갱신합니다."""
+    old = flags.get((key, unit), 0)
+    new = old | flag
+    if new == old:
+        return
+    flags[(key, unit)] = new
+    c = counts.setdefault(key, [0, 0, 0, 0])
+    c[0] += old == 0
+    c[1] += bool(new & _FLAG_PASS) and not old & _FLAG_PASS
+    c[2] += bool(new & _FLAG_FAIL) and not old & _FLAG_FAIL
+    c[3] += new == _FLAG_PASS | _FLAG_FAIL and old != new
+
+
+def apply_live_rows(monitor, rows):
+    """
+    새로 읽은 행 중 공정 시각이 모니터 기준일(monitor['day'])인 행을 상태에 반영합니다. 처리량은 새 행 수에만 비례합니다.
+    공정 시각은 형식이 공정마다 다를 수 있으므로 pd.to_datetime으로 변환한 뒤 날짜를 비교합니다.
+    """
+    stage = STAGE_REGISTRY[monitor['stage_key']]
+    status = normalize_pass_status(rows[stage['pass_col']])
+    work = pd.DataFrame({
+        'jig': rows[stage['jig_col']],
+        'hour': pd.to_datetime(rows[stage['stamp_col']], errors='coerce').dt.floor('h'),
+        'SNumber': rows['SNumber'],
+        'flag': np.where(status == 'O', _FLAG_PASS, 0) | np.where(status == 'X', _FLAG_FAIL, 0),
+    }).dropna(subset=['jig', 'hour', 'SNumber'])
+    work = work[work['hour'].dt.date == monitor['day']]
+    if work.empty:
+        return
+    # 같은 (지그, 시간, SNumber)의 행은 먼저 합쳐 Python 루프를 고유 SNumber 수로 줄입니다.
+    grouped = work.groupby(['jig', 'hour', 'SNumber'], sort=False)['flag'].agg(np.bitwise_or.reduce)
+    for (jig, hour, unit), flag in grouped.items():
+        _apply_flag(monitor['flags'], monitor['jig_counts'], jig, unit, int(flag))
+        _apply_flag(monitor['flags'], monitor['hour_counts'], (jig, hour), unit, int(flag))
+
+
+def live_start_rowid(day_codes, rowids, today):
+    """
+    하루의 첫 갱신에서 읽기 시작할 rowid를 캐시된 날짜 코드로 찾습니다.
+    불러온 데이터에 오늘 행이 있으면 그 첫 행의 직전 rowid, 없으면 불러온 데이터의 마지막 rowid입니다.
+    불러온 데이터 이후에 추가된 행은 모두 더 큰 rowid를 가지므로, 오늘 행을 빠뜨리지 않고 과거 이력은 읽지 않습니다.
+    Args:
+        day_codes (np.ndarray): 공정의 날짜 코드 배열 (get_stage_day_codes).
+        rowids (np.ndarray): 같은 순서의 rowid 배열 (get_all_data의 '_rowid').
+        today (date): 기준 날짜.
+    """
+    today_rows = day_codes == date_to_day_code(today)
+    if today_rows.any():
+        return int(rowids[today_rows].min()) - 1
+    return int(rowids.max()) if rowids.size else 0
+
+
+def refresh_live_monitor(monitor, fetch_rows, start_rowid, today=None):
+    """
+    마지막으로 처리한 rowid 이후에 추가된 오늘 행만 읽어 라이브 모니터를 갱신합니다.
+    날짜가 바뀌면 상태를 비우고, 오늘 첫 행부터 다시 읽습니다.
+    Args:
+        monitor (dict): new_live_monitor()로 만든 공유 상태.
+        fetch_rows (callable): fetch_rows(last_rowid) → rowid가 last_rowid보다 큰 공정 행 ('_rowid' 컬럼 포함).
+                               오늘 행만 고르는 것은 apply_live_rows()가 변환된 시각으로 수행합니다.
+        start_rowid (callable): start_rowid(today) → 하루의 첫 갱신에서 읽기 시작할 rowid (live_start_rowid).
+        today (date, optional): 기준 날짜. None이면 오늘.
+    Returns:
+        int: 이번에 처리한 행 수.
+    """
+    today = today or date.today()
+    with monitor['lock']:
+        if monitor['day'] != today:
+            monitor.update(day=today, last_rowid=None, flags={}, jig_counts={}, hour_counts={})
+
+        if monitor['last_rowid'] is None:
+            # 하루의 첫 갱신에서도 과거 이력 전체를 읽지 않도록, 오늘 첫 행 직전부터 읽습니다.
+            monitor['last_rowid'] = start_rowid(today)
+        rows = fetch_rows(monitor['last_rowid'])
+        monitor['updated'] = datetime.now().strftime('%H:%M:%S')
+        if rows is None or rows.empty:
+            return 0
+        apply_live_rows(monitor, rows)
+        monitor['last_rowid'] = max(monitor['last_rowid'], int(rows['_rowid'].max()))
+        return len(rows)
+
+
+def _metrics_frame(counts):
+    """누적 카운터를 리포트와 같은 지표(총 테스트 수, PASS, 가성불량, 진성불량, FAIL)로 변환합니다."""
+    values = np.array(list(counts.values()), dtype=np.int64).reshape(-1, 4)
+    total, passed, has_fail, both = values.T
+    return pd.DataFrame({
+        'total_test': total,
+        'pass': passed,
+        'false_defect': both,
+        'true_defect': has_fail - both,
+        'fail': total - passed,
+    }, index=pd.Index(list(counts.keys())))
+
+
+def live_summary(monitor):
+    """오늘의 지그별 요약 표"""
+    with monitor['lock']:
+        counts = dict(monitor['jig_counts'])
+    if not counts:
+        return pd.DataFrame()
+    metrics = _metrics_frame(counts).sort_index()
+    summary = metrics.rename(columns={value: key for key, value in CHART_METRICS.items()})
+    summary['수율(%)'] = (100 * metrics['pass'] / metrics['total_test']).round(2)
+    summary.index.name = '구분'
+    return summary
+
+
+def live_hourly_tidy(monitor):
+    """오늘의 (지그, 시간, 지표, 값) 집계 — report_charts의 그래프 형식"""
+    with monitor['lock']:
+        counts = dict(monitor['hour_counts'])
+    if not counts:
+        return pd.DataFrame(columns=['구분', '시점', '지표', '값'])
+    metrics = _metrics_frame(counts).rename(columns={value: key for key, value in CHART_METRICS.items()})
+    metrics.index = pd.MultiIndex.from_tuples(metrics.index, names=['구분', '시점'])
+    tidy = metrics.reset_index().melt(id_vars=['구분', '시점'], var_name='지표', value_name='값')
+    tidy['구분'] = tidy['구분'].astype(str)
+    return tidy.sort_values(['구분', '시점'], kind='mergesort')
+
+
+def display_live_panel(stage_key, monitor, refresh):
+    """
+    라이브 모드 화면 (프래그먼트로 주기 실행)
+    새 행만 읽어 공유 모니터를 갱신한 뒤, 오늘의 지그별 요약과 시간별 추이를 그립니다.
+    """
+    n_new = refresh()
+    st.caption(f"오늘 {monitor['day']} · 마지막 갱신 {monitor['updated']} · 새 행 {n_new:,}건")
+
+    summary = live_summary(monitor)
+    if summary.empty:
+        st.info("오늘 검사한 데이터가 아직 없습니다.")
+        return
+    st.dataframe(summary, width='stretch')
+
+    metric_label = st.radio("그래프 지표", list(CHART_METRICS.keys()), horizontal=True, key=f"live_metric_{stage_key}")
+    tidy = live_hourly_tidy(monitor)
+    st.altair_chart(report_line_chart(tidy[tidy['지표'] == metric_label]), width='stretch')
+
+
+def display_live_mode(stage_key, monitor, refresh):
+    """
+    벽면 모니터용 라이브 모드 토글
+    켜면 선택한 주기마다 라이브 영역만 다시 실행되어, 전체 데이터를 다시 불러오지 않고 오늘 현황을 갱신합니다.
+    Args:
+        refresh (callable): 라이브 모니터를 갱신하고 처리한 행 수를 반환하는 함수.
+    """
+    col_toggle, col_interval = st.columns([0.4, 0.6])
+    with col_toggle:
+        live = st.toggle("라이브 모드", key=f"live_mode_{stage_key}")
+    if not live:
+        return
+    with col_interval:
+        interval_label = st.radio("갱신 주기", list(LIVE_REFRESH_OPTIONS.keys()), horizontal=True,
+                                  key=f"live_interval_{stage_key}")
+    st.subheader(f"{STAGE_REGISTRY[stage_key]['label']} 오늘 현황 (라이브)")
+    st.fragment(display_live_panel, run_every=LIVE_REFRESH_OPTIONS[interval_label])(stage_key, monitor, refresh)
+    st.markdown("---")
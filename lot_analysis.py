@@ -0,0 +1,114 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from aggregation import day_code_mask, normalize_pass_status, summarize_unit_flags, unit_flags
+from retest_analysis import analyze_retests, summarize_retests
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# SNumber 앞부분에서 Lot을 잘라내는 기본 위치 (시작 인덱스, 길이)
+DEFAULT_LOT_PREFIX = {'start': 0, 'length': 6}
+
+
+def parse_lots(serial_codes, serials, start, length):
+    """
+    SNumber 접두부를 잘라 범주형 Lot 컬럼을 만듭니다.
+    문자열 슬라이싱은 고유 SNumber에 대해서만 한 번 수행하고, 행에는 정수 코드로 펼칩니다.
+    Args:
+        serial_codes (np.ndarray): pd.factorize(SNumber)의 코드 (결측은 -1).
+        serials (pd.Index): pd.factorize(SNumber)의 고유값.
+        start (int): Lot 시작 인덱스.
+        length (int): Lot 길이.
+    Returns:
+        pd.Categorical: 행별 Lot (SNumber가 없거나 접두부가 비어 있으면 결측).
+    """
+    prefixes = pd.Index(serials).astype(str).str.slice(start, start + length)
+    lot_codes, lots = pd.factorize(prefixes.where(prefixes.str.len() > 0))
+    codes = np.where(serial_codes >= 0, lot_codes[np.maximum(serial_codes, 0)], -1)
+    return pd.Categorical.from_codes(codes, categories=lots)
+
+
+def lot_summary(df, stage):
+    """
+    Lot별 SNumber 단위 수율 / 가성불량 / 재검사 지표를 집계합니다.
+    지표 정의는 리포트와 같으며(aggregation.summarize_unit_flags), 재검사 지표는 analyze_retests()를 사용합니다.
+    Args:
+        df (pd.DataFrame): 'Lot' 컬럼이 있고 공정 기간으로 필터링된 DataFrame.
+        stage (dict): STAGE_REGISTRY의 공정 정보.
+    Returns:
+        pd.DataFrame: Lot을 인덱스로 가진 요약 DataFrame.
+    """
+    work = pd.DataFrame({
+        'Lot': df['Lot'],
+        'SNumber': df['SNumber'],
+        'PassStatusNorm': normalize_pass_status(df[stage['pass_col']]),
+    }).dropna(subset=['Lot', 'SNumber'])
+    if work.empty:
+        return pd.DataFrame()
+
+    metrics = summarize_unit_flags(unit_flags(work, ['Lot']), ['Lot'])
+    metrics.index = metrics.index.astype(str)
+    # Lot은 SNumber에서 파생되므로, 지그 대신 Lot을 그룹 컬럼으로 넘기면 SNumber가 자신의 Lot에 귀속됩니다.
+    units = analyze_retests(df[df['Lot'].notna()], stage['date_col'], 'Lot', stage['pass_col'])
+    units['jig'] = units['jig'].astype(str)
+    retests, _ = summarize_retests(units)
+
+    result = pd.DataFrame({
+        '총 SNumber': metrics['total_test'],
+        'PASS': metrics['pass'],
+        '수율(%)': (100 * metrics['pass'] / metrics['total_test']).round(2),
+        '가성불량': metrics['false_defect'],
+        '가성불량률(%)': (100 * metrics['false_defect'] / metrics['total_test']).round(2),
+        '진성불량': metrics['true_defect'],
+        'FAIL': metrics['fail'],
+    })
+    result = result.join(retests[['FPY(%)', '재검사 SNumber', '평균 검사 횟수']], how='left')
+    result.index.name = 'Lot'
+    return result
+
+
+def display_lot_analysis(df_all_data, get_day_codes):
+    """
+    SNumber 접두부로 구분한 Lot별 수율 / 가성불량 / 재검사 요약을 보여주는 함수
+    Args:
+        get_day_codes (callable): get_day_codes(stage_key) → 캐시된 공정별 날짜 코드 {'codes', 'range'}.
+    """
+    st.markdown("### Lot 분석")
+
+    with st.expander("Lot 구분 설정 (SNumber 접두부)", expanded=False):
+        prefix = st.session_state.lot_prefix
+        col_start, col_length = st.columns(2)
+        with col_start:
+            start = st.number_input("시작 위치", min_value=0, max_value=30, value=prefix['start'], key="lot_prefix_start")
+        with col_length:
+            length = st.number_input("길이", min_value=1, max_value=30, value=prefix['length'], key="lot_prefix_length")
+        if (start, length) != (prefix['start'], prefix['length']):
+            st.session_state.lot_prefix = {'start': int(start), 'length': int(length)}
+            st.rerun()
+        sample = df_all_data['SNumber'].dropna().head(1)
+        if not sample.empty:
+            sn = str(sample.iloc[0])
+            st.caption(f"예시: {sn} → Lot '{sn[start:start + length]}'")
+
+    stage_labels = {STAGE_REGISTRY[key]['label']: key for key in STAGE_ORDER}
+    stage_key = stage_labels[st.selectbox("공정 선택", list(stage_labels.keys()), key="lot_stage")]
+    stage = STAGE_REGISTRY[stage_key]
+
+    day_codes = get_day_codes(stage_key)
+    if day_codes['range'] is None:
+        st.warning("선택한 공정의 데이터가 없습니다.")
+        return
+    selected_dates = st.date_input("날짜 범위 선택", value=day_codes['range'], key=f"lot_dates_{stage_key}")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+
+    df_range = df_all_data[day_code_mask(day_codes['codes'], *selected_dates)]
+    summary = lot_summary(df_range, stage)
+    if summary.empty:
+        st.info("선택한 기간에 Lot 데이터가 없습니다.")
+        return
+
+    st.write(f"**Lot 수**: {len(summary):,}개")
+    st.dataframe(summary, width='stretch')
+    st.bar_chart(summary[['수율(%)', '가성불량률(%)']])
@@ -0,0 +1,216 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from datetime import timedelta
+
+from aggregation import METRIC_KEYS, normalize_pass_status, unit_flags
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# 큐브 셀에 저장되는 지표
+#   tests / pass_rows / fail_rows : 검사 행 수 (재검사 포함)
+#   METRIC_KEYS                   : SNumber 단위 지표 (analyze_data와 동일한 정의)
+# SNumber 단위 지표는 (공정, 지그, 일) 안에서 해당 SNumber의 첫 검사 시간에만 기록되므로
+# 시간 축을 합산하면 일별 리포트와 정확히 같은 값이 됩니다.
+# 여러 날 / 여러 지그를 합산한 값은 (지그, 일)마다 한 번씩 센 SNumber·일 수이며, 고유 SNumber 수가 아닙니다.
+CUBE_METRICS = ['tests', 'pass_rows', 'fail_rows'] + METRIC_KEYS
+HOURS_PER_DAY = 24
+
+
+def build_olap_cube(df):
+    """
+    공정 × 지그 × 일 × 시간 × 지표 형태의 NumPy 큐브를 생성합니다.
+    Args:
+        df (pd.DataFrame): historyinspection 원본 DataFrame (*_dt 컬럼 변환 완료).
+    Returns:
+        dict: 'values'({공정 키: 지그 × 일 × 시간 × 지표 int32 ndarray}), 'jigs'(공정별 지그 목록),
+              'day0'(첫 날짜), 'n_days' 키를 가진 큐브. 배열은 공정마다 자신의 지그 수만큼만 할당합니다.
+    """
+    stage_frames = {}
+    day_min, day_max = None, None
+    for key in STAGE_ORDER:
+        stage = STAGE_REGISTRY[key]
+        if stage['date_col'] not in df.columns or 'SNumber' not in df.columns:
+            continue
+        stamps = df[stage['date_col']]
+        valid = stamps.notna() & df['SNumber'].notna()
+        if stage['jig_col'] in df.columns and not df[stage['jig_col']].isnull().all():
+            jig_values = df[stage['jig_col']]
+            valid &= jig_values.notna()
+        else:
+            jig_values = pd.Series('전체', index=df.index)
+        if not valid.any():
+            continue
+        stage_df = pd.DataFrame({
+            'jig': jig_values[valid].to_numpy(),
+            'day': stamps[valid].dt.normalize().to_numpy(),
+            'hour': stamps[valid].dt.hour.to_numpy(),
+            'SNumber': df.loc[valid, 'SNumber'].to_numpy(),
+            'PassStatusNorm': normalize_pass_status(df.loc[valid, stage['pass_col']]).to_numpy()
+            if stage['pass_col'] in df.columns else '',
+        })
+        stage_frames[key] = stage_df
+        day_min = stage_df['day'].min() if day_min is None else min(day_min, stage_df['day'].min())
+        day_max = stage_df['day'].max() if day_max is None else max(day_max, stage_df['day'].max())
+
+    jigs = {key: [] for key in STAGE_ORDER}
+    if not stage_frames:
+        return {'values': {key: np.zeros((0, 0, HOURS_PER_DAY, len(CUBE_METRICS)), dtype=np.int32) for key in STAGE_ORDER},
+                'jigs': jigs, 'day0': None, 'n_days': 0}
+
+    n_days = int((day_max - day_min) / pd.Timedelta(days=1)) + 1
+    for key, stage_df in stage_frames.items():
+        jig_codes, jig_uniques = pd.factorize(stage_df['jig'], sort=True)
+        stage_df['jig'] = jig_codes
+        stage_df['day'] = ((stage_df['day'] - day_min) / pd.Timedelta(days=1)).astype(np.int64)
+        jigs[key] = list(jig_uniques)
+
+    values = {key: np.zeros((len(jigs[key]), n_days, HOURS_PER_DAY, len(CUBE_METRICS)), dtype=np.int32) for key in STAGE_ORDER}
+    for key, stage_df in stage_frames.items():
+        cell_shape = (len(jigs[key]), n_days, HOURS_PER_DAY)
+        n_cells = len(jigs[key]) * n_days * HOURS_PER_DAY
+
+        # 검사 행 단위 지표
+        cell = np.ravel_multi_index((stage_df['jig'], stage_df['day'], stage_df['hour']), cell_shape)
+        is_pass = (stage_df['PassStatusNorm'] == 'O').to_numpy()
+        is_fail = (stage_df['PassStatusNorm'] == 'X').to_numpy()
+        row_metrics = [np.ones(len(cell)), is_pass, is_fail]
+
+        # SNumber 단위 지표: (지그, 일, SNumber)별 O/X 여부와 첫 검사 시간
+        flags = unit_flags(stage_df, ['jig', 'day'])
+        first_hour = stage_df.groupby(['jig', 'day', 'SNumber'], sort=True)['hour'].min().to_numpy()
+        unit_cell = np.ravel_multi_index((flags['jig'], flags['day'], first_hour), cell_shape)
+        has_pass = flags['has_pass'].to_numpy()
+        has_fail = flags['has_fail'].to_numpy()
+        unit_metrics = [
+            np.ones(len(unit_cell)),
+            has_pass,
+            has_pass & has_fail,
+            ~has_pass & has_fail,
+            ~has_pass,
+        ]
+
+        for metric_idx, weights in enumerate(row_metrics):
+            values[key][..., metric_idx] = np.bincount(cell, weights=weights, minlength=n_cells).reshape(cell_shape)
+        for offset, weights in enumerate(unit_metrics):
+            metric_idx = len(row_metrics) + offset
+            values[key][..., metric_idx] = np.bincount(unit_cell, weights=weights, minlength=n_cells).reshape(cell_shape)
+
+    return {'values': values, 'jigs': jigs, 'day0': day_min.date(), 'n_days': n_days}
+
+
+def cube_dates(cube):
+    """큐브의 일 축에 해당하는 날짜 목록을 반환합니다."""
+    if cube['day0'] is None:
+        return []
+    return [cube['day0'] + timedelta(days=i) for i in range(cube['n_days'])]
+
+
+def slice_olap_cube(cube, stage_key, jigs=None, start_date=None, end_date=None, hours=None):
+    """
+    큐브에서 공정 하나를 선택(slice)하고 지그/기간/시간 범위로 잘라냅니다(dice).
+    Args:
+        cube (dict): build_olap_cube()의 결과.
+        stage_key (str): 공정 키 ('pcb', 'fw', 'rftx', 'semi', 'func').
+        jigs (list, optional): 선택할 지그 목록. None이면 전체.
+        start_date, end_date (date, optional): 기간. None이면 전체.
+        hours (tuple, optional): (시작 시, 종료 시) 범위. None이면 0~23시.
+    Returns:
+        tuple: (지그 × 일 × 시간 × 지표 ndarray, 선택된 지그 목록, 선택된 날짜 목록)
+    """
+    stage_jigs = cube['jigs'][stage_key]
+    values = cube['values'][stage_key]
+
+    if jigs is not None:
+        jig_idx = [stage_jigs.index(j) for j in jigs if j in stage_jigs]
+        values = values[jig_idx]
+        stage_jigs = [stage_jigs[i] for i in jig_idx]
+
+    dates = cube_dates(cube)
+    day_from = 0 if start_date is None or not dates else max((start_date - cube['day0']).days, 0)
+    day_to = cube['n_days'] if end_date is None or not dates else max((end_date - cube['day0']).days + 1, 0)
+    values = values[:, day_from:day_to]
+
+    hour_from, hour_to = hours if hours is not None else (0, HOURS_PER_DAY - 1)
+    values = values[:, :, hour_from:hour_to + 1]
+    return values, stage_jigs, dates[day_from:day_to]
+
+
+def rollup_olap_cube(values, axes):
+    """
+    잘라낸 큐브를 지정한 축 방향으로 합산합니다(roll-up).
+    axes는 'jig', 'day', 'hour' 중 합산할 축 이름 목록입니다.
+    검사 행 지표는 그대로 합산되지만, SNumber 단위 지표는 (지그, 일)마다 한 번씩 센 값이므로
+    'day'나 'jig' 축을 합산한 결과는 고유 SNumber 수가 아니라 SNumber·일(지그별) 수입니다.
+    """
+    axis_index = {'jig': 0, 'day': 1, 'hour': 2}
+    return values.sum(axis=tuple(axis_index[a] for a in axes), keepdims=True)
+
+
+def olap_report_frame(values, jigs, dates, group_by):
+    """
+    잘라낸 큐브를 group_by('jig', 'day', 'hour') 기준 리포트 DataFrame으로 변환합니다.
+    """
+    other_axes = [a for a in ['jig', 'day', 'hour'] if a != group_by]
+    rolled = rollup_olap_cube(values, other_axes).reshape(-1, len(CUBE_METRICS))
+    if group_by == 'jig':
+        index = pd.Index([str(j) for j in jigs], name='구분')
+    elif group_by == 'day':
+        index = pd.Index([d.strftime('%y%m%d') for d in dates], name='날짜')
+    else:
+        index = pd.Index([f"{h:02d}시" for h in range(values.shape[2])], name='시간')
+    report_df = pd.DataFrame(rolled, index=index, columns=CUBE_METRICS)
+    return report_df.rename(columns={
+        'tests': '검사 횟수', 'pass_rows': 'PASS 횟수', 'fail_rows': 'FAIL 횟수',
+        'total_test': '총 테스트 수', 'pass': 'PASS', 'false_defect': '가성불량',
+        'true_defect': '진성불량', 'fail': 'FAIL',
+    })
+
+
+def display_olap_explorer(cube):
+    """
+    큐브에서 공정/PC/기간/시간대 조합을 즉시 조회하는 화면
+    """
+    st.markdown("### 큐브 즉시 조회")
+    st.caption("공정 × 지그 × 일 × 시간 단위로 미리 집계된 큐브에서 바로 조회합니다. (분석 실행 불필요)")
+
+    dates = cube_dates(cube)
+    if not dates:
+        st.warning("큐브에 집계된 데이터가 없습니다.")
+        return
+
+    stage_labels = {STAGE_REGISTRY[key]['label']: key for key in STAGE_ORDER}
+    col_stage, col_jig = st.columns([0.3, 0.7])
+    with col_stage:
+        stage_key = stage_labels[st.selectbox("공정 선택", list(stage_labels.keys()), key="olap_stage")]
+    with col_jig:
+        stage_jigs = cube['jigs'][stage_key]
+        selected_jigs = st.multiselect("PC (Jig) 선택 (비우면 전체)", stage_jigs, key=f"olap_jigs_{stage_key}")
+
+    col_date, col_hour, col_group = st.columns([0.4, 0.4, 0.2])
+    with col_date:
+        selected_dates = st.date_input("날짜 범위 선택", value=(dates[0], dates[-1]),
+                                       min_value=dates[0], max_value=dates[-1], key="olap_dates")
+    with col_hour:
+        hours = st.slider("시간대 선택", 0, HOURS_PER_DAY - 1, (0, HOURS_PER_DAY - 1), key="olap_hours")
+    with col_group:
+        group_label = st.selectbox("집계 기준", ['PC (Jig)', '날짜', '시간'], key="olap_group")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+
+    values, jigs, sliced_dates = slice_olap_cube(
+        cube, stage_key, jigs=selected_jigs or None,
+        start_date=selected_dates[0], end_date=selected_dates[1], hours=hours,
+    )
+    if values.size == 0 or values.sum() == 0:
+        st.info("선택한 조건에 해당하는 데이터가 없습니다.")
+        return
+
+    group_by = {'PC (Jig)': 'jig', '날짜': 'day', '시간': 'hour'}[group_label]
+    report_df = olap_report_frame(values, jigs, sliced_dates, group_by)
+    report_df.loc['합계'] = report_df.sum()
+    st.dataframe(report_df, width='stretch')
+    st.caption("SNumber 단위 지표(총 테스트 수, PASS, 가성불량, 진성불량, FAIL)는 (PC, 일)마다 첫 검사 시간에 한 번씩 집계됩니다. "
+               "여러 날이나 여러 PC를 합산한 값은 SNumber·일 수이므로, 여러 날 / PC에서 검사한 SNumber는 중복 집계됩니다. "
+               "고유 SNumber 수는 '장기 고유 수량' 화면을 이용해주세요.")
+    st.bar_chart(report_df.drop(index='합계')[['PASS', 'FAIL']])
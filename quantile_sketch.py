@@ -0,0 +1,174 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+
+from aggregation import stage_measurement_frame
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# 레벨당 최대 보관 개수 (클수록 정확, 메모리 증가)
+DEFAULT_SKETCH_CAPACITY = 200
+TREND_QUANTILES = {'p1': 0.01, 'p50': 0.50, 'p99': 0.99}
+
+
+def _compact_levels(levels, capacity):
+    """
+    용량을 넘는 레벨을 정렬 후 한 칸 건너 하나씩 남겨 상위 레벨로 올립니다 (KLL 방식 압축).
+    홀수 개일 때 남는 값 하나는 현재 레벨에 그대로 둡니다.
+    """
+    h = 0
+    while h < len(levels):
+        level = levels[h]
+        if len(level) > capacity:
+            level = np.sort(level)
+            keep = level[-1:] if len(level) % 2 else level[:0]
+            pairs = level[:len(level) - len(keep)]
+            # 레벨마다 오프셋을 번갈아 선택해 한쪽으로 치우치지 않도록 합니다.
+            promoted = pairs[h % 2::2]
+            levels[h] = keep
+            if h + 1 == len(levels):
+                levels.append(promoted)
+            else:
+                levels[h + 1] = np.concatenate([levels[h + 1], promoted])
+        h += 1
+    return levels
+
+
+def sketch_from_values(values, capacity=DEFAULT_SKETCH_CAPACITY):
+    """측정값 배열로부터 분위수 스케치를 생성합니다."""
+    values = np.asarray(values, dtype=np.float32)
+    return {'n': len(values), 'levels': _compact_levels([values], capacity)}
+
+
+def merge_sketches(sketches, capacity=DEFAULT_SKETCH_CAPACITY):
+    """여러 분위수 스케치를 레벨별로 이어 붙인 뒤 다시 압축해 하나로 병합합니다."""
+    sketches = [s for s in sketches if s is not None and s['n'] > 0]
+    if not sketches:
+        return {'n': 0, 'levels': []}
+    depth = max(len(s['levels']) for s in sketches)
+    levels = [
+        np.concatenate([s['levels'][h] for s in sketches if h < len(s['levels'])])
+        for h in range(depth)
+    ]
+    return {'n': sum(s['n'] for s in sketches), 'levels': _compact_levels(levels, capacity)}
+
+
+def sketch_quantiles(sketch, quantiles):
+    """스케치에서 분위수(0~1) 목록에 해당하는 값을 추정합니다."""
+    if sketch['n'] == 0:
+        return np.full(len(quantiles), np.nan)
+    values = np.concatenate(sketch['levels'])
+    weights = np.concatenate([np.full(len(level), 2 ** h, dtype=np.float64) for h, level in enumerate(sketch['levels'])])
+    order = np.argsort(values, kind='mergesort')
+    cumulative = np.cumsum(weights[order])
+    targets = np.asarray(quantiles) * cumulative[-1]
+    positions = np.minimum(np.searchsorted(cumulative, targets, side='left'), len(values) - 1)
+    return values[order][positions].astype(np.float64)
+
+
+def build_quantile_sketches(df, capacity=DEFAULT_SKETCH_CAPACITY):
+    """
+    공정별 측정값 컬럼마다 (지그, 일) 단위 분위수 스케치를 생성합니다.
+    Args:
+        df (pd.DataFrame): historyinspection 원본 DataFrame (*_dt 컬럼 변환 완료).
+        capacity (int): 레벨당 최대 보관 개수.
+    Returns:
+        dict: {측정값 컬럼: {(지그, 날짜): 스케치}}
+    """
+    sketches = {}
+    for key in STAGE_ORDER:
+        stage = STAGE_REGISTRY[key]
+        for measure_col in stage['measure_cols']:
+            frame = stage_measurement_frame(df, stage, measure_col)
+            if frame.empty:
+                continue
+            jig_codes, jigs = pd.factorize(frame['jig'], sort=True)
+            day_codes, days = pd.factorize(frame['stamp'].dt.normalize(), sort=True)
+            cell = jig_codes.astype(np.int64) * len(days) + day_codes
+            order = np.argsort(cell, kind='mergesort')
+            cell_sorted = cell[order]
+            boundaries = np.flatnonzero(np.diff(cell_sorted)) + 1
+            groups = np.split(frame['value'].to_numpy()[order], boundaries)
+            cell_ids = cell_sorted[np.concatenate(([0], boundaries))]
+            sketches[measure_col] = {
+                (jigs[c // len(days)], days[c % len(days)].date()): sketch_from_values(values, capacity)
+                for c, values in zip(cell_ids, groups)
+            }
+    return sketches
+
+
+def quantile_trend_frame(measure_sketches, start_date, end_date, jigs=None):
+    """
+    (지그, 일) 스케치로부터 일별 p1/p50/p99 추이를 tidy 형태로 만듭니다.
+    Returns:
+        pd.DataFrame: '구분', '날짜', '분위수', '값' 컬럼.
+    """
+    rows = []
+    for (jig, day), sketch in measure_sketches.items():
+        if day < start_date or day > end_date or (jigs and jig not in jigs):
+            continue
+        for name, value in zip(TREND_QUANTILES, sketch_quantiles(sketch, list(TREND_QUANTILES.values()))):
+            rows.append({'구분': str(jig), '날짜': pd.Timestamp(day), '분위수': name, '값': value})
+    return pd.DataFrame(rows, columns=['구분', '날짜', '분위수', '값'])
+
+
+def range_quantile_table(measure_sketches, start_date, end_date, jigs=None):
+    """기간 내 (지그, 일) 스케치를 지그별로 병합해 기간 전체 분위수 표를 만듭니다."""
+    by_jig = {}
+    for (jig, day), sketch in measure_sketches.items():
+        if start_date <= day <= end_date and (not jigs or jig in jigs):
+            by_jig.setdefault(jig, []).append(sketch)
+    rows = []
+    for jig in sorted(by_jig.keys(), key=str):
+        merged = merge_sketches(by_jig[jig])
+        values = sketch_quantiles(merged, list(TREND_QUANTILES.values()))
+        rows.append({'구분': str(jig), '측정 수': merged['n'], **dict(zip(TREND_QUANTILES, np.round(values, 4)))})
+    return pd.DataFrame(rows)
+
+
+def display_quantile_trends(quantile_sketches):
+    """
+    측정값 분위수(p1/p50/p99) 추이를 지그별로 보여주는 함수
+    """
+    st.markdown("### 측정값 분포 추이 (p1 / p50 / p99)")
+
+    measure_options = {
+        f"{STAGE_REGISTRY[key]['label']} - {col}": col
+        for key in STAGE_ORDER for col in STAGE_REGISTRY[key]['measure_cols'] if col in quantile_sketches
+    }
+    if not measure_options:
+        st.warning("분위수를 계산할 측정값 데이터가 없습니다.")
+        return
+
+    measure_col = measure_options[st.selectbox("측정값 선택", list(measure_options.keys()), key="quantile_measure")]
+    measure_sketches = quantile_sketches[measure_col]
+    days = sorted({day for _, day in measure_sketches.keys()})
+    jig_options = sorted({jig for jig, _ in measure_sketches.keys()}, key=str)
+
+    col_date, col_jig = st.columns(2)
+    with col_date:
+        selected_dates = st.date_input("날짜 범위 선택", value=(days[0], days[-1]),
+                                       min_value=days[0], max_value=days[-1], key=f"quantile_dates_{measure_col}")
+    with col_jig:
+        selected_jigs = st.multiselect("PC (Jig) 선택 (비우면 전체)", jig_options, key=f"quantile_jigs_{measure_col}")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+    start_date, end_date = selected_dates
+
+    st.markdown("#### 기간 전체 분위수")
+    st.table(range_quantile_table(measure_sketches, start_date, end_date, selected_jigs))
+
+    trend_df = quantile_trend_frame(measure_sketches, start_date, end_date, selected_jigs)
+    if trend_df.empty:
+        st.info("선택한 기간에 측정값이 없습니다.")
+        return
+    st.markdown("#### 일별 분위수 추이")
+    chart = alt.Chart(trend_df).mark_line(point=True).encode(
+        x=alt.X('날짜:T', title='날짜'),
+        y=alt.Y('값:Q', title=measure_col, scale=alt.Scale(zero=False)),
+        color=alt.Color('구분:N', title='PC (Jig)'),
+        strokeDash=alt.StrokeDash('분위수:N', title='분위수'),
+        tooltip=['구분', alt.Tooltip('날짜:T', format='%y%m%d'), '분위수', alt.Tooltip('값:Q', format='.4f')],
+    )
+    st.altair_chart(chart, width='stretch')
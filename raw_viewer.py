@@ -0,0 +1,108 @@
+import streamlit as st
+import numpy as np
+
+from aggregation import day_code_mask
+from stage_registry import STAGE_REGISTRY
+
+PAGE_SIZE_OPTIONS = [50, 100, 500, 1000]
+# 로드 시 파생되는 컬럼 (원본 DB 조회에는 표시하지 않음)
+DERIVED_COLUMNS = {'_rowid', 'SerialIdx', 'Lot'} | {stage['date_col'] for stage in STAGE_REGISTRY.values()}
+
+
+def raw_columns(df):
+    """원본 DB 테이블의 컬럼 목록 (로드 시 추가한 파생 컬럼 제외)"""
+    return [col for col in df.columns if col not in DERIVED_COLUMNS]
+
+
+def filter_positions(df, stage, day_codes, start_date, end_date, jig=None):
+    """
+    분석 조건(기간, 지그)에 해당하는 행 위치를 원래 행 순서대로 반환합니다.
+    세션에는 이 조건만 보관하고, 필요할 때 공유 DataFrame에서 df.iloc[positions]로 꺼내 씁니다.
+    기간은 캐시된 날짜 코드(day_codes)의 정수 비교로 거릅니다.
+    Returns:
+        np.ndarray: 행 위치(int64) 배열.
+    """
+    mask = day_code_mask(day_codes, start_date, end_date)
+    if jig is not None:
+        mask &= (df[stage['jig_col']] == jig).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def view_positions(df, stage, day_codes, start_date, end_date, jig=None, sort_col=None, ascending=True):
+    """
+    분석 조건(기간, 지그)에 해당하는 행 위치를 정렬 순서대로 반환합니다.
+    DataFrame을 복사하지 않고 정수 위치 배열만 만들며, 페이지는 이 배열을 잘라 가져옵니다.
+    Args:
+        df (pd.DataFrame): 공유 원본 DataFrame.
+        stage (dict): STAGE_REGISTRY의 공정 정보.
+        day_codes (np.ndarray): 공정의 날짜 코드 배열 (get_stage_day_codes).
+        start_date, end_date (date): 분석 기간.
+        jig (str, optional): 지그(PC). None이면 전체.
+        sort_col (str, optional): 정렬 컬럼. None이면 공정 시각 순.
+        ascending (bool): 오름차순 여부.
+    Returns:
+        np.ndarray: 행 위치(int64) 배열.
+    """
+    positions = filter_positions(df, stage, day_codes, start_date, end_date, jig)
+
+    # 공정 시각 컬럼은 문자열 대신 변환된 datetime으로 정렬합니다. 동률은 원래 행 순서(rowid)를 유지합니다.
+    sort_key = stage['date_col'] if sort_col in (None, stage['stamp_col']) else sort_col
+    values = df[sort_key].iloc[positions].reset_index(drop=True)
+    try:
+        order = values.sort_values(ascending=ascending, kind='mergesort', na_position='last').index.to_numpy()
+    except TypeError:
+        order = values.astype(str).sort_values(ascending=ascending, kind='mergesort').index.to_numpy()
+    return positions[order]
+
+
+def display_raw_viewer(stage_key, df_all_data, get_positions):
+    """
+    원본 DB 조회 결과를 페이지 단위로 보여주는 함수
+    세션에는 조회 조건(기간, 지그)과 정렬 / 페이지 위젯 값만 보관하고, 화면에는 현재 페이지 행만 전송합니다.
+    Args:
+        get_positions (callable): get_positions(stage_key, start, end, jig, sort_col, ascending) → 행 위치 배열 (캐시됨).
+    """
+    view = st.session_state.original_db_view[stage_key]
+    start_date, end_date, jig = view['filter']
+    stage = STAGE_REGISTRY[stage_key]
+    columns = raw_columns(df_all_data)
+
+    col_sort, col_order, col_size = st.columns([0.5, 0.2, 0.3])
+    with col_sort:
+        sort_col = st.selectbox("정렬 컬럼", columns, index=columns.index(stage['stamp_col']) if stage['stamp_col'] in columns else 0,
+                                key=f"raw_sort_{stage_key}")
+    with col_order:
+        ascending = st.radio("정렬 순서", ['오름차순', '내림차순'], horizontal=True, key=f"raw_order_{stage_key}") == '오름차순'
+    with col_size:
+        page_size = st.selectbox("페이지 크기", PAGE_SIZE_OPTIONS, index=1, key=f"raw_page_size_{stage_key}")
+    selected_columns = st.multiselect("표시할 컬럼 (비우면 전체)", columns, key=f"raw_columns_{stage_key}")
+
+    positions = get_positions(stage_key, start_date, end_date, jig, sort_col, ascending)
+    if len(positions) == 0:
+        st.info("조회 조건에 해당하는 원본 데이터가 없습니다.")
+        return
+    # 정렬이 바뀌면 위젯 키가 바뀌어 첫 페이지부터 다시 봅니다.
+    display_page(df_all_data, positions, page_size, f"raw_page_{stage_key}_{sort_col}_{ascending}", selected_columns or columns)
+
+
+def display_page(df_all_data, positions, page_size, key, columns):
+    """
+    행 위치 배열(positions)을 페이지 단위로 보여주는 함수. 화면에는 현재 페이지 행만 전송합니다.
+    페이지 크기나 행 수가 바뀌면 위젯 키가 바뀌어 첫 페이지부터 다시 봅니다.
+    """
+    n_rows = len(positions)
+    n_pages = (n_rows + page_size - 1) // page_size
+    page = st.number_input(f"페이지 (전체 {n_pages:,}쪽, {n_rows:,}행)", min_value=1, max_value=n_pages, value=1,
+                           key=f"{key}_{page_size}_{n_rows}")
+    page_df = df_all_data.iloc[positions[(page - 1) * page_size: page * page_size]]
+    st.dataframe(page_df[columns].reset_index(drop=True), width='stretch')
+
+
+def display_search_results(stage_key, df_all_data, matches):
+    """
+    SNumber 검색 결과를 원본 DB 조회와 같은 방식으로 페이지 단위로 보여주는 함수
+    Args:
+        matches (np.ndarray): 검색어에 해당하는 행 위치 배열 (get_snumber_matches, 캐시됨).
+    """
+    page_size = st.selectbox("검색 결과 페이지 크기", PAGE_SIZE_OPTIONS, index=1, key=f"snumber_page_size_{stage_key}")
+    display_page(df_all_data, matches, page_size, f"snumber_page_{stage_key}", raw_columns(df_all_data))
@@ -0,0 +1,106 @@
+import pandas as pd
+import numpy as np
+import altair as alt
+
+# 리포트 그래프 설정
+MAX_POINTS_PER_SERIES = 300   # 시리즈(지그 × 지표)당 전송하는 최대 점 수 (LTTB 다운샘플링)
+CHART_METRICS = {
+    '총 테스트 수': 'total_test',
+    'PASS': 'pass',
+    '가성불량': 'false_defect',
+    '진성불량': 'true_defect',
+    'FAIL': 'fail',
+}
+
+
+def tidy_report_frame(summary_data, bucket_keys, jigs):
+    """
+    summary_data를 (지그, 버킷, 지표, 값) 형태의 tidy DataFrame으로 변환합니다.
+    Args:
+        summary_data (dict): {지그: {버킷 키: 지표 dict}}
+        bucket_keys (list): 표시할 버킷 키 (문자열 날짜 또는 Timestamp).
+        jigs (list): 표시할 지그 목록.
+    Returns:
+        pd.DataFrame: '구분', '시점', '지표', '값' 컬럼.
+    """
+    bucket_times = pd.to_datetime(pd.Index(bucket_keys))
+    rows = []
+    for jig in jigs:
+        jig_data = summary_data.get(jig, {})
+        for bucket_key, bucket_time in zip(bucket_keys, bucket_times):
+            data_point = jig_data.get(bucket_key)
+            if data_point:
+                for label, metric_key in CHART_METRICS.items():
+                    rows.append((str(jig), bucket_time, label, data_point[metric_key]))
+    return pd.DataFrame(rows, columns=['구분', '시점', '지표', '값'])
+
+
+def tidy_wide_frame(wide, metric_label):
+    """
+    시간 인덱스 × 지그 컬럼 형태의 DataFrame(예: rolling_yield 결과)을 '구분', '시점', '지표', '값' tidy 형식으로 변환합니다.
+    값이 없는(NaN) 시점은 제외합니다.
+    """
+    if wide.empty:
+        return pd.DataFrame(columns=['구분', '시점', '지표', '값'])
+    tidy = wide.rename_axis(index='시점', columns='구분').stack().rename('값').reset_index()
+    tidy['지표'] = metric_label
+    return tidy[['구분', '시점', '지표', '값']]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링으로 남길 점의 인덱스를 고릅니다.
+    첫 점과 마지막 점은 항상 남기며, 각 구간에서 이웃 구간과 가장 큰 삼각형을 이루는 점을 선택합니다.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = [0]
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+        prev = selected[-1]
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        selected.append(start + int(np.argmax(area)))
+    selected.append(n - 1)
+    return np.asarray(selected)
+
+
+def downsample_tidy(tidy, max_points=MAX_POINTS_PER_SERIES):
+    """(지그, 지표) 시리즈마다 점 수가 max_points를 넘으면 LTTB로 줄입니다."""
+    if tidy.empty:
+        return tidy
+    tidy = tidy.sort_values(['구분', '지표', '시점'], kind='mergesort')
+    keep = []
+    for _, series in tidy.groupby(['구분', '지표'], sort=False):
+        if len(series) <= max_points:
+            keep.append(series.index.to_numpy())
+            continue
+        x = series['시점'].to_numpy().astype('datetime64[ns]').astype(np.int64).astype(float)
+        y = series['값'].to_numpy(dtype=float)
+        keep.append(series.index.to_numpy()[lttb_indices(x, y, max_points)])
+    return tidy.loc[np.concatenate(keep)]
+
+
+def report_line_chart(tidy):
+    """지그별 지표 추이 꺾은선 그래프"""
+    return alt.Chart(tidy).mark_line(point=len(tidy) <= 200).encode(
+        x=alt.X('시점:T', title=None),
+        y=alt.Y('값:Q', title=None),
+        color=alt.Color('구분:N', title='PC (Jig)'),
+        tooltip=['구분', alt.Tooltip('시점:T', format='%y-%m-%d %H시'), '지표', '값'],
+    )
+
+
+def report_bar_chart(tidy):
+    """지그별 지표 막대 그래프 (버킷마다 지그를 나란히 표시)"""
+    return alt.Chart(tidy).mark_bar().encode(
+        x=alt.X('시점:T', title=None),
+        xOffset='구분:N',
+        y=alt.Y('값:Q', title=None),
+        color=alt.Color('구분:N', title='PC (Jig)'),
+        tooltip=['구분', alt.Tooltip('시점:T', format='%y-%m-%d %H시'), '지표', '값'],
+    )
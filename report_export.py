@@ -0,0 +1,100 @@
+import pandas as pd
+import numpy as np
+import io
+import re
+
+from aggregation import UNIT_CATEGORIES
+from report_charts import CHART_METRICS
+
+# 내보내기 형식: 표시 이름 → (확장자, MIME 타입)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel (XLSX)': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+# 엑셀 시트 이름 제한 (31자, 일부 특수문자 불가)
+_MAX_SHEET_NAME = 31
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def report_table(summary_data, jig, bucket_keys, bucket_labels):
+    """
+    지그 하나의 리포트 표(지표 × 집계 단위)를 만듭니다. 데이터가 없는 집계 단위는 'N/A'로 표시합니다.
+    """
+    report_data = {'지표': list(CHART_METRICS.keys())}
+    for bucket_key, label in zip(bucket_keys, bucket_labels):
+        data_point = summary_data[jig].get(bucket_key)
+        if data_point:
+            report_data[label] = [data_point[metric_key] for metric_key in CHART_METRICS.values()]
+        else:
+            report_data[label] = ['N/A'] * len(CHART_METRICS)
+    return pd.DataFrame(report_data)
+
+
+def detail_table(categories, serials):
+    """지그 하나의 분류별(PASS / 가성불량 / 진성불량 / FAIL) SNumber 목록을 분류별 컬럼으로 만듭니다."""
+    if not categories:
+        return pd.DataFrame(columns=UNIT_CATEGORIES)
+    return pd.DataFrame({
+        category: pd.Series(np.sort(np.asarray(serials.take(categories[category]), dtype=str)), dtype=object)
+        for category in UNIT_CATEGORIES
+    })
+
+
+def _sheet_name(name, used):
+    """엑셀에서 허용하는 고유 시트 이름을 만듭니다."""
+    base = _INVALID_SHEET_CHARS.sub('_', str(name))[:_MAX_SHEET_NAME] or 'Sheet'
+    candidate, n = base, 1
+    while candidate.lower() in used:
+        n += 1
+        suffix = f" ({n})"
+        candidate = base[:_MAX_SHEET_NAME - len(suffix)] + suffix
+    used.add(candidate.lower())
+    return candidate
+
+
+def build_report_export(export_format, summary_data, bucket_keys, bucket_labels, jigs, unit_sets, serials):
+    """
+    분석 리포트를 내보내기 파일(bytes)로 만듭니다. 다운로드 버튼을 눌렀을 때만 호출됩니다.
+    - CSV: 지그별 리포트 표를 이어 붙인 파일 (기존 다운로드 형식)
+    - Parquet: (구분, 시점, 지표, 값) 형태의 집계 표
+    - Excel: 지그별 리포트 시트와 SNumber 상세 목록 시트
+    Args:
+        export_format (str): EXPORT_FORMATS의 표시 이름.
+        summary_data (dict): {지그: {버킷 키: 지표 dict}}
+        bucket_keys, bucket_labels (list): 표시할 버킷 키와 라벨.
+        jigs (list): 내보낼 지그 목록.
+        unit_sets (dict): analyze_data가 만든 지그별 분류 SerialIdx 배열.
+        serials (pd.Index): SerialIdx → SNumber.
+    Returns:
+        bytes: 파일 내용.
+    """
+    if export_format == 'CSV':
+        text = "".join(report_table(summary_data, jig, bucket_keys, bucket_labels).to_csv(index=False) + "\n" for jig in jigs)
+        return text.encode('utf-8-sig')
+
+    if export_format == 'Parquet':
+        rows = [
+            (str(jig), label, metric_label, data_point[metric_key])
+            for jig in jigs
+            for bucket_key, label in zip(bucket_keys, bucket_labels)
+            if (data_point := summary_data[jig].get(bucket_key))
+            for metric_label, metric_key in CHART_METRICS.items()
+        ]
+        tidy = pd.DataFrame(rows, columns=['구분', '시점', '지표', '값']).astype({'값': 'int64'})
+        buffer = io.BytesIO()
+        tidy.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+
+    if export_format == 'Excel (XLSX)':
+        buffer = io.BytesIO()
+        used_names = set()
+        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+            for jig in jigs:
+                report_table(summary_data, jig, bucket_keys, bucket_labels).to_excel(
+                    writer, sheet_name=_sheet_name(jig, used_names), index=False)
+                detail_table(unit_sets.get(jig, {}).get('range'), serials).to_excel(
+                    writer, sheet_name=_sheet_name(f"{jig} 상세", used_names), index=False)
+        return buffer.getvalue()
+
+    raise ValueError(f"지원하지 않는 내보내기 형식입니다: {export_format}")
@@ -0,0 +1,120 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from aggregation import normalize_pass_status
+
+# 재검사 과다로 판단하는 기본 검사 횟수
+DEFAULT_EXCESSIVE_ATTEMPTS = 3
+
+
+def analyze_retests(df, date_col_name, jig_col_name, pass_col_name):
+    """
+    SNumber별 검사 이력을 시간 순으로 한 번 정렬해 재검사 지표를 계산합니다.
+    SNumber는 첫 검사를 받은 지그(PC)에 귀속됩니다.
+    Args:
+        df (pd.DataFrame): 분석 기간으로 필터링된 DataFrame.
+        date_col_name (str): 날짜/시간 컬럼명.
+        jig_col_name (str): 지그(PC) 컬럼명.
+        pass_col_name (str): 공정의 합격 여부 컬럼명.
+    Returns:
+        pd.DataFrame: SNumber별 'jig', 'first_pass', 'attempts_to_pass', 'total_attempts' 컬럼.
+    """
+    columns = ['SNumber', 'jig', 'first_pass', 'attempts_to_pass', 'total_attempts']
+    if df.empty or 'SNumber' not in df.columns or date_col_name not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    work = pd.DataFrame({
+        'SNumber': df['SNumber'],
+        'stamp': df[date_col_name],
+        'jig': df[jig_col_name] if jig_col_name in df.columns else '전체',
+        'is_pass': (normalize_pass_status(df[pass_col_name]) == 'O') if pass_col_name in df.columns else False,
+    }).dropna(subset=['SNumber', 'stamp'])
+    if work.empty:
+        return pd.DataFrame(columns=columns)
+
+    # 단 한 번의 정렬 후 cumcount로 검사 차수를 매깁니다.
+    work = work.sort_values(['SNumber', 'stamp'], kind='mergesort')
+    work['attempt'] = work.groupby('SNumber', sort=False).cumcount() + 1
+
+    units = work[work['attempt'] == 1][['SNumber', 'jig', 'is_pass']].rename(columns={'is_pass': 'first_pass'})
+    units = units.set_index('SNumber')
+    # 정렬된 상태이므로 SNumber별 첫 PASS 행 / 마지막 행이 곧 합격 차수 / 총 검사 횟수입니다.
+    first_pass_rows = work[work['is_pass']].drop_duplicates('SNumber', keep='first').set_index('SNumber')
+    last_rows = work.drop_duplicates('SNumber', keep='last').set_index('SNumber')
+    units['attempts_to_pass'] = first_pass_rows['attempt'].reindex(units.index)
+    units['total_attempts'] = last_rows['attempt'].reindex(units.index)
+    return units.reset_index()[columns]
+
+
+def summarize_retests(units, excessive_attempts=DEFAULT_EXCESSIVE_ATTEMPTS, group_col='jig'):
+    """
+    analyze_retests() 결과를 그룹(기본: 지그)별 재검사 요약과 합격 차수 분포로 집계합니다.
+    Returns:
+        tuple: (그룹별 요약 DataFrame, 그룹 × 합격 차수 분포 DataFrame)
+    """
+    passed = units['attempts_to_pass'].notna()
+    summary = pd.DataFrame({
+        group_col: units[group_col],
+        'units': 1,
+        'first_pass': units['first_pass'].astype(int),
+        'final_pass': passed.astype(int),
+        'retest_units': (units['total_attempts'] > 1).astype(int),
+        'excessive': (units['total_attempts'] >= excessive_attempts).astype(int),
+        'total_attempts': units['total_attempts'],
+    }).groupby(group_col, sort=True).sum()
+    summary['FPY(%)'] = (100 * summary['first_pass'] / summary['units']).round(2)
+    summary['최종 수율(%)'] = (100 * summary['final_pass'] / summary['units']).round(2)
+    summary['평균 검사 횟수'] = (summary['total_attempts'] / summary['units']).round(2)
+    summary = summary.rename(columns={
+        'units': '총 SNumber', 'first_pass': '최초 합격', 'final_pass': '최종 합격',
+        'retest_units': '재검사 SNumber', 'excessive': f'{excessive_attempts}회 이상 검사',
+    }).drop(columns=['total_attempts'])
+
+    # 합격 차수 분포: 1회, 2회, ..., N회 이상, 미합격
+    attempts = units['attempts_to_pass'].to_numpy(dtype=float)
+    bucket = np.where(np.isnan(attempts), excessive_attempts + 1, np.minimum(np.nan_to_num(attempts), excessive_attempts))
+    bucket_labels = {i: f"{i}회" for i in range(1, excessive_attempts)}
+    bucket_labels[excessive_attempts] = f"{excessive_attempts}회 이상"
+    bucket_labels[excessive_attempts + 1] = "미합격"
+    histogram = pd.crosstab(units[group_col].to_numpy(), bucket.astype(int))
+    histogram = histogram.reindex(columns=list(bucket_labels.keys()), fill_value=0).rename(columns=bucket_labels)
+    histogram.index.name = group_col
+    histogram.columns.name = None
+    return summary, histogram
+
+
+def display_retest_analysis(analysis_key, load_units):
+    """
+    재검사 분석(최초 합격률, 합격 차수 분포, 재검사 과다 SNumber)을 보여주는 함수
+    Args:
+        load_units (callable): 분석 조건의 SNumber별 재검사 이력(analyze_retests 결과)을 반환하는 함수 (캐시됨).
+    """
+    st.markdown("---")
+    st.subheader("재검사 분석")
+    if not st.toggle("재검사 분석 보기", key=f"show_retest_{analysis_key}"):
+        return
+
+    excessive_attempts = st.number_input("재검사 과다 기준 (검사 횟수)", min_value=2, max_value=20,
+                                         value=DEFAULT_EXCESSIVE_ATTEMPTS, key=f"retest_limit_{analysis_key}")
+
+    units = load_units()
+    if units.empty:
+        st.info("재검사 분석에 사용할 데이터가 없습니다.")
+        return
+
+    summary, histogram = summarize_retests(units, excessive_attempts)
+    summary.index.name = '구분'
+    histogram.index.name = '구분'
+
+    st.markdown("#### PC (Jig)별 최초 합격률")
+    st.dataframe(summary, width='stretch')
+    st.markdown("#### 합격까지의 검사 횟수 분포")
+    st.dataframe(histogram, width='stretch')
+    st.bar_chart(histogram.T)
+
+    excessive_df = units[units['total_attempts'] >= excessive_attempts].sort_values('total_attempts', ascending=False)
+    with st.expander(f"재검사 과다 SNumber ({len(excessive_df)}건)", expanded=False):
+        st.dataframe(excessive_df.rename(columns={
+            'jig': '구분', 'first_pass': '최초 합격', 'attempts_to_pass': '합격 차수', 'total_attempts': '총 검사 횟수',
+        }).reset_index(drop=True), width='stretch')
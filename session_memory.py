@@ -0,0 +1,52 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import sys
+
+# 세션 메모리 경고 기준 (바이트). 세션에는 조회 조건과 위젯 값만 두므로 보통 수 KB입니다.
+SESSION_MEMORY_WARN_BYTES = 1024 * 1024
+
+
+def estimate_size(obj, _seen=None):
+    """
+    객체가 차지하는 메모리(바이트)를 추정합니다.
+    DataFrame / Series는 memory_usage(deep=True), numpy 배열은 nbytes를 사용하고, 컨테이너는 내용을 재귀적으로 합산합니다.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in obj)
+    return size
+
+
+def session_memory_usage(state):
+    """세션 상태 키별 메모리 사용량(바이트)을 큰 순서로 반환합니다."""
+    sizes = pd.Series({str(key): estimate_size(value) for key, value in state.items()}, dtype='int64')
+    return sizes.sort_values(ascending=False)
+
+
+def display_session_memory():
+    """
+    현재 세션이 보관하는 상태의 메모리 사용량을 사이드바에 보여주는 함수
+    공유 캐시(전체 데이터, 분석 결과)는 모든 세션이 함께 쓰므로 포함하지 않습니다.
+    """
+    sizes = session_memory_usage(st.session_state.to_dict())
+    total = int(sizes.sum())
+    st.sidebar.caption(f"세션 메모리: {total / 1024:,.1f} KB")
+    if total > SESSION_MEMORY_WARN_BYTES:
+        st.sidebar.warning("세션 상태가 1 MB를 넘었습니다. 세션에 DataFrame이 저장되지 않았는지 확인해주세요.")
+    with st.sidebar.expander("세션 메모리 상세", expanded=False):
+        st.dataframe((sizes / 1024).round(2).rename('KB'), width='stretch')
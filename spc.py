@@ -0,0 +1,238 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+import threading
+from collections import deque
+
+from aggregation import stage_measurement_frame
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# SPC 설정
+SUBGROUP_SIZE = 5            # X-bar / R 관리도 부분군 크기
+XBAR_A2 = 0.577              # n=5 관리도 상수
+R_D3, R_D4 = 0.0, 2.114
+EWMA_LAMBDA = 0.2            # EWMA 가중치
+EWMA_L = 3.0                 # EWMA 관리 한계 폭 (시그마 배수)
+CUSUM_K = 0.5                # CUSUM 허용 편차 (시그마 단위)
+CUSUM_H = 5.0                # CUSUM 판정 한계 (시그마 단위)
+SPC_WARMUP_ROWS = 20000      # 모니터 시작 시 기준선 산출에 사용할 최근 행 수
+MIN_BASELINE_VALUES = 125    # 기준선을 고정하는 데 필요한 최소 측정 수 (부분군 25개)
+MAX_CHART_POINTS = 500       # 관리도에 보관하는 최근 점 개수
+
+
+def new_spc_monitor():
+    """프로세스 전체에서 공유하는 SPC 모니터 상태를 생성합니다."""
+    return {'last_rowid': None, 'charts': {}, 'lock': threading.Lock()}
+
+
+def new_chart_state():
+    """(측정값, 지그) 하나의 관리도 상태를 생성합니다."""
+    return {
+        # Welford 누적 통계
+        'n': 0, 'mean': 0.0, 'm2': 0.0,
+        # 관리 기준선 (워밍업 데이터로 고정, 재설정 가능)
+        'target_mean': None, 'target_std': None,
+        # EWMA / CUSUM 상태
+        'ewma': None, 'cusum_hi': 0.0, 'cusum_lo': 0.0,
+        # X-bar / R 부분군 상태
+        'subgroup': [], 'xbar_sum': 0.0, 'range_sum': 0.0, 'subgroup_count': 0,
+        # 관리도 표시용 최근 점
+        'points': deque(maxlen=MAX_CHART_POINTS),
+        'subgroups': deque(maxlen=MAX_CHART_POINTS),
+    }
+
+
+def welford_update(state, value):
+    """Welford 방식으로 평균/분산을 O(1)에 갱신합니다."""
+    state['n'] += 1
+    delta = value - state['mean']
+    state['mean'] += delta / state['n']
+    state['m2'] += delta * (value - state['mean'])
+
+
+def running_std(state):
+    """Welford 상태의 표본 표준편차"""
+    return float(np.sqrt(state['m2'] / (state['n'] - 1))) if state['n'] > 1 else 0.0
+
+
+def reset_baseline(state):
+    """
+    현재 Welford 통계를 새 관리 기준선으로 고정하고 EWMA / CUSUM을 초기화합니다.
+    X-bar / R 관리 한계도 재설정 이후의 부분군으로만 다시 계산하도록 부분군 누적값과 이력을 비웁니다.
+    """
+    state['target_mean'] = state['mean']
+    state['target_std'] = running_std(state) or 1.0
+    state['ewma'] = state['target_mean']
+    state['cusum_hi'] = state['cusum_lo'] = 0.0
+    state['subgroup'] = []
+    state['xbar_sum'] = state['range_sum'] = 0.0
+    state['subgroup_count'] = 0
+    state['subgroups'].clear()
+
+
+def update_chart_state(state, stamp, value):
+    """
+    새 측정값 하나로 관리도 상태를 갱신합니다. 비용은 행당 O(1)입니다.
+    기준선이 정해지기 전까지는 통계만 누적하며, 고정은 refresh_spc_monitor()가 읽은 묶음을 모두 반영한 뒤 수행합니다.
+    """
+    welford_update(state, value)
+    if state['target_mean'] is None:
+        return
+
+    mu, sigma = state['target_mean'], state['target_std']
+    state['ewma'] = EWMA_LAMBDA * value + (1 - EWMA_LAMBDA) * state['ewma']
+    z = (value - mu) / sigma
+    state['cusum_hi'] = max(0.0, state['cusum_hi'] + z - CUSUM_K)
+    state['cusum_lo'] = max(0.0, state['cusum_lo'] - z - CUSUM_K)
+    state['points'].append((stamp, value, state['ewma'], state['cusum_hi'], state['cusum_lo']))
+
+    state['subgroup'].append(value)
+    if len(state['subgroup']) == SUBGROUP_SIZE:
+        xbar = sum(state['subgroup']) / SUBGROUP_SIZE
+        value_range = max(state['subgroup']) - min(state['subgroup'])
+        state['xbar_sum'] += xbar
+        state['range_sum'] += value_range
+        state['subgroup_count'] += 1
+        state['subgroups'].append((stamp, xbar, value_range))
+        state['subgroup'] = []
+
+
+def refresh_spc_monitor(monitor, fetch_rows):
+    """
+    마지막으로 처리한 rowid 이후의 행만 읽어 모든 관리도 상태를 갱신합니다.
+    기준선은 읽은 묶음(첫 실행에서는 워밍업 SPC_WARMUP_ROWS 행)을 모두 반영한 뒤, 측정 수가 MIN_BASELINE_VALUES 이상인
+    관리도만 고정합니다. 측정 수가 부족한 지그는 이후 묶음까지 통계를 더 누적한 뒤 고정합니다.
+    Args:
+        monitor (dict): new_spc_monitor()로 만든 공유 상태.
+        fetch_rows (callable): fetch_rows(last_rowid, tail) → '_rowid'와 *_dt 컬럼이 있는 DataFrame.
+                               last_rowid가 None이면 최근 tail 행을 반환해야 합니다.
+    Returns:
+        int: 이번에 처리한 행 수.
+    """
+    with monitor['lock']:
+        new_rows = fetch_rows(monitor['last_rowid'], SPC_WARMUP_ROWS)
+        if new_rows is None or new_rows.empty:
+            return 0
+        for key in STAGE_ORDER:
+            stage = STAGE_REGISTRY[key]
+            for measure_col in stage['measure_cols']:
+                frame = stage_measurement_frame(new_rows, stage, measure_col)
+                if frame.empty:
+                    continue
+                frame = frame.sort_values('stamp', kind='mergesort')
+                for jig, group in frame.groupby('jig', sort=False):
+                    state = monitor['charts'].setdefault((measure_col, jig), new_chart_state())
+                    for stamp, value in zip(group['stamp'].to_numpy(), group['value'].to_numpy(dtype=float)):
+                        update_chart_state(state, stamp, value)
+        for state in monitor['charts'].values():
+            if state['target_mean'] is None and state['n'] >= MIN_BASELINE_VALUES:
+                reset_baseline(state)
+        monitor['last_rowid'] = int(new_rows['_rowid'].max())
+        return len(new_rows)
+
+
+def chart_frames(state):
+    """
+    관리도 상태를 관리 한계와 이탈 여부가 포함된 DataFrame으로 변환합니다.
+    Returns:
+        tuple: (개별 점 DataFrame(EWMA/CUSUM), 부분군 DataFrame(X-bar/R), 관리 한계 dict)
+    """
+    mu, sigma = state['target_mean'], state['target_std']
+    limits = {'mean': mu, 'sigma': sigma}
+    ewma_width = EWMA_L * sigma * np.sqrt(EWMA_LAMBDA / (2 - EWMA_LAMBDA))
+    limits.update({'ewma_ucl': mu + ewma_width, 'ewma_lcl': mu - ewma_width})
+
+    points = pd.DataFrame(list(state['points']), columns=['stamp', 'value', 'ewma', 'cusum_hi', 'cusum_lo'])
+    points['ewma_ooc'] = (points['ewma'] > limits['ewma_ucl']) | (points['ewma'] < limits['ewma_lcl'])
+    points['cusum_ooc'] = (points['cusum_hi'] > CUSUM_H) | (points['cusum_lo'] > CUSUM_H)
+
+    subgroups = pd.DataFrame(list(state['subgroups']), columns=['stamp', 'xbar', 'range'])
+    if state['subgroup_count']:
+        xbarbar = state['xbar_sum'] / state['subgroup_count']
+        rbar = state['range_sum'] / state['subgroup_count']
+        limits.update({
+            'xbar_cl': xbarbar, 'xbar_ucl': xbarbar + XBAR_A2 * rbar, 'xbar_lcl': xbarbar - XBAR_A2 * rbar,
+            'r_cl': rbar, 'r_ucl': R_D4 * rbar, 'r_lcl': R_D3 * rbar,
+        })
+        subgroups['xbar_ooc'] = (subgroups['xbar'] > limits['xbar_ucl']) | (subgroups['xbar'] < limits['xbar_lcl'])
+        subgroups['range_ooc'] = (subgroups['range'] > limits['r_ucl']) | (subgroups['range'] < limits['r_lcl'])
+    return points, subgroups, limits
+
+
+def _control_chart(frame, value_col, ooc_col, limit_values, title):
+    """관리 한계선과 이탈 점(빨간색)을 표시하는 altair 관리도"""
+    base = alt.Chart(frame).encode(x=alt.X('stamp:T', title='시간'))
+    line = base.mark_line(color='#4c78a8').encode(y=alt.Y(f'{value_col}:Q', title=title, scale=alt.Scale(zero=False)))
+    points = base.mark_circle(size=40).encode(
+        y=f'{value_col}:Q',
+        color=alt.condition(f'datum.{ooc_col}', alt.value('#e45756'), alt.value('#4c78a8')),
+        tooltip=[alt.Tooltip('stamp:T', format='%y%m%d %H:%M:%S'), alt.Tooltip(f'{value_col}:Q', format='.4f')],
+    )
+    rules = alt.Chart(pd.DataFrame({'limit': list(limit_values.values()), 'name': list(limit_values.keys())})).mark_rule(
+        strokeDash=[4, 4], color='gray').encode(y='limit:Q', tooltip=['name', alt.Tooltip('limit:Q', format='.4f')])
+    return (line + points + rules).properties(title=title, height=220)
+
+
+def display_spc_charts(monitor):
+    """
+    지그별 SPC 관리도(X-bar/R, EWMA, CUSUM)를 보여주는 함수
+    """
+    st.markdown("### SPC 관리도 (X-bar/R, EWMA, CUSUM)")
+    st.caption(f"새로 추가된 행만 반영해 관리도 상태를 갱신합니다. 마지막 처리 rowid: {monitor['last_rowid']}")
+
+    measure_options = {
+        f"{STAGE_REGISTRY[key]['label']} - {col}": col
+        for key in STAGE_ORDER for col in STAGE_REGISTRY[key]['measure_cols']
+    }
+    col_measure, col_jig = st.columns(2)
+    with col_measure:
+        measure_col = measure_options[st.selectbox("측정값 선택", list(measure_options.keys()), key="spc_measure")]
+    jigs = sorted([jig for col, jig in monitor['charts'].keys() if col == measure_col], key=str)
+    if not jigs:
+        st.info("관리도를 그릴 측정값 데이터가 없습니다.")
+        return
+    with col_jig:
+        jig = st.selectbox("PC (Jig) 선택", jigs, key=f"spc_jig_{measure_col}")
+
+    # 전체 지그 요약
+    summary_rows = []
+    for j in jigs:
+        state = monitor['charts'][(measure_col, j)]
+        summary_rows.append({
+            '구분': str(j), '측정 수': state['n'], '평균': round(state['mean'], 4), '표준편차': round(running_std(state), 4),
+            'EWMA': None if state['ewma'] is None else round(state['ewma'], 4),
+            'CUSUM+': round(state['cusum_hi'], 2), 'CUSUM-': round(state['cusum_lo'], 2),
+        })
+    st.table(pd.DataFrame(summary_rows))
+
+    state = monitor['charts'][(measure_col, jig)]
+    if state['target_mean'] is None or not state['points']:
+        st.info(f"기준선을 계산하기에 데이터가 부족합니다. (측정 {state['n']}개 / 최소 {MIN_BASELINE_VALUES}개)")
+        return
+    if st.button("현재 통계로 기준선 재설정", key=f"spc_reset_{measure_col}_{jig}"):
+        with monitor['lock']:
+            reset_baseline(state)
+
+    points, subgroups, limits = chart_frames(state)
+    st.write(f"**기준선**: 평균 {limits['mean']:.4f}, 표준편차 {limits['sigma']:.4f}")
+
+    if not subgroups.empty and 'xbar_ooc' in subgroups:
+        st.altair_chart(_control_chart(subgroups, 'xbar', 'xbar_ooc',
+                                       {'CL': limits['xbar_cl'], 'UCL': limits['xbar_ucl'], 'LCL': limits['xbar_lcl']},
+                                       'X-bar 관리도'), width='stretch')
+        st.altair_chart(_control_chart(subgroups, 'range', 'range_ooc',
+                                       {'CL': limits['r_cl'], 'UCL': limits['r_ucl'], 'LCL': limits['r_lcl']},
+                                       'R 관리도'), width='stretch')
+    st.altair_chart(_control_chart(points, 'ewma', 'ewma_ooc',
+                                   {'CL': limits['mean'], 'UCL': limits['ewma_ucl'], 'LCL': limits['ewma_lcl']},
+                                   'EWMA 관리도'), width='stretch')
+    cusum_df = points.assign(cusum=np.maximum(points['cusum_hi'], points['cusum_lo']))
+    st.altair_chart(_control_chart(cusum_df, 'cusum', 'cusum_ooc', {'H': CUSUM_H}, 'CUSUM 관리도 (시그마 단위)'),
+                    width='stretch')
+
+    ooc_count = int(points['ewma_ooc'].sum() + points['cusum_ooc'].sum())
+    if 'xbar_ooc' in subgroups:
+        ooc_count += int(subgroups['xbar_ooc'].sum() + subgroups['range_ooc'].sum())
+    if ooc_count:
+        st.warning(f"최근 관리도에서 관리 한계를 벗어난 점이 {ooc_count}개 있습니다.")
@@ -0,0 +1,188 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from aggregation import day_code_mask, normalize_pass_status, stage_measurement_frame, summarize_unit_flags, unit_flags
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# 측정값별 기본 규격 (LSL, USL). None은 해당 방향 규격 없음을 의미합니다.
+# 실제 규격은 화면의 규격 표에서 수정합니다.
+DEFAULT_SPEC_LIMITS = {
+    col: {'LSL': None, 'USL': None}
+    for key in STAGE_ORDER for col in STAGE_REGISTRY[key]['measure_cols']
+}
+
+
+def reevaluate_pass_status(df, stage, spec_limits):
+    """
+    측정값 컬럼을 새 규격으로 다시 판정해 행 단위 합격 여부('O'/'X')를 만듭니다.
+    테스터 판정 'O' 행 중 규격이 지정된 측정값이 새 규격을 벗어난 행만 'X'로 바꾸며, 그 외 행은 기존 판정을 유지합니다.
+    테스터의 'X'는 다른 검사 항목 때문일 수 있고 DB에는 불량 원인이 기록되지 않으므로, 규격을 완화해도 'O'로 바꾸지 않습니다.
+    Args:
+        df (pd.DataFrame): 공정 기간으로 필터링된 DataFrame.
+        stage (dict): STAGE_REGISTRY의 공정 정보.
+        spec_limits (dict): {측정값 컬럼: {'LSL': float|None, 'USL': float|None}}
+    Returns:
+        pd.Series: 재판정된 합격 여부.
+    """
+    original = normalize_pass_status(df[stage['pass_col']])
+    within = pd.Series(True, index=df.index)
+    for col in stage['measure_cols']:
+        limits = spec_limits.get(col, {})
+        lsl, usl = limits.get('LSL'), limits.get('USL')
+        if col not in df.columns or (pd.isna(lsl) and pd.isna(usl)):
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        has_value = values.notna()
+        ok = pd.Series(True, index=df.index)
+        if not pd.isna(lsl):
+            ok &= values >= lsl
+        if not pd.isna(usl):
+            ok &= values <= usl
+        within &= ok | ~has_value
+    return original.mask((original == 'O') & ~within, 'X')
+
+
+def yield_comparison(df, stage, spec_limits):
+    """
+    기존 판정과 새 규격 판정의 지그별 SNumber 단위 수율을 비교합니다.
+    """
+    if stage['jig_col'] in df.columns and not df[stage['jig_col']].isnull().all():
+        jig_values = df[stage['jig_col']]
+    else:
+        jig_values = pd.Series('전체', index=df.index)
+    work = pd.DataFrame({
+        'jig': jig_values,
+        'SNumber': df['SNumber'],
+        'original': normalize_pass_status(df[stage['pass_col']]),
+        'new': reevaluate_pass_status(df, stage, spec_limits),
+    }).dropna(subset=['jig', 'SNumber'])
+
+    original = summarize_unit_flags(unit_flags(work, ['jig'], 'original'), ['jig'])
+    new = summarize_unit_flags(unit_flags(work, ['jig'], 'new'), ['jig'])
+    result = pd.DataFrame({
+        '총 SNumber': original['total_test'],
+        '기존 PASS': original['pass'],
+        '신규 PASS': new['pass'],
+        '기존 수율(%)': (100 * original['pass'] / original['total_test']).round(2),
+        '신규 수율(%)': (100 * new['pass'] / new['total_test']).round(2),
+        '기존 가성불량': original['false_defect'],
+        '신규 가성불량': new['false_defect'],
+    })
+    result.index = result.index.map(str)
+    result.index.name = '구분'
+    return result
+
+
+def capability_indices(frame, lsl, usl):
+    """
+    (지그, 일, 시간) 단위 모멘트(개수, 합, 제곱합)를 한 번에 집계해 지그 × 일별 Cpk / Ppk를 계산합니다.
+    Cpk는 시간 부분군 내 합동 표준편차, Ppk는 전체 표준편차를 사용합니다.
+    Args:
+        frame (pd.DataFrame): stage_measurement_frame() 결과.
+        lsl, usl (float or None): 규격 하한 / 상한.
+    Returns:
+        pd.DataFrame: 'jig', 'day', 'n', 'mean', 'Cpk', 'Ppk' 컬럼.
+    """
+    values = frame['value'].to_numpy(dtype=float)
+    moments = pd.DataFrame({
+        'jig': frame['jig'].to_numpy(),
+        'day': frame['stamp'].dt.normalize().to_numpy(),
+        'hour': frame['stamp'].dt.hour.to_numpy(),
+        'n': 1, 's1': values, 's2': values * values,
+    }).groupby(['jig', 'day', 'hour'], sort=True)[['n', 's1', 's2']].sum()
+
+    # 시간 부분군 내 편차 제곱합: Σx² - (Σx)² / n
+    moments['within_ss'] = moments['s2'] - moments['s1'] ** 2 / moments['n']
+    moments['within_df'] = moments['n'] - 1
+    daily = moments.groupby(level=['jig', 'day'], sort=True)[['n', 's1', 's2', 'within_ss', 'within_df']].sum()
+
+    n = daily['n'].to_numpy(dtype=float)
+    mean = daily['s1'].to_numpy() / n
+    overall_var = (daily['s2'].to_numpy() - n * mean * mean) / np.maximum(n - 1, 1)
+    within_var = daily['within_ss'].to_numpy() / np.maximum(daily['within_df'].to_numpy(), 1)
+    sigma_overall = np.sqrt(np.maximum(overall_var, 0))
+    sigma_within = np.sqrt(np.maximum(within_var, 0))
+
+    def _index(sigma):
+        upper = (usl - mean) / (3 * sigma) if not pd.isna(usl) else np.full(len(mean), np.inf)
+        lower = (mean - lsl) / (3 * sigma) if not pd.isna(lsl) else np.full(len(mean), np.inf)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            index = np.minimum(upper, lower)
+        return np.where((sigma > 0) & np.isfinite(index), index, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = daily.reset_index()[['jig', 'day', 'n']]
+        result['mean'] = mean
+        result['Cpk'] = _index(sigma_within)
+        result['Ppk'] = _index(sigma_overall)
+    return result
+
+
+def display_spec_reevaluation(df_all_data, get_day_codes):
+    """
+    규격(LSL/USL) 변경 시 수율과 Cpk / Ppk를 다시 계산해 보여주는 함수
+    Args:
+        get_day_codes (callable): get_day_codes(stage_key) → 캐시된 공정별 날짜 코드 {'codes', 'range'}.
+    """
+    st.markdown("### 규격 재평가 (LSL / USL)")
+
+    stage_labels = {STAGE_REGISTRY[key]['label']: key for key in STAGE_ORDER if STAGE_REGISTRY[key]['measure_cols']}
+    stage_key = stage_labels[st.selectbox("공정 선택", list(stage_labels.keys()), key="spec_stage")]
+    stage = STAGE_REGISTRY[stage_key]
+
+    day_codes = get_day_codes(stage_key)
+    if day_codes['range'] is None:
+        st.warning("선택한 공정의 데이터가 없습니다.")
+        return
+    selected_dates = st.date_input("날짜 범위 선택", value=day_codes['range'], key=f"spec_dates_{stage_key}")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+
+    # 규격 표는 세션에 보관하며, 수정하면 즉시 재계산됩니다.
+    if 'spec_limits' not in st.session_state:
+        st.session_state.spec_limits = {col: dict(limits) for col, limits in DEFAULT_SPEC_LIMITS.items()}
+    spec_df = pd.DataFrame([
+        {'측정값': col, 'LSL': st.session_state.spec_limits[col]['LSL'], 'USL': st.session_state.spec_limits[col]['USL']}
+        for col in stage['measure_cols']
+    ]).astype({'LSL': float, 'USL': float})
+    edited = st.data_editor(spec_df, disabled=['측정값'], hide_index=True, width='stretch',
+                            key=f"spec_editor_{stage_key}")
+    for row in edited.itertuples(index=False):
+        st.session_state.spec_limits[row[0]] = {'LSL': None if pd.isna(row[1]) else float(row[1]),
+                                                'USL': None if pd.isna(row[2]) else float(row[2])}
+    spec_limits = st.session_state.spec_limits
+
+    start_date, end_date = selected_dates
+    in_range = day_code_mask(day_codes['codes'], start_date, end_date)
+    df_range = df_all_data[in_range & df_all_data['SNumber'].notna().to_numpy()]
+    if df_range.empty:
+        st.info("선택한 기간에 데이터가 없습니다.")
+        return
+
+    if all(pd.isna(spec_limits[col]['LSL']) and pd.isna(spec_limits[col]['USL']) for col in stage['measure_cols']):
+        st.info("규격 표에 LSL 또는 USL을 입력하면 수율과 공정능력지수를 계산합니다.")
+        return
+
+    st.markdown("#### 규격 변경 전 / 후 수율")
+    st.caption("새 규격은 테스터 PASS 행 중 규격을 벗어난 행만 불합격으로 바꾸며, 테스터 FAIL 행은 규격을 완화해도 그대로 유지됩니다.")
+    st.dataframe(yield_comparison(df_range, stage, spec_limits), width='stretch')
+
+    st.markdown("#### 공정능력지수 (Cpk / Ppk)")
+    measure_col = st.selectbox("측정값 선택", stage['measure_cols'], key=f"spec_measure_{stage_key}")
+    lsl, usl = spec_limits[measure_col]['LSL'], spec_limits[measure_col]['USL']
+    if lsl is None and usl is None:
+        st.info(f"{measure_col}의 규격이 입력되지 않았습니다.")
+        return
+    frame = stage_measurement_frame(df_range, stage, measure_col)
+    if frame.empty:
+        st.info("선택한 기간에 측정값이 없습니다.")
+        return
+    capability = capability_indices(frame, lsl, usl)
+    capability['day'] = capability['day'].dt.strftime('%y%m%d')
+    capability['jig'] = capability['jig'].astype(str)
+    index_name = st.radio("지수 선택", ['Cpk', 'Ppk'], horizontal=True, key=f"spec_index_{stage_key}")
+    pivot = capability.pivot(index='jig', columns='day', values=index_name).round(2)
+    pivot.index.name = '구분'
+    st.dataframe(pivot, width='stretch')
@@ -0,0 +1,226 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import math
+import threading
+
+from aggregation import normalize_pass_status
+from jig_significance import adjust_p_values
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# 급증 감지 설정
+SPIKE_ALPHA = 0.01             # 버킷 검사 묶음 전체의 유의 수준 (다중 비교 보정 후, 마감 / 진행 중 검사에 나눠 사용)
+PROVISIONAL_ALPHA_SHARE = 0.5  # 진행 중 버킷의 중간 검사에 배분하는 유의 수준 비율 (나머지는 마감 검사)
+PROVISIONAL_LOOK_MINUTES = 15  # 진행 중 버킷을 다시 검사하는 간격 (데이터 시각 기준, 시간당 최대 60 / 15 = 4회)
+SPIKE_CORRECTION = 'Holm'      # 다중 비교 보정 방법 (jig_significance.CORRECTION_METHODS)
+MIN_BUCKET_UNITS = 20          # 판정에 필요한 시간당 최소 SNumber 수
+MIN_BASELINE_UNITS = 50        # 기준 불량률을 신뢰하기 위한 최소 누적 SNumber 수
+BASELINE_DECAY = 0.995         # 마감된 시간 버킷마다 기준선에 곱하는 감쇠 계수
+FLAG_RETENTION_HOURS = 24      # 배너에 유지하는 감지 이력 시간
+DETECTOR_WARMUP_ROWS = 20000   # 최초 실행 시 기준선 산출에 사용할 최근 행 수
+
+
+def new_spike_detector():
+    """프로세스 전체에서 공유하는 급증 감지기 상태를 생성합니다."""
+    return {
+        'last_rowid': None,
+        'open_buckets': {},   # (공정, 지그, 시간) → {'all', 'pass', 'fail': set, 'last_stamp', 'look', 'flag'}
+        'open_hour': {},      # 공정 → 진행 중인 시간. 이보다 이전 시간은 마감되어 늦게 도착한 행은 버립니다.
+        'late_rows': 0,       # 마감된 시간에 늦게 도착해 버린 행 수
+        'baseline': {},       # 공정 → {'units', 'fail', 'false_defect'} (감쇠 누적)
+        'flags': [],          # 마감 검사에서 감지된 (공정, 지그, 시간) 버킷 목록
+        'lock': threading.Lock(),
+    }
+
+
+def _bucket_counts(bucket):
+    """시간 버킷의 SNumber 집합으로부터 (SNumber 수, FAIL 수, 가성불량 수)를 계산합니다."""
+    units = len(bucket['all'])
+    fail = units - len(bucket['pass'])
+    false_defect = len(bucket['fail'] & bucket['pass'])
+    return units, fail, false_defect
+
+
+def binomial_upper_tail(k, n, p):
+    """
+    이항 분포 상단 꼬리 확률 P(X ≥ k), X ~ B(n, p)
+    작은 n에서도 정확하도록 정규 근사 대신 로그 공간에서 확률 질량을 직접 합산합니다.
+    """
+    if k <= 0 or p >= 1:
+        return 1.0
+    if k > n or p <= 0:
+        return 0.0
+    log_p, log_q = math.log(p), math.log1p(-p)
+    log_n = math.lgamma(n + 1)
+    terms = [log_n - math.lgamma(j + 1) - math.lgamma(n - j + 1) + j * log_p + (n - j) * log_q for j in range(k, n + 1)]
+    top = max(terms)
+    return min(1.0, math.exp(top) * sum(math.exp(t - top) for t in terms))
+
+
+def bucket_tests(detector, stage_key, jig, hour, bucket, provisional):
+    """
+    시간 버킷 하나의 FAIL / 가성불량 수를 공정 기준 불량률의 이항 분포로 검정합니다.
+    판정은 refresh_spike_detector()가 같은 갱신에서 검사한 버킷(마감 / 진행 중 따로)의 p-value를 함께 보정해 내립니다.
+    Returns:
+        list: 검정 정보 dict 목록 (SNumber 수나 기준선이 부족하면 빈 목록).
+    """
+    units, fail, false_defect = _bucket_counts(bucket)
+    baseline = detector['baseline'].get(stage_key)
+    if units < MIN_BUCKET_UNITS or baseline is None or baseline['units'] < MIN_BASELINE_UNITS:
+        return []
+
+    tests = []
+    for name, metric_key, count in (('FAIL', 'fail', fail), ('가성불량', 'false_defect', false_defect)):
+        p_bar = baseline[metric_key] / baseline['units']
+        tests.append({'stage': stage_key, 'jig': jig, 'hour': hour, 'units': units, 'provisional': provisional,
+                      'metric': name, 'rate': count / units, 'p_bar': p_bar,
+                      'p_value': binomial_upper_tail(count, units, p_bar)})
+    return tests
+
+
+def flag_significant(tests, alpha=SPIKE_ALPHA, method=SPIKE_CORRECTION):
+    """
+    검정 목록의 p-value를 다중 비교 보정하고, 유의한 버킷을 감지 정보로 묶어 반환합니다.
+    Returns:
+        list: 버킷별 감지 정보 dict ('stage', 'jig', 'hour', 'units', 'reason', 'provisional').
+    """
+    if not tests:
+        return []
+    adjusted = adjust_p_values(np.array([t['p_value'] for t in tests]), method)
+    flags = {}
+    for test, p_adj in zip(tests, adjusted):
+        if p_adj >= alpha:
+            continue
+        key = (test['stage'], test['jig'], test['hour'])
+        flag = flags.setdefault(key, {'stage': test['stage'], 'jig': test['jig'], 'hour': test['hour'],
+                                      'units': test['units'], 'provisional': test['provisional'], 'reasons': []})
+        flag['reasons'].append(f"{test['metric']} {test['rate'] * 100:.1f}% (기준 {test['p_bar'] * 100:.1f}%, 보정 p={p_adj:.1e})")
+    return [{**{k: v for k, v in flag.items() if k != 'reasons'}, 'reason': ', '.join(flag['reasons'])}
+            for flag in flags.values()]
+
+
+def _update_baseline(detector, stage_key, bucket):
+    """마감된 버킷을 감쇠 누적 기준선에 반영합니다."""
+    units, fail, false_defect = _bucket_counts(bucket)
+    baseline = detector['baseline'].setdefault(stage_key, {'units': 0.0, 'fail': 0.0, 'false_defect': 0.0})
+    baseline['units'] = baseline['units'] * BASELINE_DECAY + units
+    baseline['fail'] = baseline['fail'] * BASELINE_DECAY + fail
+    baseline['false_defect'] = baseline['false_defect'] * BASELINE_DECAY + false_defect
+
+
+def _provisional_look(bucket):
+    """진행 중 버킷의 검사 회차 (버킷에 들어온 가장 늦은 시각이 속한 PROVISIONAL_LOOK_MINUTES 구간)"""
+    return bucket['last_stamp'].minute // PROVISIONAL_LOOK_MINUTES
+
+
+def refresh_spike_detector(detector, fetch_rows):
+    """
+    마지막으로 처리한 rowid 이후의 행만 읽어 (공정, 지그, 시간) 버킷을 갱신하고,
+    마감된 시간 버킷을 판정한 뒤 기준선에 반영합니다.
+
+    같은 버킷을 갱신마다 다시 검사하면 오경보가 누적되므로 검사 횟수와 유의 수준을 미리 나눠 둡니다.
+    - 진행 중 버킷: PROVISIONAL_LOOK_MINUTES 구간마다 한 번만 검사하며(시간당 최대 4회), 회차마다
+      SPIKE_ALPHA × PROVISIONAL_ALPHA_SHARE / 4를 사용합니다 (Bonferroni 배분). 한 번 감지되면 마감 때까지 유지됩니다.
+    - 마감 버킷: 한 번만 SPIKE_ALPHA × (1 - PROVISIONAL_ALPHA_SHARE)로 검사하고 기준선에 반영합니다.
+    이미 마감된 시간에 늦게 도착한 행은 다시 검사하거나 기준선에 중복 반영하지 않도록 버립니다 (late_rows에 집계).
+    Args:
+        detector (dict): new_spike_detector()로 만든 공유 상태.
+        fetch_rows (callable): fetch_rows(last_rowid, tail) → '_rowid'와 *_dt 컬럼이 있는 DataFrame.
+    Returns:
+        list: 현재 배너에 표시할 감지 목록 (마감 + 진행 중 버킷).
+    """
+    with detector['lock']:
+        new_rows = fetch_rows(detector['last_rowid'], DETECTOR_WARMUP_ROWS)
+        if new_rows is not None and not new_rows.empty:
+            for key in STAGE_ORDER:
+                stage = STAGE_REGISTRY[key]
+                if stage['date_col'] not in new_rows.columns:
+                    continue
+                rows = new_rows[new_rows[stage['date_col']].notna() & new_rows['SNumber'].notna()]
+                if rows.empty:
+                    continue
+                status = normalize_pass_status(rows[stage['pass_col']])
+                work = pd.DataFrame({
+                    'jig': rows[stage['jig_col']].fillna('전체') if stage['jig_col'] in rows.columns else '전체',
+                    'stamp': rows[stage['date_col']],
+                    'hour': rows[stage['date_col']].dt.floor('h'),
+                    'SNumber': rows['SNumber'],
+                    'is_pass': status == 'O',
+                    'is_fail': status == 'X',
+                })
+                open_hour = detector['open_hour'].get(key)
+                if open_hour is not None:
+                    late = work['hour'] < open_hour
+                    detector['late_rows'] += int(late.sum())
+                    work = work[~late]
+                    if work.empty:
+                        continue
+                groups = work.groupby(['jig', 'hour'])
+                all_sets = groups['SNumber'].agg(set)
+                last_stamps = groups['stamp'].max()
+                pass_sets = work[work['is_pass']].groupby(['jig', 'hour'])['SNumber'].agg(set)
+                fail_sets = work[work['is_fail']].groupby(['jig', 'hour'])['SNumber'].agg(set)
+                for (jig, hour), sns in all_sets.items():
+                    bucket = detector['open_buckets'].setdefault((key, jig, hour), {
+                        'all': set(), 'pass': set(), 'fail': set(), 'last_stamp': hour, 'look': -1, 'flag': None})
+                    bucket['all'] |= sns
+                    bucket['pass'] |= pass_sets.get((jig, hour), set())
+                    bucket['fail'] |= fail_sets.get((jig, hour), set())
+                    bucket['last_stamp'] = max(bucket['last_stamp'], last_stamps[(jig, hour)])
+            detector['last_rowid'] = int(new_rows['_rowid'].max())
+
+        if not detector['open_buckets']:
+            return detector['flags']
+
+        # 공정별 가장 최근 시간 버킷만 진행 중으로 남기고, 나머지는 시간 순으로 마감합니다.
+        for stage_key, _, hour in detector['open_buckets']:
+            detector['open_hour'][stage_key] = max(detector['open_hour'].get(stage_key, hour), hour)
+        open_hour = detector['open_hour']
+        closed_keys = sorted((k for k in detector['open_buckets'] if k[2] < open_hour[k[0]]), key=lambda k: k[2])
+        # 마감 버킷은 그 시점까지의 기준선으로 검정한 뒤 기준선에 반영합니다.
+        closed_tests = []
+        for bucket_key in closed_keys:
+            bucket = detector['open_buckets'].pop(bucket_key)
+            closed_tests += bucket_tests(detector, *bucket_key, bucket, provisional=False)
+            _update_baseline(detector, bucket_key[0], bucket)
+
+        # 진행 중 버킷은 새 검사 구간에 들어섰고 아직 감지되지 않은 경우에만 검사합니다.
+        provisional_tests = []
+        for bucket_key, bucket in detector['open_buckets'].items():
+            look = _provisional_look(bucket)
+            if bucket['flag'] is not None or look <= bucket['look']:
+                continue
+            tests = bucket_tests(detector, *bucket_key, bucket, provisional=True)
+            if tests:
+                bucket['look'] = look
+                provisional_tests += tests
+
+        # 마감 / 진행 중 검사를 각각 한 묶음으로 보정합니다.
+        looks_per_hour = 60 // PROVISIONAL_LOOK_MINUTES
+        detector['flags'] += flag_significant(closed_tests, alpha=SPIKE_ALPHA * (1 - PROVISIONAL_ALPHA_SHARE))
+        for flag in flag_significant(provisional_tests, alpha=SPIKE_ALPHA * PROVISIONAL_ALPHA_SHARE / looks_per_hour):
+            detector['open_buckets'][(flag['stage'], flag['jig'], flag['hour'])]['flag'] = flag
+        newest = max(open_hour.values())
+        detector['flags'] = [f for f in detector['flags']
+                             if f['hour'] >= newest - pd.Timedelta(hours=FLAG_RETENTION_HOURS)]
+        return detector['flags'] + [b['flag'] for b in detector['open_buckets'].values() if b['flag'] is not None]
+
+
+def display_spike_banner(flags):
+    """
+    불량률 급증이 감지된 지그를 페이지 상단 배너로 보여주는 함수
+    """
+    if not flags:
+        return
+    jigs = sorted({f"{STAGE_REGISTRY[f['stage']]['label']} {f['jig']}" for f in flags})
+    st.error(f"불량률 급증 감지 ({len(jigs)}개 지그): " + ", ".join(jigs))
+    with st.expander("급증 감지 상세", expanded=False):
+        detail_df = pd.DataFrame([{
+            '공정': STAGE_REGISTRY[f['stage']]['label'],
+            '구분': str(f['jig']),
+            '시간': f['hour'].strftime('%y%m%d %H시'),
+            'SNumber 수': f['units'],
+            '내용': f['reason'],
+            '상태': '진행 중' if f['provisional'] else '마감',
+        } for f in sorted(flags, key=lambda f: f['hour'], reverse=True)])
+        st.table(detail_df)
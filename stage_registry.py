@@ -0,0 +1,53 @@
+# 공정(Stage) 정보 레지스트리
+# 각 공정의 타임스탬프, 합격 여부, 지그(PC), 측정값 컬럼을 한 곳에서 관리합니다.
+
+# 실제 생산 흐름 순서 (PCB → Fw → RfTx → Semi → Func)
+STAGE_ORDER = ['pcb', 'fw', 'rftx', 'semi', 'func']
+
+STAGE_REGISTRY = {
+    'pcb': {
+        'label': 'PCB',
+        'table_name': 'Pcb_Process',
+        'stamp_col': 'PcbStartTime',
+        'date_col': 'PcbStartTime_dt',
+        'pass_col': 'PcbPass',
+        'jig_col': 'PcbMaxIrPwr',
+        'measure_cols': ['PcbSleepCurr', 'PcbIrCurr', 'PcbIrPwr', 'PcbWirelessVolt'],
+    },
+    'fw': {
+        'label': 'Fw',
+        'table_name': 'Fw_Process',
+        'stamp_col': 'FwStamp',
+        'date_col': 'FwStamp_dt',
+        'pass_col': 'FwPass',
+        'jig_col': 'FwPC',
+        'measure_cols': [],
+    },
+    'rftx': {
+        'label': 'RfTx',
+        'table_name': 'RfTx_Process',
+        'stamp_col': 'RfTxStamp',
+        'date_col': 'RfTxStamp_dt',
+        'pass_col': 'RfTxPass',
+        'jig_col': 'RfTxPC',
+        'measure_cols': ['RfTxPower'],
+    },
+    'semi': {
+        'label': 'Semi',
+        'table_name': 'SemiAssy_Process',
+        'stamp_col': 'SemiAssyStartTime',
+        'date_col': 'SemiAssyStartTime_dt',
+        'pass_col': 'SemiAssyPass',
+        'jig_col': 'SemiAssyMaxBatVolt',
+        'measure_cols': ['SemiAssyBatVolt'],
+    },
+    'func': {
+        'label': 'Func',
+        'table_name': 'Func_Process',
+        'stamp_col': 'BatadcStamp',
+        'date_col': 'BatadcStamp_dt',
+        'pass_col': 'BatadcPass',
+        'jig_col': 'BatadcPC',
+        'measure_cols': ['BatadcLevel'],
+    },
+}
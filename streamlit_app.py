@@ -5,6 +5,31 @@ import sqlite3
 import numpy as np
 import warnings
 
+from aggregation import METRIC_KEYS, day_code_range, split_unit_flags, stage_day_codes, summarize_unit_flags, unit_flags
+from traceability import build_stage_matrix, display_traceability_report
+from time_buckets import (DEFAULT_SHIFT_CALENDAR, GRANULARITY_OPTIONS, ROLLING_WINDOWS, WEEKEND_RULES, build_hourly_cube,
+                          rolling_yield, rollup_cube, validate_shift_calendar)
+from olap_cube import build_olap_cube, display_olap_explorer
+from retest_analysis import analyze_retests, display_retest_analysis
+from hll import build_hll_sketches, display_distinct_unit_totals
+from quantile_sketch import build_quantile_sketches, display_quantile_trends
+from spc import new_spc_monitor, refresh_spc_monitor, display_spc_charts
+from spike_detector import new_spike_detector, refresh_spike_detector, display_spike_banner
+from spec_limits import display_spec_reevaluation
+from histogram_bins import build_histogram_cube, display_measurement_histogram
+from cross_stage import PREDICTOR_STAGE, build_serial_features, display_cross_stage_analysis
+from jig_significance import display_jig_significance
+from lot_analysis import DEFAULT_LOT_PREFIX, display_lot_analysis, parse_lots
+from raw_viewer import display_raw_viewer, display_search_results, filter_positions, view_positions
+from unit_details import display_unit_details
+from report_charts import (CHART_METRICS, downsample_tidy, report_bar_chart, report_line_chart, tidy_report_frame,
+                           tidy_wide_frame)
+from report_export import EXPORT_FORMATS, build_report_export, report_table
+from export_jobs import close_export_queue, display_export_panel, new_export_queue
+from live_monitor import LIVE_STAGES, display_live_mode, live_start_rowid, new_live_monitor, refresh_live_monitor
+from session_memory import display_session_memory
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
 warnings.filterwarnings('ignore')
 
 # SQLite 연결 함수
@@ -18,6 +43,16 @@ def get_connection():
         st.error(f"데이터베이스 연결에 실패했습니다: {e}")
         return None
 
+# 데이터 버전(행 수, 마지막 rowid)을 조회하는 함수
+# 테이블에 행이 추가되면 버전이 바뀌어 캐시된 분석 결과가 자동으로 갱신됩니다.
+def get_data_version(conn):
+    try:
+        row_count, max_rowid = conn.execute("SELECT COUNT(*), MAX(rowid) FROM historyinspection;").fetchone()
+        return f"{row_count}-{max_rowid}"
+    except Exception as e:
+        st.error(f"데이터 버전을 확인하는 중 오류가 발생했습니다: {e}")
+        return None
+
 # 데이터베이스에서 테이블을 읽어 DataFrame으로 반환하는 함수
 def read_data_from_db(conn, table_name):
     try:
@@ -28,24 +63,59 @@ def read_data_from_db(conn, table_name):
         st.error(f"테이블 '{table_name}'에서 데이터를 불러오는 중 오류가 발생했습니다: {e}")
         return None
 
+# 마지막으로 처리한 rowid 이후에 추가된 행만 읽어오는 함수
+# last_rowid가 None이면 가장 최근 tail개 행을 읽습니다. 날짜 컬럼은 *_dt로 변환해 반환합니다.
+def read_rows_after(conn, last_rowid, tail=None):
+    try:
+        if last_rowid is None:
+            query = "SELECT * FROM (SELECT rowid AS _rowid, * FROM historyinspection ORDER BY rowid DESC LIMIT ?) ORDER BY _rowid"
+            df = pd.read_sql_query(query, conn, params=(tail or -1,))
+        else:
+            query = "SELECT rowid AS _rowid, * FROM historyinspection WHERE rowid > ? ORDER BY rowid"
+            df = pd.read_sql_query(query, conn, params=(last_rowid,))
+    except Exception as e:
+        st.error(f"새로 추가된 데이터를 불러오는 중 오류가 발생했습니다: {e}")
+        return None
+    for stage in STAGE_REGISTRY.values():
+        if stage['stamp_col'] in df.columns:
+            df[stage['date_col']] = pd.to_datetime(df[stage['stamp_col']], errors='coerce')
+    return df
+
+# last_rowid 이후에 추가된 공정 행을 라이브 모드용 컬럼만 읽어오는 함수
+# 공정 시각 문자열 형식은 공정마다 다를 수 있어 SQL에서 날짜를 비교하지 않고, rowid로만 범위를 정합니다.
+def read_stage_rows(conn, stage_key, last_rowid):
+    stage = STAGE_REGISTRY[stage_key]
+    columns = ', '.join(['SNumber', stage['stamp_col'], stage['pass_col'], stage['jig_col']])
+    query = (f"SELECT rowid AS _rowid, {columns} FROM historyinspection "
+             f"WHERE rowid > ? AND {stage['stamp_col']} IS NOT NULL ORDER BY rowid")
+    try:
+        return pd.read_sql_query(query, conn, params=(last_rowid,))
+    except Exception as e:
+        st.error(f"새로 추가된 데이터를 불러오는 중 오류가 발생했습니다: {e}")
+        return None
+
 # analyze_data 함수
-def analyze_data(df, date_col_name, jig_col_name):
+def analyze_data(df, date_col_name, jig_col_name, pass_col_name=None):
     """
     주어진 DataFrame을 날짜와 지그(Jig) 기준으로 분석합니다.
     Args:
         df (pd.DataFrame): 분석할 원본 DataFrame.
         date_col_name (str): 날짜/시간 정보가 있는 컬럼명.
         jig_col_name (str): 지그(PC) 정보가 있는 컬럼명.
+        pass_col_name (str, optional): 공정의 합격 여부 컬럼명. 지정하지 않으면 존재하는 Pass 컬럼을 순서대로 사용합니다.
     Returns:
-        tuple: 분석 결과 요약 데이터, 모든 날짜 목록, 실제로 사용된 지그 컬럼명.
+        tuple: 분석 결과 요약 데이터, 모든 날짜 목록, 실제로 사용된 지그 컬럼명,
+               SNumber 집합 {지그: {'range': 분류별 SerialIdx 배열, 'days': {날짜: 분류별 SerialIdx 배열}}}.
     """
     # DataFrame이 비어 있으면 빈 결과를 반환
     if df.empty:
-        return {}, [], jig_col_name
+        return {}, [], jig_col_name, {}
 
     # PassStatusNorm 컬럼 생성
     df['PassStatusNorm'] = ""
-    if 'PcbPass' in df.columns:
+    if pass_col_name and pass_col_name in df.columns:
+        df['PassStatusNorm'] = df[pass_col_name].fillna('').astype(str).str.strip().str.upper()
+    elif 'PcbPass' in df.columns:
         df['PassStatusNorm'] = df['PcbPass'].fillna('').astype(str).str.strip().str.upper()
     elif 'FwPass' in df.columns:
         df['PassStatusNorm'] = df['FwPass'].fillna('').astype(str).str.strip().str.upper()
@@ -57,6 +127,7 @@ def analyze_data(df, date_col_name, jig_col_name):
         df['PassStatusNorm'] = df['BatadcPass'].fillna('').astype(str).str.strip().str.upper()
 
     summary_data = {}
+    unit_sets = {}
     
     # 지그(PC) 컬럼에 데이터가 없는 경우 '전체'를 대체 컬럼으로 사용 (PCB 탭의 경우)
     used_jig_col_name = jig_col_name
@@ -65,43 +136,295 @@ def analyze_data(df, date_col_name, jig_col_name):
         df[used_jig_col_name] = '전체'
 
     # 지그(PC) 컬럼이 존재하고 데이터가 있는 경우에만 그룹 분석 실행
+    # (지그, 일, SNumber) 단위 O/X 이력을 한 번에 집계한 뒤 지표와 SNumber 집합을 함께 만듭니다.
     if used_jig_col_name in df.columns and not df[used_jig_col_name].isnull().all():
         if 'SNumber' in df.columns and date_col_name in df.columns and not df[date_col_name].dt.date.dropna().empty:
-            for jig, group in df.groupby(used_jig_col_name):
-                for d, day_group in group.groupby(group[date_col_name].dt.date):
-                    if pd.isna(d): continue
-                    date_iso = pd.to_datetime(d).strftime("%Y-%m-%d")
-                    
-                    pass_sns_series = day_group.groupby('SNumber')['PassStatusNorm'].apply(lambda x: 'O' in x.tolist())
-                    pass_sns = pass_sns_series[pass_sns_series].index.tolist()
-
-                    false_defect_count = len(day_group[(day_group['PassStatusNorm'] == 'X') & (day_group['SNumber'].isin(pass_sns))]['SNumber'].unique())
-                    true_defect_count = len(day_group[(day_group['PassStatusNorm'] == 'X') & (~day_group['SNumber'].isin(pass_sns))]['SNumber'].unique())
-                    pass_count = len(pass_sns)
-                    total_test = len(day_group['SNumber'].unique())
-                    fail_count = total_test - pass_count
-
-                    if jig not in summary_data:
-                        summary_data[jig] = {}
-                    summary_data[jig][date_iso] = {
-                        'total_test': total_test,
-                        'pass': pass_count,
-                        'false_defect': false_defect_count,
-                        'true_defect': true_defect_count,
-                        'fail': fail_count,
-                    }
+            serial_idx = df['SerialIdx'] if 'SerialIdx' in df.columns else pd.Series(pd.factorize(df['SNumber'])[0], index=df.index)
+            work = pd.DataFrame({
+                'jig': df[used_jig_col_name],
+                'day': df[date_col_name].dt.normalize(),
+                'SNumber': serial_idx,
+                'PassStatusNorm': df['PassStatusNorm'],
+            })
+            work = work[work['jig'].notna() & work['day'].notna() & (work['SNumber'] >= 0)]
+            day_flags = unit_flags(work, ['jig', 'day'])
+
+            for (jig, day), metrics in summarize_unit_flags(day_flags, ['jig', 'day']).iterrows():
+                summary_data.setdefault(jig, {})[day.strftime("%Y-%m-%d")] = {key: int(metrics[key]) for key in METRIC_KEYS}
+
+            range_flags = day_flags.groupby(['jig', 'SNumber'], sort=True)[['has_pass', 'has_fail']].any().reset_index()
+            for jig, categories in split_unit_flags(range_flags, ['jig']).items():
+                unit_sets[jig] = {'range': categories, 'days': {}}
+            for (jig, day), categories in split_unit_flags(day_flags, ['jig', 'day']).items():
+                unit_sets[jig]['days'][day.strftime("%Y-%m-%d")] = categories
     
     all_dates = sorted(list(df[date_col_name].dt.date.dropna().unique()))
     
-    return summary_data, all_dates, used_jig_col_name
+    return summary_data, all_dates, used_jig_col_name, unit_sets
+
+
+# historyinspection 전체를 데이터 버전별로 한 번만 읽어 세션 간에 공유하는 함수
+# 날짜 컬럼(*_dt) 변환과 SNumber 정수 인덱스(SerialIdx)까지 캐시에 포함되며, 읽기 전용으로만 사용합니다.
+# rowid(_rowid)는 라이브 모드가 오늘 첫 행의 위치를 찾을 때 사용합니다.
+@st.cache_resource(show_spinner="데이터를 불러오는 중...", max_entries=1)
+def get_all_data(data_version, _conn):
+    df_all_data = pd.read_sql_query("SELECT rowid AS _rowid, * FROM historyinspection ORDER BY rowid;", _conn)
+
+    # 모든 날짜 관련 컬럼을 datetime 객체로 미리 변환
+    for stage in STAGE_REGISTRY.values():
+        df_all_data[stage['date_col']] = pd.to_datetime(df_all_data[stage['stamp_col']], errors='coerce')
+
+    # SNumber를 정수 인덱스로 변환 (공정 간 결합은 문자열 merge 대신 이 인덱스로 수행, 결측은 -1)
+    serial_codes, serials = pd.factorize(df_all_data['SNumber'])
+    df_all_data['SerialIdx'] = serial_codes.astype(np.int32)
+    return df_all_data, serials
+
+
+
+# 공정별 날짜 코드(1970-01-01 기준 일수)와 날짜 범위를 데이터 버전별로 한 번만 계산해 캐시하는 함수
+# 기간 필터는 매 실행마다 .dt.date를 만들지 않고 이 정수 배열만 비교합니다.
+@st.cache_resource(show_spinner=False, max_entries=2 * len(STAGE_REGISTRY))
+def get_stage_day_codes(data_version, stage_key, _df_all_data):
+    codes = stage_day_codes(_df_all_data, STAGE_REGISTRY[stage_key])
+    return {'codes': codes, 'range': day_code_range(codes)}
+
+# SNumber 접두부 설정별 Lot 컬럼을 캐시하는 함수 (고유 SNumber에만 문자열 슬라이싱 적용)
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_lot_column(data_version, start, length, _df_all_data, _serials):
+    return parse_lots(_df_all_data['SerialIdx'].to_numpy(), _serials, start, length)
+
+
+# 원본 DB 조회의 (조회 조건, 정렬)별 행 위치 배열을 캐시하는 함수 (페이지 이동 시 재정렬하지 않음)
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_raw_view_positions(data_version, stage_key, start_date, end_date, jig, sort_col, ascending, _df_all_data):
+    day_codes = get_stage_day_codes(data_version, stage_key, _df_all_data)['codes']
+    return view_positions(_df_all_data, STAGE_REGISTRY[stage_key], day_codes, start_date, end_date, jig, sort_col, ascending)
+
+
+# 분석 조건(공정, 기간, 지그)별 분석 결과를 모든 세션이 공유하도록 캐시하는 함수
+# 세션에는 조건만 보관하며, 결과가 캐시에서 밀려나면 같은 조건으로 다시 계산합니다.
+@st.cache_resource(show_spinner="데이터 분석 중...", max_entries=16)
+def get_stage_analysis(data_version, stage_key, start_date, end_date, jig, _df_all_data):
+    stage = STAGE_REGISTRY[stage_key]
+    day_codes = get_stage_day_codes(data_version, stage_key, _df_all_data)['codes']
+    df_filtered = _df_all_data.iloc[filter_positions(_df_all_data, stage, day_codes, start_date, end_date, jig)]
+    return {
+        'data': analyze_data(df_filtered, stage['date_col'], stage['jig_col'], stage['pass_col']),
+        'cube': build_hourly_cube(df_filtered, stage['date_col'], stage['jig_col'], stage['pass_col']),
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'n_rows': len(df_filtered),
+    }
+
+
+# 분석 조건별 SNumber 재검사 이력을 캐시하는 함수 (재검사 분석을 열었을 때만 계산)
+@st.cache_resource(show_spinner="재검사 이력 계산 중...", max_entries=16)
+def get_retest_units(data_version, stage_key, start_date, end_date, jig, used_jig_col, _df_all_data):
+    stage = STAGE_REGISTRY[stage_key]
+    day_codes = get_stage_day_codes(data_version, stage_key, _df_all_data)['codes']
+    df_filtered = _df_all_data.iloc[filter_positions(_df_all_data, stage, day_codes, start_date, end_date, jig)]
+    return analyze_retests(df_filtered, stage['date_col'], used_jig_col, stage['pass_col'])
+
+
+# 분석 결과의 시간 단위 큐브를 집계 단위 / 교대 달력별로 병합한 결과를 캐시하는 함수
+# 공유 큐브는 수정하지 않고, 병합 결과만 분석 조건과 함께 키로 저장해 개수를 제한합니다.
+@st.cache_resource(show_spinner=False, max_entries=32)
+def get_cube_rollup(data_version, stage_key, start_date, end_date, jig, granularity, calendar, _cube):
+    if calendar is None:
+        return rollup_cube(_cube, granularity)
+    return rollup_cube(_cube, granularity, calendar)
+
+
+# 분석 결과의 시간 단위 큐브로 창 길이별 이동 수율을 캐시하는 함수
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_rolling_yield(data_version, stage_key, start_date, end_date, jig, window_hours, _cube):
+    return rolling_yield(_cube, window_hours)
+
+
+# 분석 리포트 내보내기 파일을 캐시하는 함수 (다운로드 버튼을 눌렀을 때만 호출)
+# 같은 분석 조건 / 집계 단위 / 표시 지그 / 형식이면 다시 만들지 않고 캐시된 파일을 내려줍니다.
+@st.cache_resource(show_spinner=False, max_entries=32)
+def get_report_export(data_version, stage_key, start_date, end_date, jig, export_format, granularity, calendar, jigs,
+                      _summary_data, _bucket_keys, _bucket_labels, _unit_sets, _serials):
+    return build_report_export(export_format, _summary_data, _bucket_keys, _bucket_labels, list(jigs), _unit_sets, _serials)
+
+
+# 분석 조건 안에서 SNumber 검색어에 해당하는 행 위치를 캐시하는 함수
+@st.cache_resource(show_spinner=False, max_entries=32)
+def get_snumber_matches(data_version, stage_key, start_date, end_date, jig, query, _df_all_data):
+    day_codes = get_stage_day_codes(data_version, stage_key, _df_all_data)['codes']
+    positions = filter_positions(_df_all_data, STAGE_REGISTRY[stage_key], day_codes, start_date, end_date, jig)
+    snumbers = _df_all_data['SNumber'].iloc[positions].fillna('').astype(str)
+    return positions[snumbers.str.contains(query, case=False, na=False, regex=False).to_numpy()]
+
+
+# PCB 투입일 범위별 SNumber 단위 공정 간 특성 표를 캐시하는 함수
+@st.cache_resource(show_spinner="공정 간 특성을 계산하는 중...", max_entries=8)
+def get_serial_features(data_version, start_date, end_date, _df_all_data):
+    pcb_day_codes = get_stage_day_codes(data_version, PREDICTOR_STAGE, _df_all_data)['codes']
+    return build_serial_features(_df_all_data, pcb_day_codes, start_date, end_date)
+
+
+# 공정 추적 매트릭스를 데이터 버전별로 캐시하는 함수
+# (_df_all_data는 해시하지 않고 data_version만 캐시 키로 사용합니다.)
+@st.cache_data(show_spinner="공정 추적 데이터를 생성하는 중...", max_entries=2)
+def get_traceability_matrix(data_version, _df_all_data):
+    return build_stage_matrix(_df_all_data)
+
+
+# 공정 × 지그 × 일 × 시간 큐브를 데이터 버전별로 캐시하는 함수
+# 큐브는 읽기 전용으로만 사용하므로 복사 없이 공유되는 cache_resource를 사용합니다.
+@st.cache_resource(show_spinner="조회용 큐브를 생성하는 중...", max_entries=2)
+def get_olap_cube(data_version, _df_all_data):
+    return build_olap_cube(_df_all_data)
+
+
+# 공정 × 지그 × 일 HyperLogLog 스케치를 데이터 버전 / 허용 오차별로 캐시하는 함수
+@st.cache_resource(show_spinner="고유 수량 스케치를 생성하는 중...", max_entries=3)
+def get_hll_sketches(data_version, error_rate, _df_all_data):
+    return build_hll_sketches(_df_all_data, error_rate)
+
+
+# 측정값 컬럼별 (지그, 일) 분위수 스케치를 데이터 버전별로 캐시하는 함수
+@st.cache_resource(show_spinner="측정값 분위수 스케치를 생성하는 중...", max_entries=2)
+def get_quantile_sketches(data_version, _df_all_data):
+    return build_quantile_sketches(_df_all_data)
+
+
+# 측정값 컬럼별 (지그, 일) 히스토그램 구간 개수를 데이터 버전별로 캐시하는 함수
+@st.cache_resource(show_spinner="측정값 히스토그램을 집계하는 중...", max_entries=2)
+def get_histogram_cube(data_version, _df_all_data):
+    return build_histogram_cube(_df_all_data)
+
+
+# 세션 간에 공유되는 SPC 모니터 (새 행이 들어올 때마다 증분 갱신)
+@st.cache_resource
+def get_spc_monitor():
+    return new_spc_monitor()
+
+
+# 세션 간에 공유되는 내보내기 작업 큐 (작업 스레드 풀 + 완료 파일 임시 저장소)
+@st.cache_resource(on_release=close_export_queue)
+def get_export_queue():
+    return new_export_queue()
+
+
+# 세션 간에 공유되는 공정별 라이브 모니터 (오늘 추가된 행만 증분 갱신)
+@st.cache_resource
+def get_live_monitor(stage_key):
+    return new_live_monitor(stage_key)
+
+
+# 세션 간에 공유되는 지그 불량률 급증 감지기 (새 행이 들어올 때마다 증분 갱신)
+@st.cache_resource
+def get_spike_detector():
+    return new_spike_detector()
+
+
+WEEKDAY_NAMES = ['월', '화', '수', '목', '금', '토', '일']
+
+
+def edit_shift_calendar(analysis_key):
+    """
+    교대 달력(교대 시작 시각, 휴무 요일, 휴무일 귀속 규칙)을 편집하고 검증된 설정을 반환합니다.
+    설정은 모든 탭이 공유하며 세션에 보관합니다. 올바르지 않으면 None을 반환합니다.
+    """
+    calendar = st.session_state.shift_calendar
+    with st.expander("교대 달력 설정", expanded=False):
+        shifts_df = pd.DataFrame(list(calendar['shifts']), columns=['교대', '시작 시각'])
+        edited = st.data_editor(shifts_df, num_rows="dynamic", hide_index=True, width='stretch',
+                                column_config={'시작 시각': st.column_config.NumberColumn(min_value=0, max_value=23, step=1)},
+                                key=f"shift_editor_{analysis_key}")
+        weekend_days = st.multiselect("휴무 요일", list(range(7)), default=list(calendar['weekend_days']),
+                                      format_func=lambda d: WEEKDAY_NAMES[d], key=f"shift_weekend_{analysis_key}")
+        weekend_rule = st.selectbox("휴무일 생산 귀속", list(WEEKEND_RULES.keys()),
+                                    index=list(WEEKEND_RULES.keys()).index(calendar['weekend_rule']),
+                                    format_func=WEEKEND_RULES.get, key=f"shift_rule_{analysis_key}")
+
+    edited = edited.dropna()
+    new_calendar = {
+        'shifts': tuple((str(name), start) for name, start in edited.itertuples(index=False)),
+        'weekend_days': tuple(sorted(weekend_days)),
+        'weekend_rule': weekend_rule,
+    }
+    try:
+        validate_shift_calendar(new_calendar)
+    except ValueError as e:
+        st.error(f"교대 달력 설정 오류: {e}")
+        return None
+    new_calendar['shifts'] = tuple((name, int(start)) for name, start in new_calendar['shifts'])
+    st.session_state.shift_calendar = new_calendar
+    return new_calendar
+
+
+# 그래프 버튼 영역은 프래그먼트로 분리해, 그래프를 켜고 꺼도 이 영역만 다시 실행됩니다.
+@st.fragment
+def display_report_charts(analysis_key, load_chart_tidy, jigs_to_display, load_rolling_yield):
+    metric_label = st.radio("그래프 지표", list(CHART_METRICS.keys()), horizontal=True, key=f"chart_metric_{analysis_key}")
+    chart_data = None
+
+    # 그래프용 tidy / LTTB 데이터는 꺾은선 / 막대 그래프를 실제로 그릴 때 한 번만 만듭니다.
+    def metric_chart_data():
+        nonlocal chart_data
+        if chart_data is None:
+            chart_tidy = load_chart_tidy()
+            chart_data = chart_tidy[chart_tidy['지표'] == metric_label]
+        return chart_data
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("꺾은선 그래프 보기", key=f"line_chart_btn_{analysis_key}"):
+            st.session_state.show_line_chart[analysis_key] = not st.session_state.show_line_chart.get(analysis_key, False)
+        if st.session_state.show_line_chart.get(analysis_key, False):
+            st.altair_chart(report_line_chart(metric_chart_data()), width='stretch')
+    with col2:
+        if st.button("막대 그래프 보기", key=f"bar_chart_btn_{analysis_key}"):
+            st.session_state.show_bar_chart[analysis_key] = not st.session_state.show_bar_chart.get(analysis_key, False)
+        if st.session_state.show_bar_chart.get(analysis_key, False):
+            st.altair_chart(report_bar_chart(metric_chart_data()), width='stretch')
+    with col3:
+        if st.button("이동 수율 그래프 보기", key=f"rolling_chart_btn_{analysis_key}"):
+            st.session_state.show_rolling_chart[analysis_key] = not st.session_state.show_rolling_chart.get(analysis_key, False)
+        if st.session_state.show_rolling_chart.get(analysis_key, False):
+            window_label = st.radio("이동 창", list(ROLLING_WINDOWS.keys()), horizontal=True, key=f"rolling_window_{analysis_key}")
+            rolling_df = load_rolling_yield(ROLLING_WINDOWS[window_label])
+            rolling_jigs = [str(j) for j in jigs_to_display if str(j) in rolling_df.columns]
+            if rolling_jigs:
+                # 시간 단위 시리즈도 다른 그래프와 같이 지그별 최대 점 수로 줄여 전송합니다.
+                rolling_tidy = downsample_tidy(tidy_wide_frame(rolling_df[rolling_jigs], '이동 수율(%)'))
+                st.altair_chart(report_line_chart(rolling_tidy), width='stretch')
+            else:
+                st.info("이동 수율을 계산할 데이터가 없습니다.")
 
 
-def display_analysis_result(analysis_key, table_name, date_col_name, selected_jig=None, used_jig_col=None):
-    if st.session_state.analysis_results[analysis_key].empty:
+def display_analysis_result(analysis_key, table_name, analysis, load_retest_units, load_export, load_rollup,
+                            load_rolling_yield, selected_jig=None, used_jig_col=None, serials=None):
+    """
+    분석 리포트를 그리는 함수
+    analysis는 get_stage_analysis()가 공유 캐시에 만든 결과이며, 세션에는 분석 조건만 보관합니다.
+    load_export는 다운로드 버튼을 눌렀을 때 내보내기 파일을 만드는 함수입니다 (캐시됨).
+    load_rollup(granularity, calendar) / load_rolling_yield(window_hours)는 큐브 병합 결과와 이동 수율을 돌려주는 함수입니다 (캐시됨).
+    """
+    if analysis['n_rows'] == 0:
         st.warning("선택한 날짜에 해당하는 분석 데이터가 없습니다.")
         return
 
-    summary_data, all_dates, used_jig_col_name_from_state = st.session_state.analysis_data[analysis_key]
+    summary_data, all_dates, used_jig_col_name_from_state, unit_sets = analysis['data']
+
+    # 집계 단위 선택: '일'은 기존 분석 결과를, 나머지는 시간 단위 큐브를 병합해 사용합니다.
+    granularity_label = st.radio("집계 단위", list(GRANULARITY_OPTIONS.keys()), index=list(GRANULARITY_OPTIONS.values()).index('day'),
+                                 horizontal=True, key=f"granularity_{analysis_key}")
+    granularity = GRANULARITY_OPTIONS[granularity_label]
+    calendar = None
+    if granularity == 'day':
+        bucket_keys = [d.strftime('%Y-%m-%d') for d in all_dates]
+        bucket_labels = [f"{d.strftime('%y%m%d')}" for d in all_dates]
+    elif granularity in ('shift', 'production_day'):
+        calendar = edit_shift_calendar(analysis_key)
+        if calendar is None:
+            return
+        summary_data, bucket_keys, bucket_labels = load_rollup(granularity, calendar)
+    else:
+        summary_data, bucket_keys, bucket_labels = load_rollup(granularity, None)
     
     # 실제 사용된 지그 컬럼명을 우선적으로 사용
     if used_jig_col is None:
@@ -120,97 +443,173 @@ def display_analysis_result(analysis_key, table_name, date_col_name, selected_ji
         st.warning("선택한 PC (Jig)에 대한 데이터가 없습니다.")
         return
         
-    kor_date_cols = [f"{d.strftime('%y%m%d')}" for d in all_dates]
-    
-    st.write(f"**분석 시간**: {st.session_state.analysis_time[analysis_key]}")
+    st.write(f"**분석 시간**: {analysis['time']}")
     st.markdown("---")
 
-    all_reports_text = ""
-    
     # 보고서 테이블 표시
     for jig in jigs_to_display:
         st.subheader(f"구분: {jig}")
-        
-        report_data = {
-            '지표': ['총 테스트 수', 'PASS', '가성불량', '진성불량', 'FAIL']
-        }
-        
-        for date_iso, date_str in zip([d.strftime('%Y-%m-%d') for d in all_dates], kor_date_cols):
-            data_point = summary_data[jig].get(date_iso)
-            if data_point:
-                report_data[date_str] = [
-                    data_point['total_test'],
-                    data_point['pass'],
-                    data_point['false_defect'],
-                    data_point['true_defect'],
-                    data_point['fail']
-                ]
-            else:
-                report_data[date_str] = ['N/A'] * 5
-        
-        report_df = pd.DataFrame(report_data)
-        st.table(report_df)
-        all_reports_text += report_df.to_csv(index=False) + "\n"
+        st.table(report_table(summary_data, jig, bucket_keys, bucket_labels))
 
-        # 상세 내역 표시
+        # 상세 내역 표시 (열었을 때만 계산)
         st.markdown("#### 상세 내역")
-        df_filtered = st.session_state.analysis_results[analysis_key]
-        
-        # 현재 지그에 해당하는 데이터만 필터링
-        jig_filtered_df = df_filtered[df_filtered[used_jig_col] == jig].copy()
-        
-        # PASS 상세 내역
-        pass_sns = jig_filtered_df.groupby('SNumber')['PassStatusNorm'].apply(lambda x: 'O' in x.tolist())
-        pass_sns = pass_sns[pass_sns].index.tolist()
-        with st.expander(f"PASS ({len(pass_sns)}건)", expanded=False):
-            st.text("\n".join(pass_sns))
-        
-        # 가성불량 (False Defect) 상세 내역
-        false_defect_sns = jig_filtered_df[(jig_filtered_df['PassStatusNorm'] == 'X') & (jig_filtered_df['SNumber'].isin(pass_sns))]['SNumber'].unique().tolist()
-        with st.expander(f"가성불량 ({len(false_defect_sns)}건)", expanded=False):
-            st.text("\n".join(false_defect_sns))
-            
-        # 진성불량 (True Defect) 상세 내역
-        true_defect_sns = jig_filtered_df[(jig_filtered_df['PassStatusNorm'] == 'X') & (~jig_filtered_df['SNumber'].isin(pass_sns))]['SNumber'].unique().tolist()
-        with st.expander(f"진성불량 ({len(true_defect_sns)}건)", expanded=False):
-            st.text("\n".join(true_defect_sns))
-
-        # FAIL 상세 내역
-        fail_sns = jig_filtered_df['SNumber'].unique().tolist()
-        all_fail_sns = list(set(fail_sns) - set(pass_sns))
-        with st.expander(f"FAIL ({len(all_fail_sns)}건)", expanded=False):
-            st.text("\n".join(all_fail_sns))
+        display_unit_details(analysis_key, jig, unit_sets.get(jig, {}).get('range'), serials)
         
         st.markdown("---") # 각 지그 구분선
 
     st.success("분석 완료! 결과가 저장되었습니다.")
 
-    st.download_button(
-        label="분석 결과 다운로드",
-        data=all_reports_text.encode('utf-8-sig'),
-        file_name=f"{table_name}_analysis_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv",
-        key=f"download_{analysis_key}"
-    )
+    # 내보내기 파일은 다운로드 버튼을 눌렀을 때만 만들며, 같은 분석 / 형식은 캐시된 파일을 다시 내려줍니다.
+    col_format, col_download = st.columns([0.3, 0.7])
+    with col_format:
+        export_format = st.selectbox("다운로드 형식", list(EXPORT_FORMATS.keys()), key=f"export_format_{analysis_key}")
+    extension, mime = EXPORT_FORMATS[export_format]
+    with col_download:
+        st.download_button(
+            label="분석 결과 다운로드",
+            data=lambda: load_export(export_format, granularity, calendar, tuple(jigs_to_display),
+                                     summary_data, bucket_keys, bucket_labels, unit_sets),
+            file_name=f"{table_name}_analysis_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mime=mime,
+            key=f"download_{analysis_key}"
+        )
 
     # 차트 버튼
     st.markdown("---")
     st.subheader("그래프")
     
-    chart_data_raw = report_df.set_index('지표').T
-    chart_data = chart_data_raw[['총 테스트 수', 'PASS', 'FAIL']].copy()
+    # 모든 표시 지그의 (지그, 시점, 지표) 집계를 시리즈당 최대 점 수로 줄여 그래프에 사용합니다 (그래프를 켰을 때만 계산).
+    display_report_charts(analysis_key,
+                          lambda: downsample_tidy(tidy_report_frame(summary_data, bucket_keys, jigs_to_display)),
+                          jigs_to_display, load_rolling_yield)
 
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("꺾은선 그래프 보기", key=f"line_chart_btn_{analysis_key}"):
-            st.session_state.show_line_chart[analysis_key] = not st.session_state.show_line_chart.get(analysis_key, False)
-        if st.session_state.show_line_chart.get(analysis_key, False):
-            st.line_chart(chart_data)
-    with col2:
-        if st.button("막대 그래프 보기", key=f"bar_chart_btn_{analysis_key}"):
-            st.session_state.show_bar_chart[analysis_key] = not st.session_state.show_bar_chart.get(analysis_key, False)
-        if st.session_state.show_bar_chart.get(analysis_key, False):
-            st.bar_chart(chart_data)
+    # 유의성 검정은 선택한 집계 단위와 관계없이 일별 집계(summary_data)를 사용합니다.
+    daily_summary = analysis['data'][0]
+    display_jig_significance(analysis_key, daily_summary, all_dates)
+
+    display_retest_analysis(analysis_key, lambda: load_retest_units(used_jig_col))
+
+
+def render_stage_page(stage_key, df_all_data, serials, data_version, conn):
+    """
+    공정 하나의 분석 화면(PC 선택, 날짜 범위, 분석 실행, 리포트, SNumber 검색 / 원본 조회)을 그리는 함수
+    공정별 컬럼 정보는 STAGE_REGISTRY에서 가져옵니다.
+    """
+    stage = STAGE_REGISTRY[stage_key]
+    label = stage['label']
+    st.header(f"파일 {label} ({stage['table_name']})")
+
+    # 라이브 모드는 전체 데이터를 다시 불러오지 않고, 오늘 추가된 행만 읽어 공유 모니터를 갱신합니다.
+    if stage_key in LIVE_STAGES:
+        display_live_mode(stage_key, get_live_monitor(stage_key), lambda: refresh_live_monitor(
+            get_live_monitor(stage_key),
+            lambda last_rowid: read_stage_rows(conn, stage_key, last_rowid),
+            lambda today: live_start_rowid(get_stage_day_codes(data_version, stage_key, df_all_data)['codes'],
+                                           df_all_data['_rowid'].to_numpy(), today)))
+
+    # PC (Jig) 선택 기능 추가
+    pc_col_name = stage['jig_col']
+    unique_pc = df_all_data[pc_col_name].dropna().unique()
+    pc_options = ['모든 PC'] + sorted(list(unique_pc))
+    selected_pc = st.selectbox("PC (Jig) 선택", pc_options, key=f"pc_select_{stage_key}")
+
+    day_codes = get_stage_day_codes(data_version, stage_key, df_all_data)
+    min_date, max_date = day_codes['range'] or (date.today(), date.today())
+    selected_dates = st.date_input("날짜 범위 선택", value=(min_date, max_date), key=f"dates_{stage_key}")
+    
+    if st.button("분석 실행", key=f"analyze_{stage_key}"):
+        if len(selected_dates) == 2:
+            # 세션에는 분석 조건만 보관하고, 결과는 공유 캐시(get_stage_analysis)에서 가져옵니다.
+            start_date, end_date = selected_dates
+            analysis_filter = (start_date, end_date, None if selected_pc == '모든 PC' else selected_pc)
+            st.session_state.analysis_results[stage_key] = {'filter': analysis_filter}
+            st.session_state.original_db_view[stage_key] = {'filter': analysis_filter, 'show': False}
+            st.session_state['last_analyzed_key'] = stage_key
+            get_stage_analysis(data_version, stage_key, *analysis_filter, df_all_data)
+            st.success("분석 완료! 결과가 저장되었습니다.")
+        else:
+            st.warning("날짜 범위를 올바르게 선택해주세요.")
+
+    # 분석 결과가 존재하면 항상 표시
+    selection = st.session_state.analysis_results[stage_key]
+    if selection is not None:
+        # 결과는 현재 데이터 버전으로 캐시됩니다. 데이터가 추가되면 같은 분석 조건으로 다시 계산되어 리포트가 갱신되며,
+        # SerialIdx / serials도 항상 같은 버전의 데이터에서 나온 값을 사용합니다.
+        analysis_args = (data_version, stage_key, *selection['filter'])
+        analysis = get_stage_analysis(*analysis_args, df_all_data)
+        display_analysis_result(stage_key, stage['table_name'], analysis,
+                                lambda used_jig_col: get_retest_units(*analysis_args, used_jig_col, df_all_data),
+                                lambda export_format, *args: get_report_export(*analysis_args, export_format, *args, serials),
+                                lambda granularity, calendar: get_cube_rollup(*analysis_args, granularity, calendar,
+                                                                              analysis['cube']),
+                                lambda window_hours: get_rolling_yield(*analysis_args, window_hours, analysis['cube']),
+                                selected_jig=selected_pc if selected_pc != '모든 PC' else None, serials=serials)
+        if analysis['n_rows'] > 0:
+            display_export_panel(stage_key, stage['table_name'], get_export_queue(), df_all_data,
+                                 lambda: filter_positions(df_all_data, stage, day_codes['codes'], *selection['filter']), analysis, serials)
+    
+    st.markdown("---")
+    display_stage_lookup(stage_key, df_all_data,
+                         lambda *args: get_raw_view_positions(data_version, *args, df_all_data),
+                         lambda *args: get_snumber_matches(data_version, *args, df_all_data))
+
+
+# SNumber 검색 / 원본 조회 영역은 프래그먼트로 분리해, 버튼을 눌러도 이 영역만 다시 실행됩니다.
+@st.fragment
+def display_stage_lookup(stage_key, df_all_data, get_positions, get_matches):
+    label = STAGE_REGISTRY[stage_key]['label']
+    st.markdown(f"#### {label} 데이터 조회")
+    snumber_query = st.text_input(f"SNumber를 입력하세요 ({label})", key=f"snumber_search_bar_{stage_key}")
+    
+    col_search_btn, col_view_btn = st.columns(2)
+    with col_search_btn:
+        if st.button("SNumber 검색 실행", key=f"snumber_search_btn_{stage_key}"):
+            st.session_state.snumber_search[stage_key] = {'query': snumber_query, 'show': True}
+            analysis_filter = st.session_state.original_db_view[stage_key]['filter']
+            if not snumber_query:
+                st.warning("SNumber를 입력해주세요.")
+            elif analysis_filter is None:
+                st.warning(f"먼저 {label} 탭에서 '분석 실행' 버튼을 눌러 데이터를 분석해주세요.")
+            else:
+                with st.spinner("데이터베이스에서 SNumber 검색 중..."):
+                    n_matches = len(get_matches(stage_key, *analysis_filter, snumber_query))
+                if n_matches:
+                    st.success(f"'{snumber_query}'에 대한 {n_matches}건의 검색 결과를 찾았습니다.")
+                else:
+                    st.warning(f"'{snumber_query}'에 대한 검색 결과가 없습니다.")
+
+    with col_view_btn:
+        if st.button("원본 DB 조회", key=f"view_last_db_{stage_key}"):
+            st.session_state.original_db_view[stage_key]['show'] = True
+            if st.session_state.original_db_view[stage_key]['filter'] is not None:
+                st.success(f"{label} 탭의 원본 데이터를 조회합니다.")
+            else:
+                st.warning(f"먼저 {label} 탭에서 '분석 실행' 버튼을 눌러 데이터를 분석해주세요.")
+
+    # 검색 결과는 세션에 보관한 검색어로 공유 데이터에서 그때그때 꺼내, 현재 페이지 행만 표시합니다.
+    search = st.session_state.snumber_search[stage_key]
+    analysis_filter = st.session_state.original_db_view[stage_key]['filter']
+    if search['show'] and search['query'] and analysis_filter is not None:
+        matches = get_matches(stage_key, *analysis_filter, search['query'])
+        if len(matches):
+            display_search_results(stage_key, df_all_data, matches)
+
+    if st.session_state.original_db_view[stage_key]['show'] and st.session_state.original_db_view[stage_key]['filter'] is not None:
+        display_raw_viewer(stage_key, df_all_data, get_positions)
+
+
+# 화면 목록: 공정 화면은 STAGE_REGISTRY 순서대로, 이어서 공통 분석 화면
+PAGE_LABELS = {
+    **{key: f"파일 {STAGE_REGISTRY[key]['label']} 분석" for key in STAGE_ORDER},
+    'traceability': "공정 추적 분석",
+    'olap': "큐브 즉시 조회",
+    'distinct': "장기 고유 수량",
+    'distribution': "측정값 분포",
+    'spc': "SPC 관리도",
+    'spec': "규격 재평가",
+    'cross_stage': "공정 간 상관 분석",
+    'lot': "Lot 분석",
+}
 
 
 def main():
@@ -222,19 +621,15 @@ def main():
     if conn is None:
         return
 
+    # 지그별 불량률 급증 감지 결과를 페이지 상단 배너로 표시
+    spike_flags = refresh_spike_detector(get_spike_detector(), lambda last_rowid, tail: read_rows_after(conn, last_rowid, tail))
+    display_spike_banner(spike_flags)
+
     # 세션 상태 초기화
     if 'analysis_results' not in st.session_state:
         st.session_state.analysis_results = {
             'pcb': None, 'fw': None, 'rftx': None, 'semi': None, 'func': None
         }
-    if 'analysis_data' not in st.session_state:
-        st.session_state.analysis_data = {
-            'pcb': None, 'fw': None, 'rftx': None, 'semi': None, 'func': None
-        }
-    if 'analysis_time' not in st.session_state:
-        st.session_state.analysis_time = {
-            'pcb': None, 'fw': None, 'rftx': None, 'semi': None, 'func': None
-        }
     if 'last_analyzed_key' not in st.session_state:
         st.session_state['last_analyzed_key'] = None
     if 'jig_col_mapping' not in st.session_state:
@@ -249,430 +644,99 @@ def main():
         st.session_state.show_line_chart = {}
     if 'show_bar_chart' not in st.session_state:
         st.session_state.show_bar_chart = {}
+    if 'show_rolling_chart' not in st.session_state:
+        st.session_state.show_rolling_chart = {}
+    if 'shift_calendar' not in st.session_state:
+        st.session_state.shift_calendar = dict(DEFAULT_SHIFT_CALENDAR)
+    if 'lot_prefix' not in st.session_state:
+        st.session_state.lot_prefix = dict(DEFAULT_LOT_PREFIX)
+    if 'export_jobs' not in st.session_state:
+        st.session_state.export_jobs = []
     if 'snumber_search' not in st.session_state:
         st.session_state.snumber_search = {
-            'pcb': {'results': pd.DataFrame(), 'show': False},
-            'fw': {'results': pd.DataFrame(), 'show': False},
-            'rftx': {'results': pd.DataFrame(), 'show': False},
-            'semi': {'results': pd.DataFrame(), 'show': False},
-            'func': {'results': pd.DataFrame(), 'show': False},
+            'pcb': {'query': '', 'show': False},
+            'fw': {'query': '', 'show': False},
+            'rftx': {'query': '', 'show': False},
+            'semi': {'query': '', 'show': False},
+            'func': {'query': '', 'show': False},
         }
     if 'original_db_view' not in st.session_state:
         st.session_state.original_db_view = {
-            'pcb': {'results': pd.DataFrame(), 'show': False},
-            'fw': {'results': pd.DataFrame(), 'show': False},
-            'rftx': {'results': pd.DataFrame(), 'show': False},
-            'semi': {'results': pd.DataFrame(), 'show': False},
-            'func': {'results': pd.DataFrame(), 'show': False},
+            'pcb': {'filter': None, 'show': False},
+            'fw': {'filter': None, 'show': False},
+            'rftx': {'filter': None, 'show': False},
+            'semi': {'filter': None, 'show': False},
+            'func': {'filter': None, 'show': False},
         }
     
+    data_version = get_data_version(conn)
     try:
-        # 모든 탭에서 공통으로 사용할 원본 데이터를 한 번만 불러옵니다.
-        df_all_data = pd.read_sql_query("SELECT * FROM historyinspection;", conn)
+        # 모든 화면에서 공통으로 사용할 원본 데이터는 데이터 버전이 바뀔 때만 다시 불러옵니다.
+        df_all_data, serials = get_all_data(data_version, conn)
     except Exception as e:
         st.error(f"데이터베이스에서 'historyinspection' 테이블을 불러오는 중 오류가 발생했습니다: {e}")
         return
 
-    # 모든 날짜 관련 컬럼을 datetime 객체로 미리 변환
-    df_all_data['PcbStartTime_dt'] = pd.to_datetime(df_all_data['PcbStartTime'], errors='coerce')
-    df_all_data['FwStamp_dt'] = pd.to_datetime(df_all_data['FwStamp'], errors='coerce')
-    df_all_data['RfTxStamp_dt'] = pd.to_datetime(df_all_data['RfTxStamp'], errors='coerce')
-    df_all_data['SemiAssyStartTime_dt'] = pd.to_datetime(df_all_data['SemiAssyStartTime'], errors='coerce')
-    df_all_data['BatadcStamp_dt'] = pd.to_datetime(df_all_data['BatadcStamp'], errors='coerce')
-    
-    # --- 탭별 분석 기능 ---
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["파일 PCB 분석", "파일 Fw 분석", "파일 RfTx 분석", "파일 Semi 분석", "파일 Func 분석"])
+    # 캐시된 DataFrame은 공유되므로 직접 수정하지 않고, Lot 컬럼을 붙인 새 DataFrame을 사용합니다. (Copy-on-Write)
+    lot_prefix = st.session_state.lot_prefix
+    df_all_data = df_all_data.assign(
+        Lot=get_lot_column(data_version, lot_prefix['start'], lot_prefix['length'], df_all_data, serials))
     
-    try:
-        with tab1:
-            st.header("파일 PCB (Pcb_Process)")
-            
-            # PC (Jig) 선택 기능 추가
-            pc_col_name = 'PcbMaxIrPwr'
-            unique_pc_pcb = df_all_data[pc_col_name].dropna().unique()
-            pc_options_pcb = ['모든 PC'] + sorted(list(unique_pc_pcb))
-            selected_pc_pcb = st.selectbox("PC (Jig) 선택", pc_options_pcb, key="pc_select_pcb")
-
-            df_dates = df_all_data['PcbStartTime_dt'].dt.date.dropna()
-            min_date = df_dates.min() if not df_dates.empty else date.today()
-            max_date = df_dates.max() if not df_dates.dropna().empty else date.today()
-            selected_dates = st.date_input("날짜 범위 선택", value=(min_date, max_date), key="dates_pcb")
-            
-            if st.button("분석 실행", key="analyze_pcb"):
-                with st.spinner("데이터 분석 및 저장 중..."):
-                    if len(selected_dates) == 2:
-                        start_date, end_date = selected_dates
-                        df_filtered = df_all_data[
-                            (df_all_data['PcbStartTime_dt'].dt.date >= start_date) &
-                            (df_all_data['PcbStartTime_dt'].dt.date <= end_date)
-                        ].copy()
-                        if selected_pc_pcb != '모든 PC':
-                            df_filtered = df_filtered[df_filtered[pc_col_name] == selected_pc_pcb].copy()
-                    else:
-                        st.warning("날짜 범위를 올바르게 선택해주세요.")
-                        df_filtered = pd.DataFrame()
-                    
-                    st.session_state.analysis_results['pcb'] = df_filtered
-                    st.session_state.analysis_data['pcb'] = analyze_data(df_filtered, 'PcbStartTime_dt', pc_col_name)
-                    st.session_state.analysis_time['pcb'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    st.session_state['last_analyzed_key'] = 'pcb'
-                st.success("분석 완료! 결과가 저장되었습니다.")
-
-            # 분석 결과가 존재하면 항상 표시
-            if st.session_state.analysis_results['pcb'] is not None:
-                display_analysis_result('pcb', 'Pcb_Process', 'PcbStartTime_dt',
-                                        selected_jig=selected_pc_pcb if selected_pc_pcb != '모든 PC' else None)
-            
-            st.markdown("---")
-            st.markdown("#### PCB 데이터 조회")
-            snumber_query_pcb = st.text_input("SNumber를 입력하세요 (PCB)", key="snumber_search_bar_pcb")
-            
-            col_search_btn, col_view_btn = st.columns(2)
-            with col_search_btn:
-                if st.button("SNumber 검색 실행", key="snumber_search_btn_pcb"):
-                    st.session_state.snumber_search['pcb']['show'] = True
-                    if snumber_query_pcb:
-                        with st.spinner("데이터베이스에서 SNumber 검색 중..."):
-                            filtered_df = st.session_state.analysis_results['pcb'][
-                                st.session_state.analysis_results['pcb']['SNumber'].fillna('').astype(str).str.contains(snumber_query_pcb, case=False, na=False)
-                            ]
-                        if not filtered_df.empty:
-                            st.success(f"'{snumber_query_pcb}'에 대한 {len(filtered_df)}건의 검색 결과를 찾았습니다.")
-                            st.session_state.snumber_search['pcb']['results'] = filtered_df
-                        else:
-                            st.warning(f"'{snumber_query_pcb}'에 대한 검색 결과가 없습니다.")
-                            st.session_state.snumber_search['pcb']['results'] = pd.DataFrame()
-                    else:
-                        st.warning("SNumber를 입력해주세요.")
-                        st.session_state.snumber_search['pcb']['results'] = pd.DataFrame()
-
-            with col_view_btn:
-                if st.button("원본 DB 조회", key="view_last_db_pcb"):
-                    st.session_state.original_db_view['pcb']['show'] = True
-                    if st.session_state.analysis_results['pcb'] is not None:
-                        st.success(f"PCB 탭의 원본 데이터를 조회합니다.")
-                        st.session_state.original_db_view['pcb']['results'] = st.session_state.analysis_results['pcb'].copy()
-                    else:
-                        st.warning("먼저 PCB 탭에서 '분석 실행' 버튼을 눌러 데이터를 분석해주세요.")
-                        st.session_state.original_db_view['pcb']['results'] = pd.DataFrame()
-
-            if st.session_state.snumber_search['pcb']['show'] and not st.session_state.snumber_search['pcb']['results'].empty:
-                st.dataframe(st.session_state.snumber_search['pcb']['results'].reset_index(drop=True))
-
-            if st.session_state.original_db_view['pcb']['show'] and not st.session_state.original_db_view['pcb']['results'].empty:
-                st.dataframe(st.session_state.original_db_view['pcb']['results'].reset_index(drop=True))
-
-
-        with tab2:
-            st.header("파일 Fw (Fw_Process)")
-
-            pc_col_name = 'FwPC'
-            unique_pc_fw = df_all_data[pc_col_name].dropna().unique()
-            pc_options_fw = ['모든 PC'] + sorted(list(unique_pc_fw))
-            selected_pc_fw = st.selectbox("PC (Jig) 선택", pc_options_fw, key="pc_select_fw")
-
-            df_dates = df_all_data['FwStamp_dt'].dt.date.dropna()
-            min_date = df_dates.min() if not df_dates.empty else date.today()
-            max_date = df_dates.max() if not df_dates.dropna().empty else date.today()
-            selected_dates = st.date_input("날짜 범위 선택", value=(min_date, max_date), key="dates_fw")
-            
-            if st.button("분석 실행", key="analyze_fw"):
-                with st.spinner("데이터 분석 및 저장 중..."):
-                    if len(selected_dates) == 2:
-                        start_date, end_date = selected_dates
-                        df_filtered = df_all_data[
-                            (df_all_data['FwStamp_dt'].dt.date >= start_date) &
-                            (df_all_data['FwStamp_dt'].dt.date <= end_date)
-                        ].copy()
-                        if selected_pc_fw != '모든 PC':
-                            df_filtered = df_filtered[df_filtered[pc_col_name] == selected_pc_fw].copy()
-                    else:
-                        st.warning("날짜 범위를 올바르게 선택해주세요.")
-                        df_filtered = pd.DataFrame()
-
-                    st.session_state.analysis_results['fw'] = df_filtered
-                    st.session_state.analysis_data['fw'] = analyze_data(df_filtered, 'FwStamp_dt', pc_col_name)
-                    st.session_state.analysis_time['fw'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    st.session_state['last_analyzed_key'] = 'fw'
-                st.success("분석 완료! 결과가 저장되었습니다.")
-
-            # 분석 결과가 존재하면 항상 표시
-            if st.session_state.analysis_results['fw'] is not None:
-                display_analysis_result('fw', 'Fw_Process', 'FwStamp_dt',
-                                        selected_jig=selected_pc_fw if selected_pc_fw != '모든 PC' else None)
-
-            st.markdown("---")
-            st.markdown("#### Fw 데이터 조회")
-            snumber_query_fw = st.text_input("SNumber를 입력하세요 (Fw)", key="snumber_search_bar_fw")
-            
-            col_search_btn, col_view_btn = st.columns(2)
-            with col_search_btn:
-                if st.button("SNumber 검색 실행", key="snumber_search_btn_fw"):
-                    st.session_state.snumber_search['fw']['show'] = True
-                    if snumber_query_fw:
-                        with st.spinner("데이터베이스에서 SNumber 검색 중..."):
-                            filtered_df = st.session_state.analysis_results['fw'][
-                                st.session_state.analysis_results['fw']['SNumber'].fillna('').astype(str).str.contains(snumber_query_fw, case=False, na=False)
-                            ]
-                        if not filtered_df.empty:
-                            st.success(f"'{snumber_query_fw}'에 대한 {len(filtered_df)}건의 검색 결과를 찾았습니다.")
-                            st.session_state.snumber_search['fw']['results'] = filtered_df
-                        else:
-                            st.warning(f"'{snumber_query_fw}'에 대한 검색 결과가 없습니다.")
-                            st.session_state.snumber_search['fw']['results'] = pd.DataFrame()
-                    else:
-                        st.warning("SNumber를 입력해주세요.")
-                        st.session_state.snumber_search['fw']['results'] = pd.DataFrame()
-
-            with col_view_btn:
-                if st.button("원본 DB 조회", key="view_last_db_fw"):
-                    st.session_state.original_db_view['fw']['show'] = True
-                    if st.session_state.analysis_results['fw'] is not None:
-                        st.success(f"Fw 탭의 원본 데이터를 조회합니다.")
-                        st.session_state.original_db_view['fw']['results'] = st.session_state.analysis_results['fw'].copy()
-                    else:
-                        st.warning("먼저 Fw 탭에서 '분석 실행' 버튼을 눌러 데이터를 분석해주세요.")
-                        st.session_state.original_db_view['fw']['results'] = pd.DataFrame()
-
-            if st.session_state.snumber_search['fw']['show'] and not st.session_state.snumber_search['fw']['results'].empty:
-                st.dataframe(st.session_state.snumber_search['fw']['results'].reset_index(drop=True))
-
-            if st.session_state.original_db_view['fw']['show'] and not st.session_state.original_db_view['fw']['results'].empty:
-                st.dataframe(st.session_state.original_db_view['fw']['results'].reset_index(drop=True))
-
-        with tab3:
-            st.header("파일 RfTx (RfTx_Process)")
-
-            pc_col_name = 'RfTxPC'
-            unique_pc_rftx = df_all_data[pc_col_name].dropna().unique()
-            pc_options_rftx = ['모든 PC'] + sorted(list(unique_pc_rftx))
-            selected_pc_rftx = st.selectbox("PC (Jig) 선택", pc_options_rftx, key="pc_select_rftx")
-
-            df_dates = df_all_data['RfTxStamp_dt'].dt.date.dropna()
-            min_date = df_dates.min() if not df_dates.empty else date.today()
-            max_date = df_dates.max() if not df_dates.dropna().empty else date.today()
-            selected_dates = st.date_input("날짜 범위 선택", value=(min_date, max_date), key="dates_rftx")
-            
-            if st.button("분석 실행", key="analyze_rftx"):
-                with st.spinner("데이터 분석 및 저장 중..."):
-                    if len(selected_dates) == 2:
-                        start_date, end_date = selected_dates
-                        df_filtered = df_all_data[
-                            (df_all_data['RfTxStamp_dt'].dt.date >= start_date) &
-                            (df_all_data['RfTxStamp_dt'].dt.date <= end_date)
-                        ].copy()
-                        if selected_pc_rftx != '모든 PC':
-                            df_filtered = df_filtered[df_filtered[pc_col_name] == selected_pc_rftx].copy()
-                    else:
-                        st.warning("날짜 범위를 올바르게 선택해주세요.")
-                        df_filtered = pd.DataFrame()
-
-                    st.session_state.analysis_results['rftx'] = df_filtered
-                    st.session_state.analysis_data['rftx'] = analyze_data(df_filtered, 'RfTxStamp_dt', pc_col_name)
-                    st.session_state.analysis_time['rftx'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    st.session_state['last_analyzed_key'] = 'rftx'
-                st.success("분석 완료! 결과가 저장되었습니다.")
-
-            # 분석 결과가 존재하면 항상 표시
-            if st.session_state.analysis_results['rftx'] is not None:
-                display_analysis_result('rftx', 'RfTx_Process', 'RfTxStamp_dt',
-                                        selected_jig=selected_pc_rftx if selected_pc_rftx != '모든 PC' else None)
-
-            st.markdown("---")
-            st.markdown("#### RfTx 데이터 조회")
-            snumber_query_rftx = st.text_input("SNumber를 입력하세요 (RfTx)", key="snumber_search_bar_rftx")
-            
-            col_search_btn, col_view_btn = st.columns(2)
-            with col_search_btn:
-                if st.button("SNumber 검색 실행", key="snumber_search_btn_rftx"):
-                    st.session_state.snumber_search['rftx']['show'] = True
-                    if snumber_query_rftx:
-                        with st.spinner("데이터베이스에서 SNumber 검색 중..."):
-                            filtered_df = st.session_state.analysis_results['rftx'][
-                                st.session_state.analysis_results['rftx']['SNumber'].fillna('').astype(str).str.contains(snumber_query_rftx, case=False, na=False)
-                            ]
-                        if not filtered_df.empty:
-                            st.success(f"'{snumber_query_rftx}'에 대한 {len(filtered_df)}건의 검색 결과를 찾았습니다.")
-                            st.session_state.snumber_search['rftx']['results'] = filtered_df
-                        else:
-                            st.warning(f"'{snumber_query_rftx}'에 대한 검색 결과가 없습니다.")
-                            st.session_state.snumber_search['rftx']['results'] = pd.DataFrame()
-                    else:
-                        st.warning("SNumber를 입력해주세요.")
-                        st.session_state.snumber_search['rftx']['results'] = pd.DataFrame()
-
-            with col_view_btn:
-                if st.button("원본 DB 조회", key="view_last_db_rftx"):
-                    st.session_state.original_db_view['rftx']['show'] = True
-                    if st.session_state.analysis_results['rftx'] is not None:
-                        st.success(f"RfTx 탭의 원본 데이터를 조회합니다.")
-                        st.session_state.original_db_view['rftx']['results'] = st.session_state.analysis_results['rftx'].copy()
-                    else:
-                        st.warning("먼저 RfTx 탭에서 '분석 실행' 버튼을 눌러 데이터를 분석해주세요.")
-                        st.session_state.original_db_view['rftx']['results'] = pd.DataFrame()
-
-            if st.session_state.snumber_search['rftx']['show'] and not st.session_state.snumber_search['rftx']['results'].empty:
-                st.dataframe(st.session_state.snumber_search['rftx']['results'].reset_index(drop=True))
-
-            if st.session_state.original_db_view['rftx']['show'] and not st.session_state.original_db_view['rftx']['results'].empty:
-                st.dataframe(st.session_state.original_db_view['rftx']['results'].reset_index(drop=True))
-
-        with tab4:
-            st.header("파일 Semi (SemiAssy_Process)")
-
-            pc_col_name = 'SemiAssyMaxBatVolt'
-            unique_pc_semi = df_all_data[pc_col_name].dropna().unique()
-            pc_options_semi = ['모든 PC'] + sorted(list(unique_pc_semi))
-            selected_pc_semi = st.selectbox("PC (Jig) 선택", pc_options_semi, key="pc_select_semi")
-
-            df_dates = df_all_data['SemiAssyStartTime_dt'].dt.date.dropna()
-            min_date = df_dates.min() if not df_dates.empty else date.today()
-            max_date = df_dates.max() if not df_dates.dropna().empty else date.today()
-            selected_dates = st.date_input("날짜 범위 선택", value=(min_date, max_date), key="dates_semi")
-            
-            if st.button("분석 실행", key="analyze_semi"):
-                with st.spinner("데이터 분석 및 저장 중..."):
-                    if len(selected_dates) == 2:
-                        start_date, end_date = selected_dates
-                        df_filtered = df_all_data[
-                            (df_all_data['SemiAssyStartTime_dt'].dt.date >= start_date) &
-                            (df_all_data['SemiAssyStartTime_dt'].dt.date <= end_date)
-                        ].copy()
-                        if selected_pc_semi != '모든 PC':
-                            df_filtered = df_filtered[df_filtered[pc_col_name] == selected_pc_semi].copy()
-                    else:
-                        st.warning("날짜 범위를 올바르게 선택해주세요.")
-                        df_filtered = pd.DataFrame()
-
-                    st.session_state.analysis_results['semi'] = df_filtered
-                    st.session_state.analysis_data['semi'] = analyze_data(df_filtered, 'SemiAssyStartTime_dt', pc_col_name)
-                    st.session_state.analysis_time['semi'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    st.session_state['last_analyzed_key'] = 'semi'
-                st.success("분석 완료! 결과가 저장되었습니다.")
-
-            # 분석 결과가 존재하면 항상 표시
-            if st.session_state.analysis_results['semi'] is not None:
-                display_analysis_result('semi', 'SemiAssy_Process', 'SemiAssyStartTime_dt',
-                                        selected_jig=selected_pc_semi if selected_pc_semi != '모든 PC' else None)
+    # --- 화면 선택 ---
+    # st.tabs는 모든 탭 본문을 매번 실행하므로, 선택한 화면 하나만 실행되도록 라디오 내비게이션을 사용합니다.
+    page_key = st.radio("분석 화면", list(PAGE_LABELS.keys()), format_func=PAGE_LABELS.get,
+                        horizontal=True, key="page_select")
+    st.markdown("---")
 
+    try:
+        if page_key in STAGE_REGISTRY:
+            render_stage_page(page_key, df_all_data, serials, data_version, conn)
+            return
+
+        if page_key == 'traceability':
+            st.header("공정 추적 (Traceability)")
+            display_traceability_report(get_traceability_matrix(data_version, df_all_data))
+
+        elif page_key == 'olap':
+            st.header("큐브 즉시 조회 (OLAP)")
+            display_olap_explorer(get_olap_cube(data_version, df_all_data))
+
+        elif page_key == 'distinct':
+            st.header("장기 고유 수량 (HyperLogLog)")
+            display_distinct_unit_totals(
+                df_all_data, lambda error_rate: get_hll_sketches(data_version, error_rate, df_all_data),
+                lambda stage_key: get_stage_day_codes(data_version, stage_key, df_all_data))
+
+        elif page_key == 'distribution':
+            st.header("측정값 분포 (분위수 스케치)")
+            display_quantile_trends(get_quantile_sketches(data_version, df_all_data))
             st.markdown("---")
-            st.markdown("#### Semi 데이터 조회")
-            snumber_query_semi = st.text_input("SNumber를 입력하세요 (Semi)", key="snumber_search_bar_semi")
-            
-            col_search_btn, col_view_btn = st.columns(2)
-            with col_search_btn:
-                if st.button("SNumber 검색 실행", key="snumber_search_btn_semi"):
-                    st.session_state.snumber_search['semi']['show'] = True
-                    if snumber_query_semi:
-                        with st.spinner("데이터베이스에서 SNumber 검색 중..."):
-                            filtered_df = st.session_state.analysis_results['semi'][
-                                st.session_state.analysis_results['semi']['SNumber'].fillna('').astype(str).str.contains(snumber_query_semi, case=False, na=False)
-                            ]
-                        if not filtered_df.empty:
-                            st.success(f"'{snumber_query_semi}'에 대한 {len(filtered_df)}건의 검색 결과를 찾았습니다.")
-                            st.session_state.snumber_search['semi']['results'] = filtered_df
-                        else:
-                            st.warning(f"'{snumber_query_semi}'에 대한 검색 결과가 없습니다.")
-                            st.session_state.snumber_search['semi']['results'] = pd.DataFrame()
-                    else:
-                        st.warning("SNumber를 입력해주세요.")
-                        st.session_state.snumber_search['semi']['results'] = pd.DataFrame()
-
-            with col_view_btn:
-                if st.button("원본 DB 조회", key="view_last_db_semi"):
-                    st.session_state.original_db_view['semi']['show'] = True
-                    if st.session_state.analysis_results['semi'] is not None:
-                        st.success(f"Semi 탭의 원본 데이터를 조회합니다.")
-                        st.session_state.original_db_view['semi']['results'] = st.session_state.analysis_results['semi'].copy()
-                    else:
-                        st.warning("먼저 Semi 탭에서 '분석 실행' 버튼을 눌러 데이터를 분석해주세요.")
-                        st.session_state.original_db_view['semi']['results'] = pd.DataFrame()
-
-            if st.session_state.snumber_search['semi']['show'] and not st.session_state.snumber_search['semi']['results'].empty:
-                st.dataframe(st.session_state.snumber_search['semi']['results'].reset_index(drop=True))
-
-            if st.session_state.original_db_view['semi']['show'] and not st.session_state.original_db_view['semi']['results'].empty:
-                st.dataframe(st.session_state.original_db_view['semi']['results'].reset_index(drop=True))
-
-        with tab5:
-            st.header("파일 Func (Func_Process)")
-
-            pc_col_name = 'BatadcPC'
-            unique_pc_func = df_all_data[pc_col_name].dropna().unique()
-            pc_options_func = ['모든 PC'] + sorted(list(unique_pc_func))
-            selected_pc_func = st.selectbox("PC (Jig) 선택", pc_options_func, key="pc_select_func")
-            
-            df_dates = df_all_data['BatadcStamp_dt'].dt.date.dropna()
-            min_date = df_dates.min() if not df_dates.empty else date.today()
-            max_date = df_dates.max() if not df_dates.dropna().empty else date.today()
-            selected_dates = st.date_input("날짜 범위 선택", value=(min_date, max_date), key="dates_func")
-            
-            if st.button("분석 실행", key="analyze_func"):
-                with st.spinner("데이터 분석 및 저장 중..."):
-                    if len(selected_dates) == 2:
-                        start_date, end_date = selected_dates
-                        df_filtered = df_all_data[
-                            (df_all_data['BatadcStamp_dt'].dt.date >= start_date) &
-                            (df_all_data['BatadcStamp_dt'].dt.date <= end_date)
-                        ].copy()
-                        if selected_pc_func != '모든 PC':
-                            df_filtered = df_filtered[df_filtered[pc_col_name] == selected_pc_func].copy()
-                    else:
-                        st.warning("날짜 범위를 올바르게 선택해주세요.")
-                        df_filtered = pd.DataFrame()
-                    
-                    st.session_state.analysis_results['func'] = df_filtered
-                    st.session_state.analysis_data['func'] = analyze_data(df_filtered, 'BatadcStamp_dt', pc_col_name)
-                    st.session_state.analysis_time['func'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    st.session_state['last_analyzed_key'] = 'func'
-                st.success("분석 완료! 결과가 저장되었습니다.")
-
-            # 분석 결과가 존재하면 항상 표시
-            if st.session_state.analysis_results['func'] is not None:
-                display_analysis_result('func', 'Func_Process', 'BatadcStamp_dt',
-                                        selected_jig=selected_pc_func if selected_pc_func != '모든 PC' else None)
-            
-            st.markdown("---")
-            st.markdown("#### Func 데이터 조회")
-            snumber_query_func = st.text_input("SNumber를 입력하세요 (Func)", key="snumber_search_bar_func")
-            
-            col_search_btn, col_view_btn = st.columns(2)
-            with col_search_btn:
-                if st.button("SNumber 검색 실행", key="snumber_search_btn_func"):
-                    st.session_state.snumber_search['func']['show'] = True
-                    if snumber_query_func:
-                        with st.spinner("데이터베이스에서 SNumber 검색 중..."):
-                            filtered_df = st.session_state.analysis_results['func'][
-                                st.session_state.analysis_results['func']['SNumber'].fillna('').astype(str).str.contains(snumber_query_func, case=False, na=False)
-                            ]
-                        if not filtered_df.empty:
-                            st.success(f"'{snumber_query_func}'에 대한 {len(filtered_df)}건의 검색 결과를 찾았습니다.")
-                            st.session_state.snumber_search['func']['results'] = filtered_df
-                        else:
-                            st.warning(f"'{snumber_query_func}'에 대한 검색 결과가 없습니다.")
-                            st.session_state.snumber_search['func']['results'] = pd.DataFrame()
-                    else:
-                        st.warning("SNumber를 입력해주세요.")
-                        st.session_state.snumber_search['func']['results'] = pd.DataFrame()
-
-            with col_view_btn:
-                if st.button("원본 DB 조회", key="view_last_db_func"):
-                    st.session_state.original_db_view['func']['show'] = True
-                    if st.session_state.analysis_results['func'] is not None:
-                        st.success(f"Func 탭의 원본 데이터를 조회합니다.")
-                        st.session_state.original_db_view['func']['results'] = st.session_state.analysis_results['func'].copy()
-                    else:
-                        st.warning("먼저 Func 탭에서 '분석 실행' 버튼을 눌러 데이터를 분석해주세요.")
-                        st.session_state.original_db_view['func']['results'] = pd.DataFrame()
-            
-            if st.session_state.snumber_search['func']['show'] and not st.session_state.snumber_search['func']['results'].empty:
-                st.dataframe(st.session_state.snumber_search['func']['results'].reset_index(drop=True))
-            
-            if st.session_state.original_db_view['func']['show'] and not st.session_state.original_db_view['func']['results'].empty:
-                st.dataframe(st.session_state.original_db_view['func']['results'].reset_index(drop=True))
+            display_measurement_histogram(get_histogram_cube(data_version, df_all_data))
+
+        elif page_key == 'spc':
+            st.header("SPC 관리도")
+            spc_monitor = get_spc_monitor()
+            refresh_spc_monitor(spc_monitor, lambda last_rowid, tail: read_rows_after(conn, last_rowid, tail))
+            display_spc_charts(spc_monitor)
+
+        elif page_key == 'spec':
+            st.header("규격 재평가")
+            display_spec_reevaluation(df_all_data, lambda stage_key: get_stage_day_codes(data_version, stage_key, df_all_data))
+
+        elif page_key == 'cross_stage':
+            st.header("공정 간 상관 분석")
+            display_cross_stage_analysis(get_stage_day_codes(data_version, PREDICTOR_STAGE, df_all_data)['range'],
+                                         lambda *dates: get_serial_features(data_version, *dates, df_all_data))
+
+        elif page_key == 'lot':
+            st.header("Lot 분석")
+            display_lot_analysis(df_all_data, lambda stage_key: get_stage_day_codes(data_version, stage_key, df_all_data))
     
     except Exception as e:
         st.error(f"데이터를 불러오는 중 오류가 발생했습니다: {e}")
+    finally:
+        # 이번 실행에서 바뀐 세션 상태까지 반영하도록 화면을 그린 뒤 세션 메모리를 표시합니다.
+        display_session_memory()
 
 if __name__ == "__main__":
     main()
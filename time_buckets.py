@@ -0,0 +1,306 @@
+import pandas as pd
+import numpy as np
+
+from aggregation import normalize_pass_status, unit_flags
+
+# 화면 표시용 집계 단위 → 내부 키
+GRANULARITY_OPTIONS = {
+    '시간': 'hour',
+    '교대': 'shift',
+    '생산일': 'production_day',
+    '일': 'day',
+    '주': 'week',
+    '월': 'month',
+}
+
+# 기본 교대 달력: 교대 이름과 시작 시각(정시), 휴무 요일(월=0 ... 일=6), 휴무일 생산 귀속 규칙
+# 생산일은 첫 교대 시작 시각부터 다음 날 첫 교대 시작 전까지이며, 야간 교대는 자정을 넘겨도 같은 생산일입니다.
+DEFAULT_SHIFT_CALENDAR = {
+    'shifts': (('주간', 8), ('야간', 20)),
+    'weekend_days': (),
+    'weekend_rule': 'keep',
+}
+
+# 휴무일에 발생한 생산의 귀속 규칙
+WEEKEND_RULES = {
+    'keep': '휴무일 그대로',
+    'previous': '직전 근무일로 귀속',
+    'next': '다음 근무일로 귀속',
+}
+
+_HOUR_NS = 3600 * 10**9
+_DAY_NS = 24 * _HOUR_NS
+
+
+def build_hourly_cube(df, date_col_name, jig_col_name, pass_col_name):
+    """
+    (지그, 시간) 단위의 SNumber 집합 큐브를 한 번만 생성합니다.
+    각 셀에는 전체 / PASS('O') / FAIL('X') 이력이 있는 SNumber 코드 배열이 저장되어,
+    상위 집계 단위는 원본 행을 다시 읽지 않고 집합 병합만으로 계산할 수 있습니다.
+    Args:
+        df (pd.DataFrame): 분석 기간으로 필터링된 DataFrame.
+        date_col_name (str): 날짜/시간 컬럼명.
+        jig_col_name (str): 지그(PC) 컬럼명.
+        pass_col_name (str): 공정의 합격 여부 컬럼명.
+    Returns:
+        dict: 'jigs', 'hours', 'serials', 'cells' 키를 가진 큐브.
+    """
+    cube = {'jigs': [], 'hours': pd.DatetimeIndex([]), 'serials': np.array([], dtype=object), 'cells': {}}
+    if df.empty or 'SNumber' not in df.columns or date_col_name not in df.columns:
+        return cube
+
+    work = pd.DataFrame({
+        'SNumber': df['SNumber'],
+        'hour': df[date_col_name].dt.floor('h'),
+        'PassStatusNorm': normalize_pass_status(df[pass_col_name]) if pass_col_name in df.columns else '',
+    })
+    # analyze_data와 동일하게 지그 정보가 없으면 '전체'로 묶습니다.
+    if jig_col_name in df.columns and not df[jig_col_name].isnull().all():
+        work['jig'] = df[jig_col_name]
+    else:
+        work['jig'] = '전체'
+    work = work.dropna(subset=['SNumber', 'hour', 'jig'])
+    if work.empty:
+        return cube
+
+    sn_codes, serials = pd.factorize(work['SNumber'])
+    jig_codes, jigs = pd.factorize(work['jig'], sort=True)
+    hour_codes, hours = pd.factorize(work['hour'], sort=True)
+    work = pd.DataFrame({
+        'jig': jig_codes,
+        'hour': hour_codes,
+        'SNumber': sn_codes.astype(np.int32),
+        'PassStatusNorm': work['PassStatusNorm'].to_numpy(),
+    })
+
+    # (지그, 시간, SNumber) 단위 O/X 플래그를 한 번에 계산한 뒤 셀 경계로 나눕니다.
+    flags = unit_flags(work, ['jig', 'hour'])
+    cell_ids = flags['jig'].to_numpy().astype(np.int64) * len(hours) + flags['hour'].to_numpy()
+    boundaries = np.flatnonzero(np.diff(cell_ids)) + 1
+    starts = np.concatenate(([0], boundaries))
+    sn_all = flags['SNumber'].to_numpy()
+    has_pass = flags['has_pass'].to_numpy()
+    has_fail = flags['has_fail'].to_numpy()
+
+    cells = {}
+    for cell_sns, cell_pass, cell_fail, start in zip(
+        np.split(sn_all, boundaries), np.split(has_pass, boundaries), np.split(has_fail, boundaries), starts
+    ):
+        cell_id = cell_ids[start]
+        cells[(int(cell_id // len(hours)), int(cell_id % len(hours)))] = {
+            'all': cell_sns,
+            'pass': cell_sns[cell_pass],
+            'fail': cell_sns[cell_fail],
+        }
+
+    cube.update({'jigs': list(jigs), 'hours': pd.DatetimeIndex(hours), 'serials': np.asarray(serials), 'cells': cells})
+    return cube
+
+
+def validate_shift_calendar(calendar):
+    """
+    교대 달력 설정을 검사합니다. 시간 단위 큐브를 병합하므로 교대는 정시에 시작해야 합니다.
+    Raises:
+        ValueError: 설정이 올바르지 않은 경우.
+    """
+    shifts = calendar['shifts']
+    if not shifts:
+        raise ValueError("교대를 하나 이상 지정해야 합니다.")
+    start_hours = [start for _, start in shifts]
+    for start in start_hours:
+        if float(start) != int(start) or not 0 <= int(start) < 24:
+            raise ValueError(f"교대 시작 시각은 0~23시 정시여야 합니다: {start}")
+    if len(set(start_hours)) != len(start_hours):
+        raise ValueError("교대 시작 시각이 중복되었습니다.")
+    if calendar['weekend_rule'] not in WEEKEND_RULES:
+        raise ValueError(f"지원하지 않는 휴무일 규칙입니다: {calendar['weekend_rule']}")
+    if len(set(calendar['weekend_days'])) >= 7:
+        raise ValueError("모든 요일을 휴무일로 지정할 수 없습니다.")
+
+
+def _weekend_offsets(calendar):
+    """요일(월=0)별로 생산일에 더할 일수 (휴무일 → 직전/다음 근무일)"""
+    offsets = np.zeros(7, dtype=np.int64)
+    weekend = set(calendar['weekend_days'])
+    if calendar['weekend_rule'] == 'keep' or not weekend:
+        return offsets
+    step = -1 if calendar['weekend_rule'] == 'previous' else 1
+    for weekday in weekend:
+        offset = step
+        while (weekday + offset) % 7 in weekend:
+            offset += step
+        offsets[weekday] = offset
+    return offsets
+
+
+def production_shift_codes(stamps, calendar=DEFAULT_SHIFT_CALENDAR):
+    """
+    시각을 epoch 정수 연산으로 (생산일, 교대) 코드로 변환합니다. (.dt.date 추출과 같은 수준의 비용)
+    Args:
+        stamps (pd.DatetimeIndex or pd.Series): 시각 (NaT 허용).
+        calendar (dict): 교대 달력 설정.
+    Returns:
+        tuple: (생산일 코드 = 1970-01-01 이후 일수 int64 배열, 교대 인덱스 int64 배열, 유효 여부 bool 배열)
+               교대 인덱스는 시작 시각 순으로 정렬한 calendar['shifts']의 위치입니다.
+    """
+    start_hours = np.array(sorted(start for _, start in calendar['shifts']), dtype=np.int64)
+    values = pd.DatetimeIndex(stamps).as_unit('ns').asi8
+    valid = values != np.iinfo(np.int64).min
+
+    # 첫 교대 시작 시각만큼 당겨서 일 단위로 나누면 생산일, 나머지가 생산일 내 경과 시간입니다.
+    shifted = values - start_hours[0] * _HOUR_NS
+    production_day = np.floor_divide(shifted, _DAY_NS)
+    hour_in_day = np.floor_divide(shifted - production_day * _DAY_NS, _HOUR_NS)
+    shift_idx = np.searchsorted(start_hours - start_hours[0], hour_in_day, side='right') - 1
+
+    # 1970-01-01은 목요일(3)이므로 요일 = (일수 + 3) % 7
+    production_day = production_day + _weekend_offsets(calendar)[(production_day + 3) % 7]
+    return np.where(valid, production_day, 0), np.where(valid, shift_idx, 0), valid
+
+
+def bucket_starts(hours, granularity, calendar=DEFAULT_SHIFT_CALENDAR):
+    """
+    시간 버킷 시작 시각을 상위 집계 단위의 시작 시각으로 변환합니다.
+    Args:
+        hours (pd.DatetimeIndex): 시간 단위 버킷 시작 시각.
+        granularity (str): 'hour', 'shift', 'production_day', 'day', 'week', 'month' 중 하나.
+        calendar (dict): 'shift' / 'production_day'에 사용할 교대 달력 설정.
+    Returns:
+        pd.DatetimeIndex: 각 시간 버킷이 속하는 상위 버킷의 시작 시각.
+                          교대는 생산일 + 교대 시작 시각, 생산일은 생산일 자정입니다.
+    """
+    if granularity == 'hour':
+        return hours
+    if granularity == 'day':
+        return hours.normalize()
+    if granularity == 'week':
+        return hours.normalize() - pd.to_timedelta(hours.weekday, unit='D')
+    if granularity == 'month':
+        return hours.to_period('M').to_timestamp()
+    if granularity in ('shift', 'production_day'):
+        production_day, shift_idx, _ = production_shift_codes(hours, calendar)
+        start_ns = production_day * _DAY_NS
+        if granularity == 'shift':
+            start_hours = np.array(sorted(start for _, start in calendar['shifts']), dtype=np.int64)
+            start_ns = start_ns + start_hours[shift_idx] * _HOUR_NS
+        return pd.DatetimeIndex(start_ns.astype('datetime64[ns]'))
+    raise ValueError(f"지원하지 않는 집계 단위입니다: {granularity}")
+
+
+def format_bucket_label(bucket_start, granularity, calendar=DEFAULT_SHIFT_CALENDAR):
+    """버킷 시작 시각을 리포트 컬럼명으로 변환합니다."""
+    if granularity == 'hour':
+        return bucket_start.strftime('%y%m%d %H시')
+    if granularity == 'shift':
+        shift_names = {start: name for name, start in calendar['shifts']}
+        return f"{bucket_start.strftime('%y%m%d')} {shift_names.get(bucket_start.hour, bucket_start.strftime('%H시'))}"
+    if granularity == 'production_day':
+        return f"{bucket_start.strftime('%y%m%d')} 생산"
+    if granularity == 'week':
+        return f"{bucket_start.strftime('%y%m%d')}주"
+    if granularity == 'month':
+        return bucket_start.strftime('%Y-%m')
+    return bucket_start.strftime('%y%m%d')
+
+
+def rollup_cube(cube, granularity, calendar=DEFAULT_SHIFT_CALENDAR):
+    """
+    시간 단위 큐브를 상위 집계 단위로 병합합니다.
+    큐브는 여러 세션이 공유하므로 수정하지 않으며, 병합 결과는 호출하는 쪽에서 캐시합니다 (streamlit_app.get_cube_rollup).
+    Args:
+        cube (dict): build_hourly_cube()의 결과.
+        granularity (str): 'hour', 'shift', 'production_day', 'day', 'week', 'month' 중 하나.
+        calendar (dict): 'shift' / 'production_day'에 사용할 교대 달력 설정.
+    Returns:
+        tuple: (summary_data, 버킷 키 목록, 버킷 라벨 목록)
+               summary_data는 {지그: {버킷 키: 지표 dict}} 형태로 analyze_data 결과와 같습니다.
+    """
+    summary_data = {}
+    if not cube['cells']:
+        return summary_data, [], []
+
+    starts = bucket_starts(cube['hours'], granularity, calendar)
+    bucket_index, bucket_keys = pd.factorize(starts, sort=True)
+
+    # 같은 상위 버킷에 속하는 시간 셀을 모읍니다.
+    grouped = {}
+    for (jig_idx, hour_idx), cell in cube['cells'].items():
+        grouped.setdefault((jig_idx, bucket_index[hour_idx]), []).append(cell)
+
+    for (jig_idx, bucket_idx), cell_list in grouped.items():
+        if len(cell_list) == 1:
+            all_sns, pass_sns, fail_sns = cell_list[0]['all'], cell_list[0]['pass'], cell_list[0]['fail']
+        else:
+            all_sns = np.unique(np.concatenate([c['all'] for c in cell_list]))
+            pass_sns = np.unique(np.concatenate([c['pass'] for c in cell_list]))
+            fail_sns = np.unique(np.concatenate([c['fail'] for c in cell_list]))
+        false_defect_count = len(np.intersect1d(fail_sns, pass_sns, assume_unique=True))
+        jig = cube['jigs'][jig_idx]
+        summary_data.setdefault(jig, {})[bucket_keys[bucket_idx]] = {
+            'total_test': len(all_sns),
+            'pass': len(pass_sns),
+            'false_defect': false_defect_count,
+            'true_defect': len(fail_sns) - false_defect_count,
+            'fail': len(all_sns) - len(pass_sns),
+        }
+
+    bucket_keys = list(bucket_keys)
+    bucket_labels = [format_bucket_label(b, granularity, calendar) for b in bucket_keys]
+    return summary_data, bucket_keys, bucket_labels
+
+
+# 이동 수율 창 길이 (시간)
+ROLLING_WINDOWS = {
+    '24시간': 24,
+    '7일': 24 * 7,
+}
+
+
+def hourly_count_arrays(cube):
+    """
+    큐브 셀의 SNumber 수를 연속된 시간 축 위의 (지그 × 시간) 배열로 펼칩니다.
+    비어 있는 시간은 0으로 채워 창 길이를 배열 인덱스 차이로 계산할 수 있게 합니다.
+    Returns:
+        tuple: (연속 시간 축 DatetimeIndex, 전체 수 배열, PASS 수 배열)
+    """
+    hours = cube['hours']
+    if not cube['cells']:
+        empty = np.zeros((len(cube['jigs']), 0), dtype=np.int64)
+        return pd.DatetimeIndex([]), empty, empty
+
+    timeline = pd.date_range(hours[0], hours[-1], freq='h')
+    positions = timeline.get_indexer(hours)
+    totals = np.zeros((len(cube['jigs']), len(timeline)), dtype=np.int64)
+    passes = np.zeros_like(totals)
+    for (jig_idx, hour_idx), cell in cube['cells'].items():
+        totals[jig_idx, positions[hour_idx]] = len(cell['all'])
+        passes[jig_idx, positions[hour_idx]] = len(cell['pass'])
+    return timeline, totals, passes
+
+
+def rolling_yield(cube, window_hours):
+    """
+    시간 단위 SNumber 수의 누적 합 배열로 지그별 이동 수율(%)을 계산합니다.
+    창 합계는 누적 합의 차이이므로 창 길이와 무관하게 O(시간 버킷 수)입니다.
+    SNumber는 시간 버킷 단위로 계수되므로 여러 시간에 걸쳐 재검사한 SNumber는 버킷마다 집계됩니다.
+    Args:
+        cube (dict): build_hourly_cube()의 결과.
+        window_hours (int): 이동 창 길이 (시간).
+    Returns:
+        pd.DataFrame: 시간을 인덱스로, 지그별 이동 수율(%)을 컬럼으로 가진 DataFrame.
+                      창 안에 SNumber가 없는 시점은 NaN.
+    """
+    timeline, totals, passes = hourly_count_arrays(cube)
+    if len(timeline) == 0:
+        return pd.DataFrame()
+
+    # 앞에 0을 붙인 누적 합: 창 [t - w + 1, t]의 합 = cum[t + 1] - cum[max(t + 1 - w, 0)]
+    cum_total = np.concatenate([np.zeros((totals.shape[0], 1), dtype=np.int64), totals.cumsum(axis=1)], axis=1)
+    cum_pass = np.concatenate([np.zeros((passes.shape[0], 1), dtype=np.int64), passes.cumsum(axis=1)], axis=1)
+    end = np.arange(1, len(timeline) + 1)
+    start = np.maximum(end - window_hours, 0)
+    window_total = cum_total[:, end] - cum_total[:, start]
+    window_pass = cum_pass[:, end] - cum_pass[:, start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        yield_pct = np.where(window_total > 0, 100 * window_pass / window_total, np.nan)
+    return pd.DataFrame(yield_pct.T.round(2), index=timeline, columns=[str(j) for j in cube['jigs']])
@@ -0,0 +1,157 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from stage_registry import STAGE_ORDER, STAGE_REGISTRY
+
+# 공정별 상태 코드
+STATUS_NOT_REACHED = 0   # 미진입
+STATUS_FAIL = 1          # 최종 불합격 (PASS 이력 없음)
+STATUS_RETEST_PASS = 2   # 재검사 후 합격
+STATUS_FIRST_PASS = 3    # 최초 검사 합격
+
+
+def build_stage_matrix(df):
+    """
+    SNumber별 공정 상태 매트릭스를 한 번의 벡터 연산으로 생성합니다.
+    Args:
+        df (pd.DataFrame): historyinspection 원본 DataFrame (*_dt 컬럼 변환 완료).
+    Returns:
+        pd.DataFrame: index는 SNumber, 공정 키 컬럼에는 상태 코드(int8),
+                      'entry_date' 컬럼에는 최초 검사일이 들어 있습니다.
+    """
+    columns = STAGE_ORDER + ['entry_date']
+    if df.empty or 'SNumber' not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    # 모든 공정의 검사 이력을 (SNumber, 공정, 시간, 합격 여부) 형태로 세로로 쌓습니다.
+    frames = []
+    for stage_idx, key in enumerate(STAGE_ORDER):
+        stage = STAGE_REGISTRY[key]
+        if stage['pass_col'] not in df.columns or stage['date_col'] not in df.columns:
+            continue
+        status = df[stage['pass_col']].fillna('').astype(str).str.strip().str.upper()
+        valid = df[stage['date_col']].notna() & (status != '') & df['SNumber'].notna()
+        frames.append(pd.DataFrame({
+            'SNumber': df.loc[valid, 'SNumber'].to_numpy(),
+            'stage': np.full(int(valid.sum()), stage_idx, dtype=np.int64),
+            'stamp': df.loc[valid, stage['date_col']].to_numpy(),
+            'is_pass': (status[valid] == 'O').to_numpy(),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    long_df = pd.concat(frames, ignore_index=True)
+    if long_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    sn_codes, sn_uniques = pd.factorize(long_df['SNumber'])
+    n_units, n_stages = len(sn_uniques), len(STAGE_ORDER)
+    size = n_units * n_stages
+
+    # (SNumber, 공정) 셀 번호 기준, 셀 안에서는 시간 순으로 한 번만 정렬합니다.
+    cell = sn_codes.astype(np.int64) * n_stages + long_df['stage'].to_numpy()
+    stamps = long_df['stamp'].to_numpy().astype('int64')
+    order = np.lexsort((stamps, cell))
+    cell_sorted = cell[order]
+    is_pass_sorted = long_df['is_pass'].to_numpy()[order]
+
+    first_mask = np.ones(len(cell_sorted), dtype=bool)
+    first_mask[1:] = cell_sorted[1:] != cell_sorted[:-1]
+
+    attempted = np.zeros(size, dtype=bool)
+    attempted[cell_sorted] = True
+    ever_pass = np.bincount(cell_sorted, weights=is_pass_sorted, minlength=size) > 0
+    first_pass = np.zeros(size, dtype=bool)
+    first_pass[cell_sorted[first_mask]] = is_pass_sorted[first_mask]
+
+    status_codes = np.select(
+        [first_pass, ever_pass, attempted],
+        [STATUS_FIRST_PASS, STATUS_RETEST_PASS, STATUS_FAIL],
+        default=STATUS_NOT_REACHED,
+    ).astype(np.int8).reshape(n_units, n_stages)
+
+    matrix = pd.DataFrame(status_codes, index=pd.Index(sn_uniques, name='SNumber'), columns=STAGE_ORDER)
+    entry = long_df['stamp'].groupby(sn_codes).min()
+    matrix['entry_date'] = pd.to_datetime(entry.to_numpy()).date
+    return matrix
+
+
+def compute_funnel(matrix):
+    """
+    공정 상태 매트릭스로부터 공정별 수율과 공정 간 유출/손실 수량을 계산합니다.
+    Args:
+        matrix (pd.DataFrame): build_stage_matrix()의 결과 (필요 시 기간 필터링 완료).
+    Returns:
+        tuple: (공정별 수율 DataFrame, 공정 간 이동 DataFrame, 누적 수율(RTY))
+    """
+    status = matrix[STAGE_ORDER].to_numpy()
+    entered = status > STATUS_NOT_REACHED
+    passed = status >= STATUS_RETEST_PASS
+    first = status == STATUS_FIRST_PASS
+
+    n_in = entered.sum(axis=0)
+    n_first = first.sum(axis=0)
+    n_passed = passed.sum(axis=0)
+    fpy = np.divide(n_first, n_in, out=np.zeros(len(STAGE_ORDER)), where=n_in > 0)
+
+    # 투입 이력이 있는 공정만 누적 수율 계산에 포함합니다.
+    rty = float(np.prod(fpy[n_in > 0])) if (n_in > 0).any() else 0.0
+
+    labels = [STAGE_REGISTRY[key]['label'] for key in STAGE_ORDER]
+    stage_df = pd.DataFrame({
+        '공정': labels,
+        '투입': n_in,
+        '최초 합격': n_first,
+        '최종 합격': n_passed,
+        '최종 불합격': n_in - n_passed,
+        'FPY(%)': np.round(fpy * 100, 2),
+    })
+
+    # 공정 i → i+1 이동을 모든 공정 쌍에 대해 한 번에 계산합니다.
+    reached_next = entered[:, 1:]
+    transition_df = pd.DataFrame({
+        '구간': [f"{a} → {b}" for a, b in zip(labels[:-1], labels[1:])],
+        '합격 후 다음 공정 도달': (passed[:, :-1] & reached_next).sum(axis=0),
+        '불합격 유출': (entered[:, :-1] & ~passed[:, :-1] & reached_next).sum(axis=0),
+        '미검사 유출': (~entered[:, :-1] & reached_next).sum(axis=0),
+        '손실(다음 공정 미도달)': (passed[:, :-1] & ~reached_next).sum(axis=0),
+    })
+    return stage_df, transition_df, rty
+
+
+def display_traceability_report(matrix):
+    """
+    공정 추적(Traceability) 퍼널 리포트를 보여주는 함수
+    """
+    st.markdown("### 공정 추적 분석 (PCB → Fw → RfTx → Semi → Func)")
+
+    if matrix.empty:
+        st.warning("추적할 SNumber 데이터가 없습니다.")
+        return
+
+    min_date = matrix['entry_date'].min()
+    max_date = matrix['entry_date'].max()
+    selected_dates = st.date_input("최초 투입일 범위 선택", value=(min_date, max_date), key="dates_trace")
+    if len(selected_dates) != 2:
+        st.warning("날짜 범위를 올바르게 선택해주세요.")
+        return
+
+    start_date, end_date = selected_dates
+    in_range = (matrix['entry_date'] >= start_date) & (matrix['entry_date'] <= end_date)
+    matrix_filtered = matrix[in_range]
+    if matrix_filtered.empty:
+        st.warning("선택한 기간에 투입된 SNumber가 없습니다.")
+        return
+
+    stage_df, transition_df, rty = compute_funnel(matrix_filtered)
+
+    col_units, col_rty = st.columns(2)
+    col_units.metric("추적 대상 SNumber", f"{len(matrix_filtered):,}")
+    col_rty.metric("누적 수율 (RTY)", f"{rty * 100:.2f}%")
+
+    st.markdown("#### 공정별 수율")
+    st.table(stage_df)
+    st.bar_chart(stage_df.set_index('공정')[['투입', '최종 합격']])
+
+    st.markdown("#### 공정 간 유출 / 손실")
+    st.table(transition_df)
@@ -0,0 +1,45 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from aggregation import UNIT_CATEGORIES
+
+DETAIL_PAGE_SIZE = 200
+
+
+# 상세 내역은 열었을 때만 그리며, 이 영역의 조작은 프래그먼트 안에서만 다시 실행됩니다.
+@st.fragment
+def display_unit_details(analysis_key, jig, categories, serials):
+    """
+    지그별 PASS / 가성불량 / 진성불량 / FAIL SNumber 목록을 페이지 단위로 보여주는 함수
+    목록은 analyze_data가 만든 분류별 SerialIdx 배열을 읽기만 하며, 선택한 분류만 SNumber 문자열로 변환합니다.
+    """
+    if not st.toggle("상세 내역 보기", key=f"show_detail_{analysis_key}_{jig}"):
+        return
+    if not categories:
+        st.info("상세 내역이 없습니다.")
+        return
+
+    category = st.radio("분류", UNIT_CATEGORIES, horizontal=True,
+                        format_func=lambda c: f"{c} ({len(categories[c])}건)", key=f"detail_category_{analysis_key}_{jig}")
+    codes = categories[category]
+    if len(codes) == 0:
+        st.info(f"{category} 내역이 없습니다.")
+        return
+    sns = np.sort(np.asarray(serials.take(codes), dtype=str))
+
+    n_pages = (len(sns) + DETAIL_PAGE_SIZE - 1) // DETAIL_PAGE_SIZE
+    col_page, col_download = st.columns([0.7, 0.3])
+    with col_page:
+        page = st.number_input(f"페이지 (전체 {n_pages:,}쪽)", min_value=1, max_value=n_pages, value=1,
+                               key=f"detail_page_{analysis_key}_{jig}_{category}_{len(sns)}")
+    with col_download:
+        st.download_button(
+            label=f"{category} 목록 다운로드",
+            data=pd.DataFrame({'SNumber': sns}).to_csv(index=False).encode('utf-8-sig'),
+            file_name=f"{analysis_key}_{jig}_{category}.csv",
+            mime="text/csv",
+            key=f"detail_download_{analysis_key}_{jig}_{category}",
+        )
+    start = (page - 1) * DETAIL_PAGE_SIZE
+    st.text("\n".join(sns[start:start + DETAIL_PAGE_SIZE]))